@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class GymConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gym'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if settings.GYM_METRICS_ENABLED:
+            from . import metrics
+            metrics.instrument_serializers()
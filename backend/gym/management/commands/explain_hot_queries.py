@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from gym.models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseEvent,
+    GymSession,
+    UserLocation,
+)
+from gym.services import sessions, workload
+
+User = get_user_model()
+
+# Indexes/constraints added for the hot filters (migration 0007). They are
+# dropped inside the rolled-back transaction to capture the "before" plans.
+HOT_INDEXES = [
+    "gym_session_user_start_idx",
+    "gym_one_open_session_per_user",
+    "gym_compl_user_ex_created_idx",
+    "gym_compl_session_created_idx",
+    "gym_event_completion_order_idx",
+    "gym_location_user_recent_idx",
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic dataset inside a transaction, records EXPLAIN plans "
+        "for the hot filters with and without the composite indexes, then "
+        "rolls everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--sessions-per-user", type=int, default=200)
+        parser.add_argument("--exercises-per-session", type=int, default=4)
+        parser.add_argument("--sets-per-exercise", type=int, default=4)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="Write the report to this file.")
+
+    def handle(self, *args, **options):
+        report = []
+        try:
+            with transaction.atomic():
+                probe = self.seed(options)
+                report.append("=== AFTER (with indexes) ===")
+                report += self.explain_all(probe, "after")
+                self.drop_hot_indexes()
+                report.append("=== BEFORE (without indexes) ===")
+                report += self.explain_all(probe, "before")
+                raise Rollback
+        except Rollback:
+            pass
+
+        text = "\n".join(report)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(text + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(text)
+
+    def seed(self, options):
+        workload.generate(
+            options["users"],
+            options["sessions_per_user"],
+            # Derived tables play no part in the plans below.
+            rebuild_derived=False,
+            seed=options["seed"],
+            exercises_per_user=10,
+            exercises_per_session=options["exercises_per_session"],
+            sets_per_exercise=options["sets_per_exercise"],
+            # Everyone has an open session for sessions.current to find.
+            open_fraction=1,
+            prefix="explain-",
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        user = User.objects.get(username=workload.username("explain-", options["users"] // 2))
+        return {
+            "user": user,
+            "exercise": Exercise.objects.filter(user=user).first(),
+            "completion": ExerciseCompletion.objects.filter(user=user).first(),
+        }
+
+    def hot_queries(self, probe):
+        user = probe["user"]
+        return [
+            (
+                "sessions.current",
+                sessions.open_sessions(user),
+            ),
+            (
+                "sessions.list (first page)",
+                GymSession.objects.filter(user=user).order_by("-start_time")[:20],
+            ),
+            (
+                "completion events (Meta.ordering)",
+                ExerciseEvent.objects.filter(completion=probe["completion"]),
+            ),
+            (
+                "latest completion for (user, exercise)",
+                ExerciseCompletion.objects.filter(
+                    user=user, exercise=probe["exercise"]
+                ).order_by("-created_at")[:1],
+            ),
+            (
+                "locations.most_recent",
+                UserLocation.objects.for_user(user).recent_first()[:1],
+            ),
+        ]
+
+    def explain_all(self, probe, phase):
+        options = {"analyze": True} if connection.vendor == "postgresql" else {}
+        prefix = connection.ops.explain_query_prefix(**options)
+        lines = []
+        for label, qs in self.hot_queries(probe):
+            sql, params = qs.query.sql_with_params()
+            with connection.cursor() as cursor:
+                # The phase comment keeps drivers from reusing a statement
+                # prepared before the indexes were dropped.
+                cursor.execute(f"{prefix} {sql} -- {phase}", params)
+                rows = cursor.fetchall()
+            lines.append(f"--- {label}")
+            lines += [" ".join(str(col) for col in row) for row in rows]
+        return lines
+
+    def drop_hot_indexes(self):
+        with connection.cursor() as cursor:
+            for name in HOT_INDEXES:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
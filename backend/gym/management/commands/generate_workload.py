@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from gym.services import workload
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic training history for benchmarks: users with "
+        "custom categories, exercises, locations, sessions, completions and "
+        "events. The same arguments always generate the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--sessions-per-user", type=int, default=200)
+        parser.add_argument("--exercises-per-user", type=int, default=15)
+        parser.add_argument(
+            "--exercises-per-session", type=float, default=4,
+            help="Mean completions per session.",
+        )
+        parser.add_argument(
+            "--sets-per-exercise", type=float, default=4,
+            help="Mean events per completion.",
+        )
+        parser.add_argument(
+            "--open-fraction", type=float, default=0.2,
+            help="Share of users whose latest session is still open.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--until",
+            type=datetime.fromisoformat,
+            default=workload.UNTIL,
+            help="Date the histories end at (ISO 8601, UTC unless given).",
+        )
+        parser.add_argument(
+            "--prefix", default="workload-",
+            help="Usernames are <prefix><n>@example.com.",
+        )
+        parser.add_argument(
+            "--password",
+            help="Password for every generated user (default: unusable).",
+        )
+        parser.add_argument(
+            "--chunk-users", type=int, default=workload.CHUNK_USERS,
+            help="Users written per transaction.",
+        )
+        parser.add_argument(
+            "--skip-derived", action="store_true",
+            help="Leave rollups, records and last completions for later "
+                 "(e.g. rebuild_rollups --workers N).",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["sessions_per_user"] < 1 or options["exercises_per_user"] < 1:
+            raise CommandError("--users, --sessions-per-user and --exercises-per-user must be positive.")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(
+                f"Users named {options['prefix']}* already exist; pick another --prefix."
+            )
+        until = options["until"]
+        if until.tzinfo is None:
+            until = until.replace(tzinfo=dt_timezone.utc)
+
+        # Generated exercises link to the shared defaults.
+        call_command("seed_defaults", stdout=StringIO())
+
+        started = time.monotonic()
+
+        def progress(report):
+            self.stdout.write(
+                f"{report['users']} users, {report['sessions']} sessions, "
+                f"{report['events']} events ({time.monotonic() - started:.0f}s)"
+            )
+
+        report = workload.generate(
+            options["users"],
+            options["sessions_per_user"],
+            rebuild_derived=not options["skip_derived"],
+            seed=options["seed"],
+            exercises_per_user=options["exercises_per_user"],
+            exercises_per_session=options["exercises_per_session"],
+            sets_per_exercise=options["sets_per_exercise"],
+            open_fraction=options["open_fraction"],
+            until=until,
+            prefix=options["prefix"],
+            password=options["password"],
+            chunk_users=options["chunk_users"],
+            progress=progress,
+        )
+        summary = ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in report.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated {summary} in {time.monotonic() - started:.0f}s.")
+        )
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from gym.services import importer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports training history (CSV or NDJSON, optionally gzipped) for a "
+        "user. Safe to re-run: rows already imported are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--user", required=True, help="Email of the user to import for.")
+        parser.add_argument("--format", dest="fmt", choices=importer.FORMATS)
+        parser.add_argument("--chunk-rows", type=int, default=importer.CHUNK_ROWS)
+
+    def handle(self, *args, **options):
+        email = options["user"].strip().lower()
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f"User {email} does not exist.")
+
+        def progress(report):
+            self.stdout.write(
+                f"{report['rows']} rows read: {report['sessions']} sessions, "
+                f"{report['completions']} completions, {report['events']} sets imported"
+            )
+
+        self.stdout.write(self.style.WARNING(f"Importing {options['path']}..."))
+        try:
+            with open(options["path"], "rb") as fh:
+                report = importer.import_file(
+                    user,
+                    fh,
+                    fmt=options["fmt"],
+                    name=options["path"],
+                    progress=progress,
+                    chunk_rows=options["chunk_rows"],
+                )
+        except (OSError, importer.ImportFileError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+
+        for error in report["errors"]:
+            self.stdout.write(self.style.WARNING(f"row {error['row']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['sessions']} sessions, {report['completions']} completions "
+            f"and {report['events']} sets ({report['exercises_created']} new exercises, "
+            f"{report['skipped_rows']} rows skipped)."
+        ))
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from gym.services import exercise_usage, last_completions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the precomputed per-exercise last completion table and "
+        "reconciles Exercise.last_completed_at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            help="Only rebuild for this user's email (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["users"]:
+            emails = [e.strip().lower() for e in options["users"]]
+            user_ids = list(
+                User.objects.filter(email__in=emails).values_list("id", flat=True)
+            )
+            if len(user_ids) != len(set(emails)):
+                raise CommandError("One or more users do not exist.")
+
+        self.stdout.write(self.style.WARNING("Rebuilding last completions..."))
+        count = last_completions.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} last completion rows."))
+        fixed = exercise_usage.reconcile(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Corrected last_completed_at on {fixed} exercises."))
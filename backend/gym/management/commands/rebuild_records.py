@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from gym.services import records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recomputes personal records from event history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            help="Only rebuild for this user's email (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["users"]:
+            emails = [e.strip().lower() for e in options["users"]]
+            user_ids = list(
+                User.objects.filter(email__in=emails).values_list("id", flat=True)
+            )
+            if len(user_ids) != len(set(emails)):
+                raise CommandError("One or more users do not exist.")
+
+        self.stdout.write(self.style.WARNING("Rebuilding personal records..."))
+        count = records.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed records for {count} user exercises."))
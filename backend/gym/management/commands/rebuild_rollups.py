@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from gym.services import rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily exercise and weekly muscle-group rollups from events."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            help="Only rebuild for this user's email (repeatable).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of user chunks to rebuild in parallel.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50,
+            help="Users per chunk (each chunk is one transaction).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["users"]:
+            emails = [e.strip().lower() for e in options["users"]]
+            user_ids = list(
+                User.objects.filter(email__in=emails).values_list("id", flat=True)
+            )
+            if len(user_ids) != len(set(emails)):
+                raise CommandError("One or more users do not exist.")
+
+        self.stdout.write(self.style.WARNING("Rebuilding rollups..."))
+        daily, weekly = rollups.rebuild(
+            user_ids,
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {daily} daily and {weekly} weekly rollup rows.")
+        )
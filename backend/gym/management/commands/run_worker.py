@@ -0,0 +1,146 @@
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gym.services import jobs, worker_process
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs (imports, exports, rebuilds) in a pool "
+        "of worker processes until stopped with SIGINT/SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="Jobs run in parallel. 0 runs them inline in this process.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds between queue polls while idle.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is runnable instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.worker = jobs.worker_name()
+        self.poll_interval = options["poll_interval"]
+        self.stdout.write(self.style.WARNING(
+            f"Worker {self.worker} started with {options['processes'] or 'inline'} processes."
+        ))
+        if options["processes"] > 0:
+            done = self.run_pool(options["processes"], options["once"])
+        else:
+            done = self.run_inline(options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped after {done} jobs."))
+
+    def stop(self, signum, frame):
+        # Finish the jobs in flight, claim nothing new.
+        self.stopping = True
+
+    def log(self, job, ok):
+        status = self.style.SUCCESS("done") if ok else self.style.ERROR("failed")
+        self.stdout.write(f"{job.kind} job {job.pk} (user {job.user_id}): {status}")
+
+    def run_inline(self, once):
+        done = 0
+        while not self.stopping:
+            jobs.requeue_stale()
+            claimed = jobs.claim(self.worker, 1)
+            if not claimed:
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            job = claimed[0]
+            with self.heartbeating(job.pk):
+                self.log(job, jobs.execute(job.pk))
+            done += 1
+        return done
+
+    @contextmanager
+    def heartbeating(self, job_id):
+        """
+        Heartbeat `job_id` from a thread while the job runs inline, as
+        run_pool does for its pool's jobs.
+        """
+        finished = threading.Event()
+
+        def beat():
+            try:
+                while not finished.wait(self.poll_interval):
+                    jobs.heartbeat([job_id])
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            finished.set()
+            thread.join()
+
+    def make_pool(self, processes):
+        return ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker_process.init,
+        )
+
+    def run_pool(self, processes, once):
+        pool = self.make_pool(processes)
+        running = {}  # future -> Job
+        done = 0
+        try:
+            while running or not self.stopping:
+                jobs.heartbeat([job.pk for job in running.values()])
+                if not self.stopping:
+                    jobs.requeue_stale()
+                    for job in jobs.claim(self.worker, processes - len(running)):
+                        running[pool.submit(worker_process.execute, job.pk)] = job
+                if not running:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                finished, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                if any(isinstance(f.exception(), BrokenProcessPool) for f in finished):
+                    # A pool process died mid-job (e.g. OOM-killed), which
+                    # takes every job in the pool with it: count them all as
+                    # failed attempts and start a fresh pool.
+                    for job in running.values():
+                        jobs.fail(job.pk, "Worker process died.")
+                        self.log(job, False)
+                    done += len(running)
+                    running.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.make_pool(processes)
+                    continue
+                for future in finished:
+                    job = running.pop(future)
+                    self.log(job, future.result())
+                    done += 1
+        finally:
+            pool.shutdown(wait=True)
+        return done
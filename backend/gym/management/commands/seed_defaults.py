@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from gym.models import Tag, MuscleGroup
+from gym.services import defaults
 
 DEFAULT_TAGS = [
     ("push", "sym_o_arrow_circle_up"),
@@ -49,4 +50,7 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f"Updated muscle group: {name}")
 
+        # Every worker reloads its cached copy of the defaults.
+        defaults.bump()
+
         self.stdout.write(self.style.SUCCESS("Defaults ensured safely."))
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+In-process request metrics (see gym.middleware.RequestMetricsMiddleware).
+
+Per resolved route and method the middleware observes wall time, database
+query count and time, serializer time and response size into fixed-bucket
+histograms, rendered in the Prometheus text format by GET /api/_metrics.
+
+Numbers are per process: with several gunicorn workers each one keeps
+(and serves) its own, and they reset on restart.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name -> (help, buckets, RequestStats attribute)
+HISTOGRAMS = {
+    "gym_request_duration_seconds": ("Wall time per request.", TIME_BUCKETS, "duration"),
+    "gym_request_db_queries": ("Database queries per request.", QUERY_BUCKETS, "queries"),
+    "gym_request_db_duration_seconds": ("Time spent in database queries per request.", TIME_BUCKETS, "db_time"),
+    "gym_request_serializer_duration_seconds": (
+        "Time spent serializing per request, excluding queries run meanwhile.",
+        TIME_BUCKETS,
+        "serializer_time",
+    ),
+    "gym_response_size_bytes": ("Response body size (not streamed responses).", SIZE_BUCKETS, "response_bytes"),
+}
+
+
+class RequestStats:
+    def __init__(self):
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.response_bytes = None
+        self.serializing = False
+
+    def as_log(self):
+        return {
+            "duration_ms": round(self.duration * 1000, 1),
+            "db_queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 1),
+            "serializer_ms": round(self.serializer_time * 1000, 1),
+            "response_bytes": self.response_bytes,
+        }
+
+
+current = ContextVar("gym_request_stats", default=None)
+
+
+class QueryTimer:
+    """
+    connection.execute_wrapper() hook adding each query to the request's
+    stats.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.queries += 1
+            self.stats.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def serializing():
+    """
+    Count the enclosed block as serializer time for the current request.
+    Nested blocks count once; queries run inside are left to db_time.
+    """
+    stats = current.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+
+    stats.serializing = True
+    started, db_before = time.perf_counter(), stats.db_time
+    try:
+        yield
+    finally:
+        stats.serializing = False
+        elapsed = time.perf_counter() - started
+        stats.serializer_time += elapsed - (stats.db_time - db_before)
+
+
+def _timed(to_representation):
+    def wrapper(self, instance):
+        with serializing():
+            return to_representation(self, instance)
+    wrapper.__wrapped__ = to_representation
+    return wrapper
+
+
+def instrument_serializers():
+    """
+    Time every DRF serializer's to_representation(). Called once from
+    GymConfig.ready() when metrics are enabled.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not hasattr(cls.to_representation, "__wrapped__"):
+            cls.to_representation = _timed(cls.to_representation)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # (route, method) -> {histogram name: Histogram}
+        self.histograms = {}
+        # (route, method, status) -> count
+        self.requests = {}
+
+    def observe(self, route, method, status, stats):
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            series = self.histograms.get((route, method))
+            if series is None:
+                series = self.histograms[(route, method)] = {
+                    name: Histogram(buckets) for name, (_, buckets, _) in HISTOGRAMS.items()
+                }
+            for name, (_, _, attr) in HISTOGRAMS.items():
+                value = getattr(stats, attr)
+                if value is not None:
+                    series[name].observe(value)
+
+    def render(self):
+        """
+        Everything observed so far, in the Prometheus text format.
+        """
+        with self.lock:
+            lines = [
+                "# HELP gym_requests_total Requests handled, by route, method and status.",
+                "# TYPE gym_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                labels = _labels(route=route, method=method, status=status)
+                lines.append(f"gym_requests_total{{{labels}}} {count}")
+
+            for name, (help_text, _, _) in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), series in sorted(self.histograms.items()):
+                    histogram = series[name]
+                    if not histogram.count:
+                        continue
+                    labels = _labels(route=route, method=method)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines += [
+                        f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}',
+                        f"{name}_sum{{{labels}}} {round(histogram.sum, 6)}",
+                        f"{name}_count{{{labels}}} {histogram.count}",
+                    ]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    return ",".join(
+        f'{key}="{_escape(value)}"' for key, value in labels.items()
+    )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
@@ -0,0 +1,94 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, query_budget
+
+slow_log = logging.getLogger("gym.requests")
+
+
+class RequestMetricsMiddleware:
+    """
+    Observe every request into gym.metrics, labelled with its resolved
+    route name (e.g. "gymsession-list", "exercise-last-completion"), and
+    log requests slower than GYM_SLOW_REQUEST_MS as one JSON line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics.QueryTimer(stats))
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        stats.duration = time.perf_counter() - started
+        if not response.streaming:
+            stats.response_bytes = len(response.content)
+
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        metrics.registry.observe(route, request.method, response.status_code, stats)
+
+        if stats.duration * 1000 >= settings.GYM_SLOW_REQUEST_MS:
+            slow_log.warning(json.dumps({
+                "event": "slow_request",
+                "route": route,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "user_id": getattr(getattr(request, "user", None), "pk", None),
+                **stats.as_log(),
+            }))
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Fail requests to gym views that exceed their query budget or repeat a
+    query shape (see gym.query_budget). Only installed when
+    GYM_ENFORCE_QUERY_BUDGETS is on, which the test suite does.
+    """
+
+    def __init__(self, get_response):
+        if not settings.GYM_ENFORCE_QUERY_BUDGETS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = query_budget.QueryRecorder()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        # Queries run while a streamed body is consumed (exports read in
+        # chunks) happen after this and are not counted.
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = request.resolver_match
+        if match is None or not query_budget.is_budgeted_view(match.func):
+            return
+        action = query_budget.action_for(match.func, request.method)
+        if action is None:
+            return
+        label = f"{request.method} {match.view_name}"
+        if action != query_budget.ALL_ACTIONS:
+            label += f" ({action})"
+        query_budget.check(
+            label, query_budget.budget_for(match.func, action), request, recorder
+        )
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_last_completions(apps, schema_editor):
+    ExerciseCompletion = apps.get_model('gym', 'ExerciseCompletion')
+    ExerciseLastCompletion = apps.get_model('gym', 'ExerciseLastCompletion')
+
+    rows = (
+        ExerciseCompletion.objects
+        .filter(events__isnull=False, session__end_time__isnull=False)
+        .values('id', 'user_id', 'exercise_id')
+        .annotate(last_event_at=Max('events__created_at'))
+        .order_by('user_id', 'exercise_id', '-last_event_at')
+    )
+    seen = set()
+    records = []
+    for row in rows:
+        key = (row['user_id'], row['exercise_id'])
+        if key in seen:
+            continue
+        seen.add(key)
+        records.append(ExerciseLastCompletion(
+            user_id=row['user_id'],
+            exercise_id=row['exercise_id'],
+            completion_id=row['id'],
+            last_event_at=row['last_event_at'],
+        ))
+    ExerciseLastCompletion.objects.bulk_create(records, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0005_userlocation_alter_gymsession_location'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseLastCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_event_at', models.DateTimeField()),
+                ('completion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gym.exercisecompletion')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_completions', to='gym.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_last_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_last_completions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """
+    Keep only the most recently started open session per user so the
+    one-open-session constraint can be added.
+    """
+    GymSession = apps.get_model('gym', 'GymSession')
+    keep = {}
+    stale = []
+    for session_id, user_id in (
+        GymSession.objects
+        .filter(end_time__isnull=True)
+        .order_by('user_id', '-start_time', '-id')
+        .values_list('id', 'user_id')
+    ):
+        if user_id in keep:
+            stale.append(session_id)
+        else:
+            keep[user_id] = session_id
+    if stale:
+        GymSession.objects.filter(id__in=stale).update(end_time=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0006_exerciselastcompletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exercisecompletion',
+            index=models.Index(fields=['user', 'exercise', 'created_at'], name='gym_compl_user_ex_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exercisecompletion',
+            index=models.Index(fields=['session', 'created_at'], name='gym_compl_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseevent',
+            index=models.Index(fields=['completion', 'order_index', 'created_at'], name='gym_event_completion_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gymsession',
+            index=models.Index(fields=['user', '-start_time'], name='gym_session_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userlocation',
+            index=models.Index(fields=['user', '-updated_at'], name='gym_location_user_recent_idx'),
+        ),
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='gymsession',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('user',), name='gym_one_open_session_per_user'),
+        ),
+    ]
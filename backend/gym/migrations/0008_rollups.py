@@ -0,0 +1,124 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:06
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, ExpressionWrapper, F, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # A frozen copy of gym.services.rollups.rebuild() at this migration.
+    ExerciseEvent = apps.get_model('gym', 'ExerciseEvent')
+    Exercise = apps.get_model('gym', 'Exercise')
+    ExerciseDailyRollup = apps.get_model('gym', 'ExerciseDailyRollup')
+    MuscleGroupWeeklyRollup = apps.get_model('gym', 'MuscleGroupWeeklyRollup')
+
+    decimal = models.DecimalField(max_digits=14, decimal_places=2)
+    volume = ExpressionWrapper(F('reps') * F('weight'), output_field=decimal)
+    estimated_1rm = Case(
+        When(reps=1, then=F('weight')),
+        default=ExpressionWrapper(
+            F('weight') * (Value(30) + F('reps')) / Value(Decimal('30')), output_field=decimal,
+        ),
+        output_field=decimal,
+    )
+    rows = (
+        ExerciseEvent.objects
+        .order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('completion__user_id', 'completion__exercise_id', 'day')
+        .annotate(
+            set_count=Count('id'),
+            total_reps=Coalesce(Sum('reps'), 0),
+            top_set_weight=Max('weight'),
+            total_volume=Coalesce(Sum(volume), Value(Decimal('0')), output_field=decimal),
+            estimated_1rm=Max(estimated_1rm),
+            total_distance=Coalesce(Sum('distance'), Value(Decimal('0')), output_field=decimal),
+            total_duration_seconds=Coalesce(Sum('duration_seconds'), 0),
+        )
+    )
+    groups = defaultdict(list)
+    for exercise_id, muscle_group_id in Exercise.muscle_groups.through.objects.values_list(
+        'exercise_id', 'musclegroup_id'
+    ):
+        groups[exercise_id].append(muscle_group_id)
+
+    weekly_fields = ['set_count', 'total_reps', 'total_volume', 'total_distance', 'total_duration_seconds']
+    daily, weekly = [], defaultdict(lambda: dict.fromkeys(weekly_fields, 0))
+    for row in rows.iterator():
+        user_id, exercise_id, day = (
+            row.pop('completion__user_id'), row.pop('completion__exercise_id'), row.pop('day')
+        )
+        daily.append(ExerciseDailyRollup(user_id=user_id, exercise_id=exercise_id, day=day, **row))
+        week = day - timedelta(days=day.weekday())
+        for muscle_group_id in groups[exercise_id]:
+            totals = weekly[(user_id, muscle_group_id, week)]
+            for field in weekly_fields:
+                totals[field] += row[field]
+    ExerciseDailyRollup.objects.bulk_create(daily, batch_size=1000)
+    MuscleGroupWeeklyRollup.objects.bulk_create(
+        [
+            MuscleGroupWeeklyRollup(user_id=user_id, muscle_group_id=muscle_group_id, week=week, **totals)
+            for (user_id, muscle_group_id, week), totals in weekly.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0007_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('set_count', models.PositiveIntegerField(default=0)),
+                ('total_reps', models.PositiveIntegerField(default=0)),
+                ('top_set_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('estimated_1rm', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('total_distance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_duration_seconds', models.PositiveBigIntegerField(default=0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='gym.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('user', 'exercise', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MuscleGroupWeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('week', models.DateField()),
+                ('set_count', models.PositiveIntegerField(default=0)),
+                ('total_reps', models.PositiveIntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_distance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_duration_seconds', models.PositiveBigIntegerField(default=0)),
+                ('muscle_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_rollups', to='gym.musclegroup')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='muscle_group_weekly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['week'],
+                'unique_together': {('user', 'muscle_group', 'week')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:09
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_personal_records(apps, schema_editor):
+    # A frozen copy of gym.services.records.rebuild() at this migration.
+    Exercise = apps.get_model('gym', 'Exercise')
+    ExerciseEvent = apps.get_model('gym', 'ExerciseEvent')
+    PersonalRecord = apps.get_model('gym', 'PersonalRecord')
+
+    def q(value):
+        return Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    zero = Decimal('0')
+    exercises = {
+        exercise.id: exercise
+        for exercise in Exercise.objects.filter(completions__events__isnull=False).distinct()
+    }
+    best = {}
+    events = (
+        ExerciseEvent.objects
+        .order_by('created_at', 'id')
+        .values_list(
+            'id', 'completion__user_id', 'completion__exercise_id',
+            'reps', 'weight', 'distance', 'duration_seconds',
+        )
+    )
+    for event_id, user_id, exercise_id, reps, weight, distance, duration in events.iterator(chunk_size=2000):
+        exercise = exercises[exercise_id]
+        metrics = {}
+        if exercise.track_weight and weight:
+            metrics[('max_weight', zero)] = q(weight)
+            if exercise.track_reps and reps:
+                metrics[('max_reps_at_weight', q(weight))] = q(reps)
+                e1rm = weight if reps == 1 else weight * (30 + reps) / Decimal(30)
+                metrics[('best_estimated_1rm', zero)] = q(e1rm)
+        if exercise.track_distance and distance:
+            metrics[('max_distance', zero)] = q(distance)
+            if exercise.track_duration and duration:
+                metrics[('best_pace', zero)] = q(Decimal(duration) / distance)
+        for (metric, at_weight), value in metrics.items():
+            key = (user_id, exercise_id, metric, at_weight)
+            current = best.get(key)
+            lower_is_better = metric == 'best_pace'
+            if current is None or (value < current[0] if lower_is_better else value > current[0]):
+                best[key] = (value, event_id)
+
+    PersonalRecord.objects.bulk_create(
+        [
+            PersonalRecord(
+                user_id=user_id,
+                exercise_id=exercise_id,
+                metric=metric,
+                at_weight=at_weight,
+                value=value,
+                event_id=event_id,
+            )
+            for (user_id, exercise_id, metric, at_weight), (value, event_id) in best.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0008_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('metric', models.CharField(choices=[('max_weight', 'Heaviest weight'), ('max_reps_at_weight', 'Most reps at a weight'), ('best_estimated_1rm', 'Best estimated 1RM'), ('max_distance', 'Longest distance'), ('best_pace', 'Fastest pace (seconds per mile)')], max_length=32)),
+                ('at_weight', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to='gym.exerciseevent')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to='gym.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['metric', 'at_weight'],
+                'unique_together': {('user', 'exercise', 'metric', 'at_weight')},
+            },
+        ),
+        migrations.RunPython(backfill_personal_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:18
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_search_text(apps, schema_editor):
+    """
+    Same document as gym.services.search.document().
+    """
+    Exercise = apps.get_model('gym', 'Exercise')
+    names = defaultdict(lambda: ([], []))
+    for exercise_id, name in Exercise.tags.through.objects.values_list('exercise_id', 'tag__name'):
+        names[exercise_id][0].append(name)
+    for exercise_id, name in Exercise.muscle_groups.through.objects.values_list(
+        'exercise_id', 'musclegroup__name'
+    ):
+        names[exercise_id][1].append(name)
+
+    exercises = list(Exercise.objects.only('id', 'name'))
+    for exercise in exercises:
+        tags, groups = names[exercise.pk]
+        parts = [exercise.name, *sorted(tags), *sorted(groups)]
+        exercise.search_text = ' '.join(part.strip().lower() for part in parts if part)
+    Exercise.objects.bulk_update(exercises, ['search_text'], batch_size=1000)
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS gym_exercise_search_trgm_idx '
+        'ON gym_exercise USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS gym_exercise_search_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0010_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        # pg_trgm GIN index so `search_text LIKE '%word%'` is an index scan.
+        # Postgres only; other backends search without it.
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
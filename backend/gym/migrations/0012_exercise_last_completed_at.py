@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_last_completed_at(apps, schema_editor):
+    Exercise = apps.get_model('gym', 'Exercise')
+    ExerciseCompletion = apps.get_model('gym', 'ExerciseCompletion')
+    Exercise.objects.update(
+        last_completed_at=models.Subquery(
+            ExerciseCompletion.objects
+            .filter(user_id=models.OuterRef('user_id'), exercise_id=models.OuterRef('pk'))
+            .order_by('-created_at')
+            .values('created_at')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0011_exercise_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_last_completed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['user', '-last_completed_at'], name='gym_exercise_user_recent_idx'),
+        ),
+    ]
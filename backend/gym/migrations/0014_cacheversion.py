@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0013_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('space', models.CharField(max_length=32)),
+                ('owner_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'unique_together': {('space', 'owner_id')},
+            },
+        ),
+    ]
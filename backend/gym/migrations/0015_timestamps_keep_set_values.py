@@ -0,0 +1,134 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:58
+
+import gym.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0014_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='exercise',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='exercisecompletion',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='exercisecompletion',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='exercisedailyrollup',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='exercisedailyrollup',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='exerciseevent',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='exerciseevent',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='exerciselastcompletion',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='exerciselastcompletion',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='gymsession',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='gymsession',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='musclegroup',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='musclegroup',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='musclegroupweeklyrollup',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='musclegroupweeklyrollup',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='personalrecord',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='personalrecord',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='userlocation',
+            name='created_at',
+            field=gym.models.StampField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='userlocation',
+            name='updated_at',
+            field=gym.models.StampField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_output_data(apps, schema_editor):
+    """
+    Finished exports become a single chunk.
+    """
+    Job = apps.get_model('gym', 'Job')
+    JobOutputChunk = apps.get_model('gym', 'JobOutputChunk')
+    jobs = Job.objects.filter(output_data__isnull=False).values_list('pk', 'output_data')
+    for pk, data in jobs.iterator(chunk_size=1):
+        JobOutputChunk.objects.create(job_id=pk, index=0, data=data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0015_timestamps_keep_set_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobOutputChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='output_chunks', to='gym.job')),
+            ],
+            options={
+                'unique_together': {('job', 'index')},
+            },
+        ),
+        migrations.RunPython(move_output_data, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='output_data',
+        ),
+    ]
@@ -1,18 +1,45 @@
 # gym/models.py
+from decimal import Decimal
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
-from django.db.models import Max
+from django.db.models import Count, DecimalField, DurationField, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+class StampField(models.DateTimeField):
+    """
+    auto_now / auto_now_add, except that a row inserted with the value
+    already set keeps it: imported and generated history is bulk_created
+    with its own dates.
+    """
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if add and value is not None:
+            return value
+        return super().pre_save(model_instance, add)
+
 
 class TimestampedModel(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = StampField(auto_now_add=True)
+    updated_at = StampField(auto_now=True)
 
     class Meta:
         abstract = True
 
 
-class MuscleGroup(TimestampedModel):
+class SyncedModel(TimestampedModel):
+    """
+    A model the offline sync API exposes (see gym.views.sync).
+    client_id is generated on the device so pushed creates are idempotent.
+    """
+    client_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+
+class MuscleGroup(SyncedModel):
     """
     A muscle group category (e.g. 'Chest', 'Back').
     user = null => global/default category available to everyone.
@@ -37,7 +64,7 @@ class MuscleGroup(TimestampedModel):
         return f"{self.name} ({prefix})"
 
 
-class Tag(TimestampedModel):
+class Tag(SyncedModel):
     """
     A tag category (e.g. 'push', 'pull', 'cardio', 'machine').
     user = null => global/default tag.
@@ -62,7 +89,7 @@ class Tag(TimestampedModel):
         return f"{self.name} ({prefix})"
 
 
-class Exercise(TimestampedModel):
+class Exercise(SyncedModel):
     """
     Definition of an exercise (per user).
     Controls which fields are tracked on events.
@@ -74,6 +101,9 @@ class Exercise(TimestampedModel):
         related_name="exercises",
     )
     name = models.CharField(max_length=255)
+    # Lower-cased name + tag names + muscle-group names, maintained by
+    # gym.services.search and trigram-indexed on Postgres.
+    search_text = models.TextField(blank=True, default="", editable=False)
     image = models.ImageField(
         upload_to="exercise_images/",
         null=True,
@@ -99,28 +129,38 @@ class Exercise(TimestampedModel):
     track_resistance_string = models.BooleanField(default=False)
     track_notes = models.BooleanField(default=False)
 
+    # created_at of the latest completion, kept current by
+    # gym.services.exercise_usage instead of a Max() per request.
+    last_completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     def last_completion_for_user(self, user):
         """
         Returns the most recent *previous* ExerciseCompletion for this exercise
         for the given user, skipping:
         - completions with no events
         - completions belonging to the current open session
+
+        Reads the precomputed ExerciseLastCompletion row (one indexed fetch);
+        see gym.services.last_completions for how it is kept current.
         """
-        return (
-            self.completions
-            .filter(
-                user=user,
-                events__isnull=False,             # must have sets/splits
-                session__end_time__isnull=False,  # session must be CLOSED
-            )
-            .annotate(last_event_at=Max("events__created_at"))
-            .order_by("-last_event_at")
+        record = (
+            ExerciseLastCompletion.objects
+            .select_related("completion")
+            .filter(user=user, exercise=self)
             .first()
         )
-    
+        return record.completion if record else None
+
     class Meta:
         unique_together = ("user", "name")
         ordering = ["name"]
+        indexes = [
+            # exercise picker, ordering=recent
+            models.Index(
+                fields=["user", "-last_completed_at"],
+                name="gym_exercise_user_recent_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user})"
@@ -134,7 +174,7 @@ class UserLocationQuerySet(models.QuerySet):
         # updated_at reflects both edits and when it was last used
         return self.order_by("-updated_at")
     
-class UserLocation(TimestampedModel):  # instead of models.Model
+class UserLocation(SyncedModel):  # instead of models.Model
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -160,11 +200,63 @@ class UserLocation(TimestampedModel):  # instead of models.Model
     class Meta:
         ordering = ["-updated_at"]
         unique_together = ("user", "name")
+        indexes = [
+            models.Index(fields=["user", "-updated_at"], name="gym_location_user_recent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.user_id})"
 
-class GymSession(TimestampedModel):
+class GymSessionQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Annotate per-session counts and totals with correlated subqueries,
+        so no nested completions/events have to be loaded to summarize.
+        Everything is computed in the one SELECT that fetches the sessions;
+        `elapsed` is end_time - start_time (None while the session is open).
+        """
+        def event_total(aggregate):
+            return Subquery(
+                ExerciseEvent.objects
+                .filter(completion__session=OuterRef("pk"))
+                .order_by()
+                .values("completion__session")
+                .annotate(total=aggregate)
+                .values("total")
+            )
+
+        def decimal_total(expression, max_digits):
+            field = DecimalField(max_digits=max_digits, decimal_places=2)
+            return Coalesce(event_total(Sum(expression)), Value(Decimal("0")), output_field=field)
+
+        volume = ExpressionWrapper(
+            F("reps") * F("weight"),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+        return self.annotate(
+            exercise_count=Coalesce(
+                Subquery(
+                    ExerciseCompletion.objects
+                    .filter(session=OuterRef("pk"))
+                    .order_by()
+                    .values("session")
+                    .annotate(total=Count("pk"))
+                    .values("total")
+                ),
+                0,
+            ),
+            set_count=Coalesce(event_total(Count("pk")), 0),
+            total_reps=Coalesce(event_total(Sum("reps")), 0),
+            total_volume=decimal_total(volume, 14),
+            total_distance=decimal_total("distance", 12),
+            total_duration_seconds=Coalesce(event_total(Sum("duration_seconds")), 0),
+            elapsed=ExpressionWrapper(
+                F("end_time") - F("start_time"), output_field=DurationField()
+            ),
+        )
+
+
+class GymSession(SyncedModel):
     """
     A training session for a user.
     end_time = null => 'open' session.
@@ -185,8 +277,22 @@ class GymSession(TimestampedModel):
     )
     note = models.TextField(blank=True)
 
+    objects = GymSessionQuerySet.as_manager()
+
     class Meta:
         ordering = ["-start_time"]
+        indexes = [
+            models.Index(fields=["user", "-start_time"], name="gym_session_user_start_idx"),
+        ]
+        constraints = [
+            # At most one open session per user; doubles as the partial
+            # index behind the `current` lookup.
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(end_time__isnull=True),
+                name="gym_one_open_session_per_user",
+            ),
+        ]
 
     def __str__(self):
         status = "open" if self.is_open else "closed"
@@ -202,19 +308,19 @@ class GymSession(TimestampedModel):
         choose last event time or now().
         """
         if when is None:
-            last_event = (
+            when = (
                 ExerciseEvent.objects
                 .filter(completion__session=self)
-                .order_by("-created_at")
-                .first()
-            )
-            when = last_event.created_at if last_event else timezone.now()
+                .aggregate(last=Max("created_at"))["last"]
+            ) or timezone.now()
         self.end_time = when
         if save:
-            self.save()
+            self.save(update_fields=["end_time", "updated_at"])
+            from .services import last_completions
+            last_completions.refresh_for_sessions([self.pk])
 
 
-class ExerciseCompletion(TimestampedModel):
+class ExerciseCompletion(SyncedModel):
     """
     A concrete instance of an Exercise within a specific GymSession.
     Holds its own note and set/split events.
@@ -238,6 +344,10 @@ class ExerciseCompletion(TimestampedModel):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["user", "exercise", "created_at"], name="gym_compl_user_ex_created_idx"),
+            models.Index(fields=["session", "created_at"], name="gym_compl_session_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.exercise.name} in session {self.session_id} ({self.user})"
@@ -263,7 +373,7 @@ class ExerciseCompletion(TimestampedModel):
         }
 
 
-class ExerciseEvent(TimestampedModel):
+class ExerciseEvent(SyncedModel):
     """
     A set or split belonging to an ExerciseCompletion.
     Which fields matter is governed by Exercise.exercise_type
@@ -318,6 +428,272 @@ class ExerciseEvent(TimestampedModel):
 
     class Meta:
         ordering = ["completion", "order_index", "created_at"]
+        indexes = [
+            models.Index(fields=["completion", "order_index", "created_at"], name="gym_event_completion_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"Event {self.id} for {self.completion}"
+
+
+class ExerciseLastCompletion(TimestampedModel):
+    """
+    Denormalized "latest closed completion with events" per (user, exercise).
+    Maintained by gym.services.last_completions; rebuild from scratch with
+    `manage.py rebuild_last_completions`.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="exercise_last_completions",
+    )
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        related_name="last_completions",
+    )
+    completion = models.ForeignKey(
+        ExerciseCompletion,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    last_event_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "exercise")
+
+    def __str__(self):
+        return f"Last {self.exercise.name} for {self.user}: completion {self.completion_id}"
+
+
+class ExerciseDailyRollup(TimestampedModel):
+    """
+    Per (user, exercise, day) aggregate of ExerciseEvent rows, bucketed by
+    the event's created_at date. Maintained incrementally by
+    gym.services.rollups; charts read from here instead of raw events.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="exercise_daily_rollups",
+    )
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        related_name="daily_rollups",
+    )
+    day = models.DateField()
+
+    set_count = models.PositiveIntegerField(default=0)
+    total_reps = models.PositiveIntegerField(default=0)
+    top_set_weight = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
+    total_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    estimated_1rm = models.DecimalField(max_digits=9, decimal_places=2, null=True, blank=True)
+    total_distance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_duration_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "exercise", "day")
+        ordering = ["day"]
+
+    def __str__(self):
+        return f"{self.exercise.name} on {self.day} ({self.user})"
+
+
+class MuscleGroupWeeklyRollup(TimestampedModel):
+    """
+    Per (user, muscle group, ISO week) totals, derived from
+    ExerciseDailyRollup. `week` is the Monday the week starts on.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="muscle_group_weekly_rollups",
+    )
+    muscle_group = models.ForeignKey(
+        MuscleGroup,
+        on_delete=models.CASCADE,
+        related_name="weekly_rollups",
+    )
+    week = models.DateField()
+
+    set_count = models.PositiveIntegerField(default=0)
+    total_reps = models.PositiveIntegerField(default=0)
+    total_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_distance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_duration_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "muscle_group", "week")
+        ordering = ["week"]
+
+    def __str__(self):
+        return f"{self.muscle_group.name} week of {self.week} ({self.user})"
+
+
+class PersonalRecord(TimestampedModel):
+    """
+    Best value per (user, exercise, metric), pointing at the event that set
+    it. For "most reps at a given weight" the weight is part of the key
+    (`at_weight`); every other metric uses at_weight=0.
+    Maintained by gym.services.records.
+    """
+    MAX_WEIGHT = "max_weight"
+    MAX_REPS_AT_WEIGHT = "max_reps_at_weight"
+    BEST_ESTIMATED_1RM = "best_estimated_1rm"
+    MAX_DISTANCE = "max_distance"
+    BEST_PACE = "best_pace"
+
+    METRIC_CHOICES = [
+        (MAX_WEIGHT, "Heaviest weight"),
+        (MAX_REPS_AT_WEIGHT, "Most reps at a weight"),
+        (BEST_ESTIMATED_1RM, "Best estimated 1RM"),
+        (MAX_DISTANCE, "Longest distance"),
+        (BEST_PACE, "Fastest pace (seconds per mile)"),
+    ]
+
+    # Metrics where a smaller value is better.
+    LOWER_IS_BETTER = {BEST_PACE}
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="personal_records",
+    )
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        related_name="personal_records",
+    )
+    metric = models.CharField(max_length=32, choices=METRIC_CHOICES)
+    at_weight = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    value = models.DecimalField(max_digits=12, decimal_places=2)
+    event = models.ForeignKey(
+        ExerciseEvent,
+        on_delete=models.CASCADE,
+        related_name="personal_records",
+    )
+
+    class Meta:
+        unique_together = ("user", "exercise", "metric", "at_weight")
+        ordering = ["metric", "at_weight"]
+
+    def __str__(self):
+        return f"{self.metric} {self.value} on {self.exercise.name} ({self.user})"
+
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted synced row, so the change feed can tell offline
+    clients to drop it. Only the row the delete started from gets one:
+    children removed by cascade are implied by their parent's tombstone.
+    user = null => global row (default tag/muscle group).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tombstones",
+        null=True,
+        blank=True,
+    )
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    client_id = models.UUIDField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["deleted_at"]
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="gym_tombstone_user_del_idx"),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
+
+
+class Job(TimestampedModel):
+    """
+    A long-running operation (import, export, analytics rebuild) queued for
+    `manage.py run_worker` instead of running inside a web request.
+    See gym.services.jobs.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="jobs",
+    )
+    kind = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict, blank=True)
+    # Uploaded file for imports (gzipped); exports write JobOutputChunks.
+    input_data = models.BinaryField(null=True, blank=True)
+
+    progress = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # worker polling: next runnable job
+            models.Index(fields=["status", "run_after"], name="gym_job_status_run_idx"),
+            # per-user concurrency checks and the user's job list
+            models.Index(fields=["user", "status"], name="gym_job_user_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
+
+
+class JobOutputChunk(models.Model):
+    """
+    One piece, in `index` order, of the file a job produced (a gzipped
+    export), so it is written and downloaded without holding it whole.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="output_chunks")
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ("job", "index")
+
+    def __str__(self):
+        return f"chunk {self.index} of job {self.job_id}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version number of one owner's cached data in one space (see
+    gym.services.catalog_cache). Kept in the database rather than the
+    cache so every process sees a bump, and bumped with an atomic UPDATE.
+    owner_id = 0 => the shared default rows.
+    """
+    space = models.CharField(max_length=32)
+    owner_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ("space", "owner_id")
 
     def __str__(self):
-        return f"Event {self.id} for {self.completion}"
\ No newline at end of file
+        return f"{self.space} version of {self.owner_id or 'defaults'}: {self.version}"
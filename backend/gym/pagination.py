@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SessionCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's session history, newest first.
+    Page cost stays flat no matter how far back the user scrolls. The id
+    breaks ties between sessions that start at the same time, so none are
+    skipped or repeated across pages.
+    """
+    ordering = ("-start_time", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,165 @@
+"""
+Per-endpoint query budgets (see gym.middleware.QueryBudgetMiddleware).
+
+Every gym view declares how many queries each of its actions may run:
+
+    @query_budget(list=3, retrieve=5, create=9)
+    class GymSessionViewSet(viewsets.ModelViewSet): ...
+
+    @query_budget(4)
+    @api_view(["GET"])
+    def bootstrap(request): ...
+
+With GYM_ENFORCE_QUERY_BUDGETS on (the test suite turns it on), a request
+that runs more queries than its action's budget, or runs the same SQL shape
+more than `repeats` times (an N+1), fails with QueryBudgetExceeded. Budgets
+are fixed numbers, so they also pin down that an endpoint's query count
+does not grow with the amount of data behind it.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+
+# Function views have one budget for every method.
+ALL_ACTIONS = "*"
+
+# Transaction bookkeeping, not data access.
+IGNORED_SHAPES = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.I)
+PARAMS_GROUP = re.compile(r"\((?:%s, )*%s\)")
+REPEATED_GROUPS = re.compile(r"\(%s\)(?:, \(%s\))+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Budget:
+    def __init__(self, queries, repeats=None, per_item=0):
+        self.queries = queries
+        self.repeats = repeats
+        self.per_item = per_item
+
+    def limits(self, request):
+        """
+        (max queries, max repeats of one shape) for `request`. Views whose
+        work is proportional to their payload (sync push) declare a
+        `per_item` cost and report the item count with count_items().
+        """
+        repeats = self.repeats if self.repeats is not None else settings.GYM_QUERY_REPEAT_LIMIT
+        if not self.per_item:
+            return self.queries, repeats
+        items = getattr(request, "query_budget_items", 0)
+        return self.queries + self.per_item * items, repeats * max(items, 1)
+
+    def __repr__(self):
+        return f"Budget({self.queries}, repeats={self.repeats}, per_item={self.per_item})"
+
+
+def query_budget(queries=None, *, repeats=None, per_item=0, **actions):
+    """
+    Declare query budgets: per action on a viewset class (merged with the
+    budgets it inherits), or `queries` for every method of a function view.
+    `repeats` raises the N+1 limit for actions that touch the same rows
+    through a fixed number of hooks.
+    """
+    def decorate(view):
+        budgets = {
+            action: Budget(count, repeats, per_item) for action, count in actions.items()
+        }
+        if queries is not None:
+            budgets[ALL_ACTIONS] = Budget(queries, repeats, per_item)
+        view.query_budgets = {**getattr(view, "query_budgets", {}), **budgets}
+        return view
+    return decorate
+
+
+def count_items(request, items):
+    """
+    Report how many items `request` handles, for budgets with a per_item cost.
+    """
+    # Budgets are checked against the Django request a DRF Request wraps.
+    getattr(request, "_request", request).query_budget_items = items
+
+
+def is_budgeted_view(func):
+    """
+    Whether `func` (a resolved view) is one of ours and so needs a budget.
+    """
+    return func.__module__.startswith("gym.")
+
+
+def action_for(func, method):
+    """
+    The viewset action `method` is routed to, ALL_ACTIONS for function
+    views, or None when the view does not handle `method` (OPTIONS, 405s).
+    """
+    method = method.lower()
+    actions = getattr(func, "actions", None)
+    if actions is None:
+        return ALL_ACTIONS
+    if method == "head":
+        method = "get"
+    return actions.get(method)
+
+
+def budget_for(func, action):
+    budgets = getattr(func, "query_budgets", None)
+    if budgets is None:
+        budgets = getattr(getattr(func, "cls", None), "query_budgets", {})
+    return budgets.get(action)
+
+
+def shape(sql):
+    """
+    `sql` with the variable-length parts (IN lists, multi-row VALUES)
+    collapsed, so one statement run for N rows has the same shape as for one.
+    """
+    return REPEATED_GROUPS.sub("(%s)", PARAMS_GROUP.sub("(%s)", sql))
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook keeping the SQL of every query.
+    """
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def data_queries(self):
+        """
+        The queries that count against a budget: savepoints are left out, so
+        wrapping a write in transaction.atomic() costs nothing.
+        """
+        return [sql for sql in self.queries if not IGNORED_SHAPES.match(sql)]
+
+    def repeated(self, limit):
+        shapes = Counter(shape(sql) for sql in self.data_queries)
+        return [(sql, count) for sql, count in shapes.most_common() if count > limit]
+
+
+def check(label, budget, request, recorder):
+    """
+    Raise QueryBudgetExceeded when `recorder` saw more queries than
+    `budget` allows for `request`, or an N+1.
+    """
+    if budget is None:
+        raise QueryBudgetExceeded(
+            f"{label} has no query budget; declare one with @query_budget."
+        )
+    max_queries, max_repeats = budget.limits(request)
+    problems = []
+    count = len(recorder.data_queries)
+    if count > max_queries:
+        problems.append(f"ran {count} queries, budget is {max_queries}")
+    for sql, count in recorder.repeated(max_repeats):
+        problems.append(f"ran this {count} times (limit {max_repeats}): {sql}")
+    if problems:
+        queries = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(recorder.queries, 1))
+        raise QueryBudgetExceeded(
+            f"{label}: " + "; ".join(problems) + f"\nQueries:\n{queries}"
+        )
@@ -0,0 +1,27 @@
+import json
+
+from rest_framework import renderers
+
+
+class StreamRenderer(renderers.BaseRenderer):
+    """
+    Selects a streamed download format via ?format= / Accept. Views that
+    use it return a StreamingHttpResponse themselves, so `render()` only
+    ever sees error payloads, which are written as JSON.
+    """
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(StreamRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(StreamRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
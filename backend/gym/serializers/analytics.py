@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+
+class ProgressRangeQuerySerializer(serializers.Serializer):
+    """
+    Optional inclusive date range shared by the progress endpoints.
+    """
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        since, until = attrs.get("since"), attrs.get("until")
+        if since and until and since > until:
+            raise serializers.ValidationError("`since` must be on or before `until`.")
+        return attrs
+
+
+class ExerciseProgressQuerySerializer(ProgressRangeQuerySerializer):
+    """
+    Query params for GET /api/exercises/{id}/progress/.
+    """
+    bucket = serializers.ChoiceField(choices=["day", "week"], default="week")
@@ -9,10 +9,12 @@ from ..models import (
     ExerciseEvent,
 )
 from .exercises import ExerciseSerializer
+from .fields import OwnedPrimaryKeyRelatedField
 User = get_user_model()
 
 
 class ExerciseEventSerializer(serializers.ModelSerializer):
+    completion = OwnedPrimaryKeyRelatedField(queryset=ExerciseCompletion.objects.all())
     duration_value = serializers.IntegerField(
         required=False, write_only=True
     )
@@ -42,6 +44,14 @@ class ExerciseEventSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["created_at", "updated_at"]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Set by the write endpoints after personal-record detection.
+        new_records = getattr(instance, "new_records", None)
+        if new_records is not None:
+            data["new_records"] = new_records
+        return data
+
     def validate(self, attrs):
         duration_value = attrs.pop("duration_value", None)
         duration_unit = attrs.pop("duration_unit", None)
@@ -56,8 +66,9 @@ class ExerciseEventSerializer(serializers.ModelSerializer):
 
 
 class ExerciseCompletionSerializer(serializers.ModelSerializer):
+    session = OwnedPrimaryKeyRelatedField(queryset=GymSession.objects.all())
     exercise = ExerciseSerializer(read_only=True)
-    exercise_id = serializers.PrimaryKeyRelatedField(
+    exercise_id = OwnedPrimaryKeyRelatedField(
         source="exercise",
         queryset=Exercise.objects.all(),
         write_only=True,
@@ -80,3 +91,34 @@ class ExerciseCompletionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context["request"].user
         return ExerciseCompletion.objects.create(user=user, **validated_data)
+
+
+class ExerciseEventBulkOpSerializer(ExerciseEventSerializer):
+    """
+    One operation in POST /api/exercise-completions/{id}/events/bulk/.
+    Events are addressed by `order_index` within the completion.
+    """
+    OPS = ["create", "update", "delete"]
+
+    op = serializers.ChoiceField(choices=OPS)
+    order_index = serializers.IntegerField(min_value=0)
+
+    class Meta(ExerciseEventSerializer.Meta):
+        fields = ["op"] + [
+            f for f in ExerciseEventSerializer.Meta.fields
+            if f not in ("id", "completion", "created_at", "updated_at")
+        ]
+
+
+class ExerciseEventBulkSerializer(serializers.ListSerializer):
+    child = ExerciseEventBulkOpSerializer()
+
+    def validate(self, attrs):
+        seen = set()
+        for op in attrs:
+            if op["order_index"] in seen:
+                raise serializers.ValidationError(
+                    f"order_index {op['order_index']} appears more than once."
+                )
+            seen.add(op["order_index"])
+        return attrs
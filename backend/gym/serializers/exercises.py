@@ -3,22 +3,25 @@
 from rest_framework import serializers
 from ..models import Exercise, MuscleGroup, Tag
 from .categories import MuscleGroupMiniSerializer, TagMiniSerializer
+from .fields import OwnedPrimaryKeyRelatedField
 
 
 class ExerciseSerializer(serializers.ModelSerializer):
     muscle_groups = MuscleGroupMiniSerializer(many=True, read_only=True)
     tags = TagMiniSerializer(many=True, read_only=True)
 
-    muscle_group_ids = serializers.PrimaryKeyRelatedField(
+    muscle_group_ids = OwnedPrimaryKeyRelatedField(
         many=True,
+        allow_global=True,
         write_only=True,
         queryset=MuscleGroup.objects.all(),
         required=False,
         source="muscle_groups",
     )
 
-    tag_ids = serializers.PrimaryKeyRelatedField(
+    tag_ids = OwnedPrimaryKeyRelatedField(
         many=True,
+        allow_global=True,
         write_only=True,
         queryset=Tag.objects.all(),
         required=False,
@@ -0,0 +1,110 @@
+# serializers/fast.py
+"""
+values()-based read paths for high-volume event data.
+
+ExerciseEventSerializer builds a model instance per row and sends every
+value through DRF field objects, which dominates the CPU cost of large
+event lists. These helpers read plain tuples with values_list() and format
+them with the same rules DRF applies (decimals quantized to the column's
+places as strings, datetimes in the current timezone as ISO 8601 with "Z"
+for UTC), so the JSON is identical to ExerciseEventSerializer's. Read-only.
+"""
+from decimal import Decimal
+
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+
+from .. import metrics
+
+# (output key, values_list() column), in ExerciseEventSerializer field order
+# with the write-only fields left out.
+EVENT_COLUMNS = [
+    ("id", "id"),
+    ("completion", "completion_id"),
+    ("order_index", "order_index"),
+    ("reps", "reps"),
+    ("duration_seconds", "duration_seconds"),
+    ("weight", "weight"),
+    ("distance", "distance"),
+    ("resistance_string", "resistance_string"),
+    ("resistance_numeric", "resistance_numeric"),
+    ("note", "note"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+
+
+def decimal_formatter(decimal_places):
+    quantum = Decimal(1).scaleb(-decimal_places)
+
+    def to_string(value):
+        return None if value is None else f"{value.quantize(quantum):f}"
+    return to_string
+
+
+def datetime_formatter():
+    tz = timezone.get_current_timezone()
+
+    def to_string(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+    return to_string
+
+
+def _field(model, path):
+    *relations, name = path.split(LOOKUP_SEP)
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def formatters(model, columns):
+    """
+    Per-column formatter (or None when the raw value is already JSON-safe)
+    for values_list() `columns` of `model`, which may span relations.
+    """
+    to_datetime = datetime_formatter()
+    result = []
+    for column in columns:
+        field = _field(model, column)
+        if field.get_internal_type() == "DecimalField":
+            result.append(decimal_formatter(field.decimal_places))
+        elif field.get_internal_type() == "DateTimeField":
+            result.append(to_datetime)
+        else:
+            result.append(None)
+    return result
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    """
+    Yield one dict per row for `columns` [(output key, values_list column)],
+    streamed with iterator() so memory stays flat.
+    """
+    keys = [key for key, _ in columns]
+    lookups = [column for _, column in columns]
+    converted = [
+        (i, fmt) for i, fmt in enumerate(formatters(queryset.model, lookups)) if fmt is not None
+    ]
+    for row in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+        row = list(row)
+        for i, fmt in converted:
+            row[i] = fmt(row[i])
+        yield dict(zip(keys, row))
+
+
+def iter_event_rows(queryset):
+    """
+    Yield ExerciseEventSerializer-identical dicts for an ExerciseEvent
+    queryset, without instantiating models.
+    """
+    return iter_rows(queryset, EVENT_COLUMNS)
+
+
+def event_rows(queryset):
+    with metrics.serializing():
+        return list(iter_event_rows(queryset))
@@ -0,0 +1,87 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from ..services import defaults
+
+
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that only accepts rows owned by the requesting
+    user -- plus the shared rows (user=None) when `allow_global` -- so ids
+    of other users' rows are rejected as "does not exist".
+
+    With many=True every submitted id is resolved by one `pk IN (...)`
+    query (see OwnedManyRelatedField). Shared default tags and muscle
+    groups come from the process-local cache and cost no query at all.
+    """
+
+    def __init__(self, allow_global=False, **kwargs):
+        self.allow_global = allow_global
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return OwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            return queryset.none()
+        if self.allow_global:
+            return queryset.filter(Q(user=user) | Q(user__isnull=True))
+        return queryset.filter(user=user)
+
+    def to_pk(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+    def cached(self, pk):
+        if not self.allow_global:
+            return None
+        model = self.get_queryset().model
+        return defaults.get(model, pk) if model in defaults.MODELS else None
+
+    def to_internal_value(self, data):
+        return self.resolve([data])[0]
+
+    def resolve(self, values):
+        """
+        Rows for the submitted `values`, in order, with one query for
+        whatever the defaults cache doesn't hold.
+        """
+        pks = [self.to_pk(value) for value in values]
+        found = {}
+        for pk in pks:
+            row = self.cached(pk)
+            if row is not None:
+                found[pk] = row
+        missing = {pk for pk in pks if pk not in found}
+        if missing:
+            found.update(
+                (row.pk, row) for row in self.get_queryset().filter(pk__in=missing)
+            )
+        for pk in pks:
+            if pk not in found:
+                self.fail("does_not_exist", pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class OwnedManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        return self.child_relation.resolve(data)
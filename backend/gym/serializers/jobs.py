@@ -0,0 +1,50 @@
+# serializers/jobs.py
+from django.urls import reverse
+from rest_framework import serializers
+
+from ..models import Job
+from ..services import importer
+
+
+class JobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "payload",
+            "progress",
+            "result",
+            "error",
+            "attempts",
+            "max_attempts",
+            "run_after",
+            "started_at",
+            "finished_at",
+            "download_url",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.kind != "export" or obj.status != Job.SUCCEEDED:
+            return None
+        return reverse("job-download", args=[obj.pk])
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """
+    POST /api/jobs/ body. Imports are multipart with the file under "file".
+    """
+    kind = serializers.ChoiceField(choices=["import", "export", "rebuild"])
+    format = serializers.ChoiceField(choices=importer.FORMATS, required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if attrs["kind"] == "import" and "file" not in attrs:
+            raise serializers.ValidationError({"file": "This field is required."})
+        return attrs
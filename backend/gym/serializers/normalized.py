@@ -0,0 +1,122 @@
+# serializers/normalized.py
+"""
+?shape=normalized session payloads.
+
+Sessions reference exercises and locations by id; every exercise, muscle
+group, tag and location appears once in a side-loaded map keyed by id.
+Events and completions leave out their back-reference to the parent, and
+null or blank fields are omitted throughout (absent means empty).
+
+    {
+        "sessions": [{..., "location": 3, "exercise_completions": [
+            {"id": 9, "exercise": 4, "events": [{"id": 1, "reps": 5, ...}]}
+        ]}],
+        "exercises": {"4": {..., "muscle_groups": [1], "tags": [2]}},
+        "muscle_groups": {"1": {...}},
+        "tags": {"2": {...}},
+        "locations": {"3": {...}},
+    }
+
+Single-session endpoints return "session": {...} instead of "sessions".
+
+Expects sessions loaded with views.sessions.session_tree_prefetches().
+"""
+from rest_framework import serializers
+
+from ..models import Exercise, ExerciseCompletion, ExerciseEvent, GymSession
+from .categories import MuscleGroupMiniSerializer, TagMiniSerializer
+from .exercises import ExerciseSerializer
+from .locations import UserLocationSerializer
+
+
+class CompactSerializerMixin:
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        return {key: value for key, value in data.items() if value not in (None, "")}
+
+
+class NormalizedExerciseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Exercise
+        fields = [
+            f for f in ExerciseSerializer.Meta.fields
+            if f not in ("muscle_group_ids", "tag_ids")
+        ]
+        read_only_fields = fields
+
+
+class NormalizedEventSerializer(CompactSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ExerciseEvent
+        fields = [
+            "id",
+            "order_index",
+            "reps",
+            "duration_seconds",
+            "weight",
+            "distance",
+            "resistance_string",
+            "resistance_numeric",
+            "note",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class NormalizedCompletionSerializer(CompactSerializerMixin, serializers.ModelSerializer):
+    events = NormalizedEventSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ExerciseCompletion
+        fields = ["id", "exercise", "note", "events", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class NormalizedSessionSerializer(CompactSerializerMixin, serializers.ModelSerializer):
+    exercise_completions = NormalizedCompletionSerializer(many=True, read_only=True)
+    is_open = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = GymSession
+        fields = [
+            "id",
+            "start_time",
+            "end_time",
+            "is_open",
+            "note",
+            "location",
+            "exercise_completions",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+def _by_id(serializer_class, objs):
+    return {str(obj.pk): serializer_class(obj).data for obj in objs.values()}
+
+
+def normalize_sessions(sessions):
+    """
+    Serialize `sessions` in the normalized shape (see module docstring).
+    """
+    exercises, muscle_groups, tags, locations = {}, {}, {}, {}
+    for session in sessions:
+        if session.location is not None:
+            locations[session.location.pk] = session.location
+        for completion in session.exercise_completions.all():
+            exercise = completion.exercise
+            if exercise.pk in exercises:
+                continue
+            exercises[exercise.pk] = exercise
+            muscle_groups.update((group.pk, group) for group in exercise.muscle_groups.all())
+            tags.update((tag.pk, tag) for tag in exercise.tags.all())
+
+    return {
+        "sessions": NormalizedSessionSerializer(sessions, many=True).data,
+        "exercises": _by_id(NormalizedExerciseSerializer, exercises),
+        "muscle_groups": _by_id(MuscleGroupMiniSerializer, muscle_groups),
+        "tags": _by_id(TagMiniSerializer, tags),
+        "locations": _by_id(UserLocationSerializer, locations),
+    }
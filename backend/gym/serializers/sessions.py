@@ -12,14 +12,15 @@ from ..models import (
 )
 
 from .events import ExerciseCompletionSerializer
+from .fields import OwnedPrimaryKeyRelatedField
 User = get_user_model()
 
 
 class GymSessionSerializer(serializers.ModelSerializer):
     location = UserLocationSerializer(read_only=True)
-    location_id = serializers.PrimaryKeyRelatedField(
+    location_id = OwnedPrimaryKeyRelatedField(
         source="location",
-        queryset=UserLocation.objects.all(), 
+        queryset=UserLocation.objects.all(),
         write_only=True,
         allow_null=True,
         required=False,
@@ -45,11 +46,47 @@ class GymSessionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["created_at", "updated_at", "is_open"]
         
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        request = self.context.get("request")
-        if request and request.user and request.user.is_authenticated:
-            # Limit to locations owned by current user
-            self.fields["location_id"].queryset = UserLocation.objects.for_user(
-                request.user
-            )
+
+class GymSessionSummarySerializer(serializers.ModelSerializer):
+    """
+    Slim session representation for history lists: counts and totals
+    instead of the nested completion/event tree.
+    Expects a queryset annotated with GymSession.objects.with_summary().
+    """
+    location = UserLocationSerializer(read_only=True)
+    is_open = serializers.BooleanField(read_only=True)
+    exercise_count = serializers.IntegerField(read_only=True)
+    set_count = serializers.IntegerField(read_only=True)
+    total_reps = serializers.IntegerField(read_only=True)
+    total_volume = serializers.DecimalField(
+        max_digits=14, decimal_places=2, read_only=True
+    )
+    total_distance = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+    total_duration_seconds = serializers.IntegerField(read_only=True)
+    elapsed_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GymSession
+        fields = [
+            "id",
+            "start_time",
+            "end_time",
+            "is_open",
+            "note",
+            "location",
+            "exercise_count",
+            "set_count",
+            "total_reps",
+            "total_volume",
+            "total_distance",
+            "total_duration_seconds",
+            "elapsed_seconds",
+        ]
+        read_only_fields = fields
+
+    def get_elapsed_seconds(self, obj):
+        if obj.elapsed is None:
+            return None
+        return int(obj.elapsed.total_seconds())
@@ -0,0 +1,75 @@
+# gym/serializers/sync.py
+"""
+Flat row shapes for the sync change feed: foreign keys and M2M links are
+plain ids, so the client can store each type in its own table.
+"""
+from rest_framework import serializers
+from ..models import (
+    MuscleGroup,
+    Tag,
+    Exercise,
+    GymSession,
+    ExerciseCompletion,
+    ExerciseEvent,
+    UserLocation,
+)
+
+
+class SyncRowSerializer(serializers.ModelSerializer):
+    client_id = serializers.UUIDField(read_only=True)
+
+    class Meta:
+        exclude = ["user"]
+
+
+class SyncLocationSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = UserLocation
+
+
+class SyncMuscleGroupSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = MuscleGroup
+
+
+class SyncTagSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = Tag
+
+
+class SyncExerciseSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = Exercise
+        exclude = ["user", "search_text", "last_completed_at"]
+
+
+class SyncSessionSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = GymSession
+
+
+class SyncCompletionSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = ExerciseCompletion
+
+
+class SyncEventSerializer(SyncRowSerializer):
+    class Meta(SyncRowSerializer.Meta):
+        model = ExerciseEvent
+        exclude = []
+
+
+class SyncOperationSerializer(serializers.Serializer):
+    """
+    One client-side operation in POST /api/sync/push/.
+    """
+    TYPES = ["location", "muscle_group", "tag", "exercise", "session", "completion", "event"]
+
+    type = serializers.ChoiceField(choices=TYPES)
+    op = serializers.ChoiceField(choices=["upsert", "delete"])
+    client_id = serializers.UUIDField()
+    data = serializers.DictField(required=False, default=dict)
+
+
+class SyncPushSerializer(serializers.Serializer):
+    operations = SyncOperationSerializer(many=True)
@@ -0,0 +1,111 @@
+"""
+Progress analytics for charts.
+
+Series are read only from the rollup tables maintained by
+gym.services.rollups -- never from raw events -- so a chart costs one
+small GROUP BY no matter how much history the user has. Exercise metrics
+are only reported when the exercise tracks the inputs they need (see
+Exercise.track_* flags).
+"""
+from decimal import Decimal
+
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncWeek
+
+from ..models import ExerciseDailyRollup, MuscleGroupWeeklyRollup
+
+TWO_PLACES = Decimal("0.01")
+
+
+def tracked_metrics(exercise):
+    """
+    Map metric name -> how daily rollups combine into a bucket, honouring
+    the exercise's track_* flags.
+    """
+    metrics = {"set_count": Sum("set_count")}
+    if exercise.track_reps:
+        metrics["total_reps"] = Sum("total_reps")
+    if exercise.track_weight:
+        metrics["top_set_weight"] = Max("top_set_weight")
+    if exercise.track_reps and exercise.track_weight:
+        metrics["total_volume"] = Sum("total_volume")
+        metrics["estimated_1rm"] = Max("estimated_1rm")
+    if exercise.track_distance:
+        metrics["total_distance"] = Sum("total_distance")
+    if exercise.track_duration:
+        metrics["total_duration_seconds"] = Sum("total_duration_seconds")
+    return metrics
+
+
+MUSCLE_GROUP_METRICS = [
+    "set_count",
+    "total_reps",
+    "total_volume",
+    "total_distance",
+    "total_duration_seconds",
+]
+
+
+def _to_json(value):
+    if isinstance(value, (Decimal, float)):
+        return str(Decimal(value).quantize(TWO_PLACES))
+    return value
+
+
+def _point(period, row, metrics):
+    if hasattr(period, "date"):
+        period = period.date()
+    return {"period": period.isoformat(), **{m: _to_json(row[m]) for m in metrics}}
+
+
+def exercise_progress(user, exercise, bucket="week", since=None, until=None):
+    """
+    Time series for one exercise: one row per day or ISO week with at least
+    one event, oldest first. `since`/`until` are inclusive dates.
+    """
+    metrics = tracked_metrics(exercise)
+    rollups = ExerciseDailyRollup.objects.filter(user=user, exercise=exercise)
+    if since:
+        rollups = rollups.filter(day__gte=since)
+    if until:
+        rollups = rollups.filter(day__lte=until)
+
+    if bucket == "day":
+        rows = rollups.order_by("day").values("day", *metrics)
+        series = [_point(row["day"], row, metrics) for row in rows]
+    else:
+        rows = (
+            rollups
+            .order_by()
+            .annotate(period=TruncWeek("day"))
+            .values("period")
+            .annotate(**metrics)
+            .order_by("period")
+        )
+        series = [_point(row["period"], row, metrics) for row in rows]
+
+    return {
+        "exercise": exercise.id,
+        "bucket": bucket,
+        "metrics": list(metrics),
+        "series": series,
+    }
+
+
+def muscle_group_progress(user, muscle_group, since=None, until=None):
+    """
+    Weekly series of training volume for one muscle group across every
+    exercise that works it.
+    """
+    rollups = MuscleGroupWeeklyRollup.objects.filter(user=user, muscle_group=muscle_group)
+    if since:
+        rollups = rollups.filter(week__gte=since)
+    if until:
+        rollups = rollups.filter(week__lte=until)
+    rows = rollups.order_by("week").values("week", *MUSCLE_GROUP_METRICS)
+    return {
+        "muscle_group": muscle_group.id,
+        "bucket": "week",
+        "metrics": MUSCLE_GROUP_METRICS,
+        "series": [_point(row["week"], row, MUSCLE_GROUP_METRICS) for row in rows],
+    }
@@ -0,0 +1,20 @@
+"""
+Per-user cache of the GET /api/bootstrap/ payload.
+
+The payload holds the catalog (covered by the catalog versions) plus the
+user's profile, sessions and locations, which move a per-user "history"
+version instead: session and location saves/deletes and profile saves bump
+it through gym.signals, event writes through history.changed(), and bulk
+session updates where they happen (services.sessions).
+"""
+from . import catalog_cache
+
+HISTORY = "history"
+
+
+def bump(user_id):
+    catalog_cache.bump(user_id, space=HISTORY)
+
+
+def cache_key(user_id, query_params):
+    return catalog_cache.response_key(user_id, "bootstrap", query_params, spaces=[HISTORY])
@@ -0,0 +1,135 @@
+"""
+Per-user cache of serialized catalog responses (tags, muscle groups,
+exercises).
+
+Every owner has a version number -- one per user plus one for the shared
+default rows. Entries are keyed by both versions that apply to the
+requesting user, so bumping a version (on any catalog write, see
+gym.signals) orphans every entry built from the old data; nothing is
+deleted explicitly.
+
+Versions live in the database (CacheVersion), not the cache, so a bump
+from any process -- a web worker, `run_worker`, `seed_defaults` -- is
+seen by all of them. A bump takes effect once the transaction it was made
+in commits, so no reader keys entries on a version whose rows it cannot
+see yet. They live in named spaces: "catalog" for the rows above, and
+others for payloads that depend on more than the catalog (see
+gym.services.bootstrap).
+"""
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from rest_framework.utils.encoders import JSONEncoder
+
+from ..models import CacheVersion
+
+CATALOG = "catalog"
+# owner_id of the shared default rows.
+GLOBAL = 0
+
+
+def _fresh_version():
+    # A row created after the cache was filled must not reuse the version
+    # (0, for "no row yet") old entries and ETags were built from.
+    return time.time_ns()
+
+
+def _read(keys):
+    """
+    {(space, owner_id): version} for `keys`, in one query; 0 when the
+    owner has never been bumped.
+    """
+    query = Q()
+    for space, owner_id in keys:
+        query |= Q(space=space, owner_id=owner_id)
+    found = {
+        (space, owner_id): version
+        for space, owner_id, version in CacheVersion.objects.filter(query).values_list(
+            "space", "owner_id", "version"
+        )
+    }
+    return {key: found.get(key, 0) for key in keys}
+
+
+def version(owner_id, space=CATALOG):
+    """
+    Current version of `owner_id`'s catalog rows (the default rows when None).
+    """
+    key = (space, owner_id or GLOBAL)
+    return _read([key])[key]
+
+
+def versions(user_id, *spaces):
+    """
+    (default rows version, user version, *user versions in `spaces`) for
+    `user_id`, in one query.
+    """
+    keys = [(CATALOG, GLOBAL), (CATALOG, user_id), *((space, user_id) for space in spaces)]
+    found = _read(keys)
+    return tuple(found[key] for key in keys)
+
+
+# Bumps waiting for the current transaction to commit, per thread (like
+# the database connection they belong to). Those of a rolled-back
+# transaction go out with the next commit, which only invalidates early.
+_pending = threading.local()
+
+
+def _flush():
+    keys = getattr(_pending, "keys", None)
+    if not keys:
+        return
+    _pending.keys = set()
+    # In a fixed order, so concurrent flushes lock the rows alike.
+    for space, owner_id in sorted(keys):
+        rows = CacheVersion.objects.filter(space=space, owner_id=owner_id)
+        if not rows.update(version=F("version") + 1):
+            CacheVersion.objects.bulk_create(
+                [CacheVersion(space=space, owner_id=owner_id, version=_fresh_version())],
+                ignore_conflicts=True,
+            )
+
+
+def bump(owner_id, space=CATALOG):
+    """
+    Invalidate every cached catalog response built from `owner_id`'s rows
+    (the default rows, for every user, when None) once the current
+    transaction commits (right away outside one), once however often it
+    is bumped.
+    """
+    if not hasattr(_pending, "keys"):
+        _pending.keys = set()
+    _pending.keys.add((space, owner_id or GLOBAL))
+    transaction.on_commit(_flush)
+
+
+def response_key(user_id, scope, query_params, spaces=()):
+    """
+    Cache key for `scope`'s response to `query_params`, built from the
+    catalog versions and those of any other `spaces` the payload covers.
+    """
+    current = ":".join(str(v) for v in versions(user_id, *spaces))
+    query = urlencode(sorted(query_params.lists()), doseq=True)
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f"gym:catalog:{scope}:{user_id}:{current}:{digest}"
+
+
+def get(key):
+    """
+    (etag, data) cached under `key`, or None.
+    """
+    return cache.get(key)
+
+
+def store(key, data):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    entry = (hashlib.md5(body.encode()).hexdigest(), data)
+    cache.set(key, entry, settings.GYM_CATALOG_CACHE_TIMEOUT)
+    return entry
@@ -0,0 +1,70 @@
+"""
+Process-local cache of the shared default tags and muscle groups
+(user=None, created by seed_defaults).
+
+Each process loads the rows on first use and keeps them, read-only, until
+the default-rows catalog version moves (see gym.services.catalog_cache).
+seed_defaults bumps it, as does any save or delete of a default row. The
+version is in the database, so it is checked once per request (or job)
+rather than on every lookup; `expire()` starts that over.
+"""
+from types import MappingProxyType
+
+from ..models import MuscleGroup, Tag
+from . import catalog_cache
+
+MODELS = (MuscleGroup, Tag)
+
+# model -> (version, rows, rows by pk)
+_loaded = {}
+# The default rows' version, once checked in this request; None to check.
+_checked = None
+
+
+def expire(**kwargs):
+    """
+    Check the version again on the next lookup (connected to
+    request_started, see gym.signals).
+    """
+    global _checked
+    _checked = None
+
+
+def _load(model):
+    global _checked
+    # Read the version before the rows: the rows can only be newer.
+    if _checked is None:
+        _checked = catalog_cache.version(None)
+    version = _checked
+    entry = _loaded.get(model)
+    if entry is None or entry[0] != version:
+        rows = tuple(model.objects.filter(user__isnull=True).order_by("name"))
+        entry = (version, rows, MappingProxyType({row.pk: row for row in rows}))
+        _loaded[model] = entry
+    return entry
+
+
+def rows(model):
+    """
+    The default rows of `model` ordered by name. Do not modify them.
+    """
+    return _load(model)[1]
+
+
+def get(model, pk):
+    """
+    The default row of `model` with primary key `pk`, or None.
+    """
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return _load(model)[2].get(pk)
+
+
+def bump():
+    """
+    Make every process reload the default rows.
+    """
+    catalog_cache.bump(None)
+    expire()
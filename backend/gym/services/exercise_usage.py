@@ -0,0 +1,77 @@
+"""
+Exercise.last_completed_at: when the exercise was last added to a session.
+
+The exercise list sorts and displays this on every picker open, so it is
+stored on Exercise instead of aggregating completions per request. New
+completions bump it (see gym.signals); deleting or moving the latest
+completion recomputes it from the (user, exercise, created_at) index.
+`reconcile()` recomputes everything, e.g. after bulk writes that bypass
+signals.
+"""
+from django.db.models import F, OuterRef, Q, Subquery
+
+from ..models import Exercise, ExerciseCompletion
+
+
+def _latest_completion():
+    return Subquery(
+        ExerciseCompletion.objects
+        .filter(user_id=OuterRef("user_id"), exercise_id=OuterRef("pk"))
+        .order_by("-created_at")
+        .values("created_at")[:1]
+    )
+
+
+def touch(completion):
+    """
+    Account for a new (or moved) completion.
+    """
+    Exercise.objects.filter(pk=completion.exercise_id).filter(
+        Q(last_completed_at__isnull=True) | Q(last_completed_at__lt=completion.created_at)
+    ).update(last_completed_at=completion.created_at)
+
+
+def forget(completion, exercise_id=None):
+    """
+    Account for a completion deleted from (or moved off) an exercise.
+    Only recomputes when it was the latest one.
+    """
+    Exercise.objects.filter(
+        pk=exercise_id or completion.exercise_id,
+        last_completed_at__lte=completion.created_at,
+    ).update(last_completed_at=_latest_completion())
+
+
+def forget_many(completions):
+    """
+    forget() for several deleted completions (a session's) in one UPDATE.
+    """
+    latest = {}
+    for completion in completions:
+        latest[completion.exercise_id] = max(
+            completion.created_at, latest.get(completion.exercise_id, completion.created_at)
+        )
+    if not latest:
+        return
+    match = Q()
+    for exercise_id, created_at in latest.items():
+        match |= Q(pk=exercise_id, last_completed_at__lte=created_at)
+    Exercise.objects.filter(match).update(last_completed_at=_latest_completion())
+
+
+def reconcile(user_ids=None):
+    """
+    Recompute last_completed_at from the completions table, for everyone
+    or just `user_ids`. Returns the number of exercises corrected.
+    """
+    exercises = Exercise.objects.all()
+    if user_ids is not None:
+        exercises = exercises.filter(user_id__in=user_ids)
+    stale = exercises.alias(actual=_latest_completion()).filter(
+        ~Q(last_completed_at=F("actual"))
+        | Q(last_completed_at__isnull=True, actual__isnull=False)
+        | Q(last_completed_at__isnull=False, actual__isnull=True)
+    )
+    return Exercise.objects.filter(pk__in=list(stale.values_list("pk", flat=True))).update(
+        last_completed_at=_latest_completion()
+    )
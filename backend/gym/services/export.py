@@ -0,0 +1,108 @@
+"""
+Full training-history export.
+
+One row per event over the flat join event -> completion -> session /
+exercise, oldest session first, read with a server-side cursor in chunks
+and encoded as it goes -- memory stays flat however long the history is.
+Completions without events are not exported.
+"""
+import csv
+import json
+import zlib
+
+from ..models import ExerciseEvent
+from ..serializers.fast import iter_rows
+
+# (column header, values_list() lookup from ExerciseEvent)
+EXPORT_COLUMNS = [
+    ("session_id", "completion__session_id"),
+    ("session_start", "completion__session__start_time"),
+    ("session_end", "completion__session__end_time"),
+    ("location", "completion__session__location__name"),
+    ("completion_id", "completion_id"),
+    ("exercise_id", "completion__exercise_id"),
+    ("exercise", "completion__exercise__name"),
+    ("set", "order_index"),
+    ("reps", "reps"),
+    ("weight", "weight"),
+    ("distance", "distance"),
+    ("duration_seconds", "duration_seconds"),
+    ("resistance_numeric", "resistance_numeric"),
+    ("resistance_string", "resistance_string"),
+    ("note", "note"),
+    ("logged_at", "created_at"),
+]
+
+CHUNK_SIZE = 2000
+# Rows encoded per yielded chunk of the response body.
+ROWS_PER_CHUNK = 500
+
+
+def history_rows(user):
+    events = (
+        ExerciseEvent.objects
+        .filter(completion__user=user)
+        .order_by(
+            "completion__session__start_time",
+            "completion__session_id",
+            "completion__created_at",
+            "completion_id",
+            "order_index",
+            "created_at",
+        )
+    )
+    return iter_rows(events, EXPORT_COLUMNS, chunk_size=CHUNK_SIZE)
+
+
+class _Line:
+    """
+    File-like object csv.writer writes into; returns the line instead.
+    """
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield "".join(batch).encode()
+            batch = []
+    if batch:
+        yield "".join(batch).encode()
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Line())
+    headers = [key for key, _ in EXPORT_COLUMNS]
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(["" if value is None else value for value in row.values()])
+    return _batched(lines())
+
+
+def iter_ndjson(rows):
+    return _batched(json.dumps(row) + "\n" for row in rows)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+ENCODERS = {"csv": iter_csv, "ndjson": iter_ndjson}
+
+
+def stream(user, fmt, gzip=False):
+    """
+    Byte chunks of `user`'s history as `fmt` ("csv" or "ndjson").
+    """
+    chunks = ENCODERS[fmt](history_rows(user))
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,81 @@
+"""
+Single entry point for "training history changed" bookkeeping.
+
+Views collect the (user_id, exercise_id, day) cells a write touches --
+before deleting or moving anything -- and pass them to `changed()`, which
+fans out to every derived table that depends on event history.
+"""
+from . import bootstrap, catalog_cache, exercise_usage, last_completions, records, rollups
+from ..models import ExerciseEvent, GymSession
+
+
+def touched_by_events(events):
+    return rollups.touched_by(events)
+
+
+def touched_by_completions(completion_ids):
+    return rollups.touched_by(ExerciseEvent.objects.filter(completion_id__in=completion_ids))
+
+
+def touched_by_sessions(session_ids):
+    return rollups.touched_by(
+        ExerciseEvent.objects.filter(completion__session_id__in=session_ids)
+    )
+
+
+def touched_by_event(event, exercise_id=None):
+    completion = event.completion
+    return {
+        (
+            completion.user_id,
+            exercise_id or completion.exercise_id,
+            rollups.event_day(event),
+        )
+    }
+
+
+def in_closed_session(*completions):
+    """
+    Whether any of `completions` belongs to a closed session. Only those
+    count as "last time", so writes to an open session's sets cannot change
+    it and skip that refresh (pass the result as `last_completion`).
+    """
+    return GymSession.objects.filter(
+        pk__in={completion.session_id for completion in completions},
+        end_time__isnull=False,
+    ).exists()
+
+
+def changed(touched, last_completion=True, personal_records=True):
+    """
+    Refresh everything derived from the touched cells. Pass
+    `last_completion=False` when "last time" cannot have changed -- only
+    event values changed, or only open sessions were touched -- and
+    `personal_records=False` when the caller already maintained records
+    through the per-event fast path.
+    """
+    touched = set(touched)
+    if not touched:
+        return
+    for user_id in {user_id for user_id, _, _ in touched}:
+        bootstrap.bump(user_id)
+    pairs = {(user_id, exercise_id) for user_id, exercise_id, _ in touched}
+    if last_completion:
+        last_completions.refresh_pairs(pairs)
+    if personal_records:
+        records.recompute_pairs(pairs)
+    rollups.refresh(touched)
+
+
+def rebuild(user_ids):
+    """
+    Recompute every derived table for `user_ids` from scratch, for writes
+    that bypassed `changed()` (bulk imports, repairs).
+    """
+    last_completions.rebuild(user_ids)
+    rollups.rebuild(user_ids)
+    records.rebuild(user_ids)
+    exercise_usage.reconcile(user_ids)
+    for user_id in user_ids:
+        catalog_cache.bump(user_id)
+        bootstrap.bump(user_id)
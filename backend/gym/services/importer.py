@@ -0,0 +1,434 @@
+"""
+Bulk import of training history from CSV or NDJSON (optionally gzipped).
+
+The format is the one gym.services.export writes -- one row per set -- so
+an export imports back as-is. Only `session_start` and `exercise` are
+required; optional `tags` / `muscle_groups` columns (";"-separated names)
+are applied to exercises the import creates. Exercises, locations, tags
+and muscle groups are matched by name (case-insensitively) within the
+user's catalog and the shared defaults, and created when missing.
+
+Rows are parsed as a stream and written in chunks, each in its own
+transaction, with bulk_create. Every imported session, completion and set
+gets a client_id derived from the user and the row's source keys, so
+re-running the same file inserts nothing new. Derived tables (last
+completions, rollups, records) are rebuilt for the user at the end.
+"""
+import csv
+import gzip
+import io
+import json
+import uuid
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseEvent,
+    GymSession,
+    MuscleGroup,
+    Tag,
+    UserLocation,
+)
+from . import history
+
+# Namespace for the client_ids of imported rows.
+IMPORT_NAMESPACE = uuid.UUID("5f0b6a8e-3c1d-4f7a-9d2e-8b4c6a1e7f30")
+
+CHUNK_ROWS = 5000
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ["csv", "ndjson"]
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+class ImportTooLarge(ImportFileError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _guess_format(name, head):
+    name = (name or "").lower().removesuffix(".gz")
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return "ndjson" if head.lstrip().startswith(b"{") else "csv"
+
+
+def read_rows(stream, fmt=None, name=None):
+    """
+    Iterate the raw rows (dicts) of a binary file-like object, lazily.
+    Gzip is detected from the content.
+    """
+    if not hasattr(stream, "peek"):
+        stream = io.BufferedReader(stream)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = io.BufferedReader(gzip.GzipFile(fileobj=stream))
+    fmt = fmt or _guess_format(name, stream.peek(64))
+    if fmt not in FORMATS:
+        raise ImportFileError(f"Unsupported format {fmt!r}.")
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        return csv.DictReader(text)
+    # Lines are decoded in parse_row() so a bad line only skips that row.
+    return (line for line in text if line.strip())
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _text(raw, key):
+    value = raw.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _datetime(raw, key):
+    value = _text(raw, key)
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ImportFileError(f"{key}: invalid datetime {value!r}.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _validated(key, field, value):
+    # The limits the database would enforce on insert (sign, size, digits),
+    # checked here so they reject the row rather than the whole chunk.
+    try:
+        field.run_validators(value)
+    except ValidationError as exc:
+        raise ImportFileError(f"{key}: {' '.join(exc.messages)}")
+    return value
+
+
+def _int(raw, key, field):
+    value = _text(raw, key)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ImportFileError(f"{key}: invalid integer {value!r}.")
+    return _validated(key, field, value)
+
+
+def _decimal(raw, key, field):
+    value = _text(raw, key)
+    if value is None:
+        return None
+    try:
+        value = Decimal(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+    except InvalidOperation:
+        raise ImportFileError(f"{key}: invalid number {value!r}.")
+    return _validated(key, field, value)
+
+
+_event_field = ExerciseEvent._meta.get_field
+
+
+def _names(raw, key):
+    value = raw.get(key)
+    if isinstance(value, list):
+        names = value
+    else:
+        names = (_text(raw, key) or "").split(";")
+    return [str(name).strip() for name in names if str(name).strip()]
+
+
+def parse_row(raw):
+    """
+    Validate one raw row into the values the importer writes.
+    """
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise ImportFileError("Invalid JSON.")
+    if not isinstance(raw, dict):
+        raise ImportFileError("Row is not an object.")
+    session_start = _datetime(raw, "session_start")
+    exercise = _text(raw, "exercise")
+    if session_start is None:
+        raise ImportFileError("session_start is required.")
+    if exercise is None:
+        raise ImportFileError("exercise is required.")
+    return {
+        "session_key": _text(raw, "session_id") or session_start.isoformat(),
+        "session_start": session_start,
+        "session_end": _datetime(raw, "session_end"),
+        "location": _text(raw, "location"),
+        "completion_key": _text(raw, "completion_id") or exercise.casefold(),
+        "exercise": exercise,
+        "tags": _names(raw, "tags"),
+        "muscle_groups": _names(raw, "muscle_groups"),
+        "set": _int(raw, "set", _event_field("order_index")),
+        "reps": _int(raw, "reps", _event_field("reps")),
+        "weight": _decimal(raw, "weight", _event_field("weight")),
+        "distance": _decimal(raw, "distance", _event_field("distance")),
+        "duration_seconds": _int(raw, "duration_seconds", _event_field("duration_seconds")),
+        "resistance_numeric": _decimal(raw, "resistance_numeric", _event_field("resistance_numeric")),
+        "resistance_string": _validated(
+            "resistance_string", _event_field("resistance_string"), _text(raw, "resistance_string")
+        ),
+        "note": _text(raw, "note") or "",
+        "logged_at": _datetime(raw, "logged_at"),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _by_name(queryset, user):
+    """
+    casefolded name -> row, the user's own rows winning over defaults.
+    """
+    rows = {}
+    for row in queryset:
+        key = row.name.casefold()
+        if key not in rows or row.user_id == user.pk:
+            rows[key] = row
+    return rows
+
+
+class Importer:
+    def __init__(self, user, chunk_rows=CHUNK_ROWS, progress=None, max_rows=None):
+        self.user = user
+        # Over `max_rows` the import stops before its first chunk is written.
+        self.chunk_rows = chunk_rows if max_rows is None else max(chunk_rows, max_rows + 1)
+        self.max_rows = max_rows
+        self.progress = progress
+        self.set_numbers = defaultdict(int)
+        self.seen_sets = defaultdict(int)
+        self.exercises = {e.name.casefold(): e for e in Exercise.objects.filter(user=user)}
+        self.locations = {
+            loc.name.casefold(): loc for loc in UserLocation.objects.filter(user=user)
+        }
+        self.tags = None
+        self.muscle_groups = None
+        self.report = {
+            "rows": 0,
+            "sessions": 0,
+            "completions": 0,
+            "events": 0,
+            "exercises_created": 0,
+            "skipped_rows": 0,
+            "errors": [],
+        }
+
+    def client_id(self, *parts):
+        return uuid.uuid5(IMPORT_NAMESPACE, "/".join([str(self.user.pk), *map(str, parts)]))
+
+    def run(self, raw_rows):
+        chunk = []
+        for number, raw in enumerate(raw_rows, start=1):
+            if self.max_rows is not None and number > self.max_rows:
+                raise ImportTooLarge(f"More than {self.max_rows} rows.")
+            self.report["rows"] = number
+            try:
+                chunk.append(parse_row(raw))
+            except ImportFileError as exc:
+                self.report["skipped_rows"] += 1
+                if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+                    self.report["errors"].append({"row": number, "error": str(exc)})
+                continue
+            if len(chunk) >= self.chunk_rows:
+                self.flush(chunk)
+                chunk = []
+        if chunk:
+            self.flush(chunk)
+        if self.report["events"] or self.report["completions"]:
+            self.rebuild_derived()
+        return self.report
+
+    # -- catalog -----------------------------------------------------------
+
+    def _category(self, model, cache, name):
+        key = name.casefold()
+        if key not in cache:
+            cache[key] = model.objects.create(user=self.user, name=name)
+        return cache[key]
+
+    def resolve_exercise(self, rows):
+        name = rows[0]["exercise"]
+        exercise = self.exercises.get(name.casefold())
+        if exercise is not None:
+            return exercise
+
+        if self.tags is None:
+            scope = Q(user=self.user) | Q(user__isnull=True)
+            self.tags = _by_name(Tag.objects.filter(scope), self.user)
+            self.muscle_groups = _by_name(MuscleGroup.objects.filter(scope), self.user)
+
+        exercise = Exercise.objects.create(
+            user=self.user,
+            name=name,
+            track_distance=any(r["distance"] is not None for r in rows),
+            track_duration=any(r["duration_seconds"] is not None for r in rows),
+            track_resistance_numeric=any(r["resistance_numeric"] is not None for r in rows),
+            track_resistance_string=any(r["resistance_string"] for r in rows),
+            track_notes=any(r["note"] for r in rows),
+        )
+        tags = {n for r in rows for n in r["tags"]}
+        groups = {n for r in rows for n in r["muscle_groups"]}
+        if tags:
+            exercise.tags.set([self._category(Tag, self.tags, n) for n in sorted(tags)])
+        if groups:
+            exercise.muscle_groups.set(
+                [self._category(MuscleGroup, self.muscle_groups, n) for n in sorted(groups)]
+            )
+        self.exercises[name.casefold()] = exercise
+        self.report["exercises_created"] += 1
+        return exercise
+
+    def resolve_location(self, name):
+        if name is None:
+            return None
+        key = name.casefold()
+        if key not in self.locations:
+            self.locations[key] = UserLocation.objects.create(user=self.user, name=name)
+        return self.locations[key]
+
+    # -- history -----------------------------------------------------------
+
+    def _insert(self, model, objs):
+        """
+        bulk_create the objects whose client_id is new; returns
+        client_id -> pk for all of them.
+        """
+        keys = list(objs)
+        existing = set(
+            model.objects.filter(client_id__in=keys).values_list("client_id", flat=True)
+        )
+        new = [obj for key, obj in objs.items() if key not in existing]
+        # Rows keep the dates they were built with (see StampField).
+        model.objects.bulk_create(new, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        ids = dict(model.objects.filter(client_id__in=keys).values_list("client_id", "id"))
+        return len(new), ids
+
+    def extend_sessions(self, sessions, now):
+        """
+        Sessions continued from an earlier chunk (or import) end with their
+        latest set: move their end_time out to this chunk's.
+        """
+        longer = []
+        existing = GymSession.objects.filter(client_id__in=list(sessions)).only("id", "client_id", "end_time")
+        for session in existing:
+            end = sessions[session.client_id].end_time
+            if session.end_time is not None and session.end_time < end:
+                session.end_time, session.updated_at = end, now
+                longer.append(session)
+        GymSession.objects.bulk_update(longer, ["end_time", "updated_at"])
+
+    def flush(self, rows):
+        now = timezone.now()
+        by_completion = defaultdict(list)
+        for row in rows:
+            row["logged_at"] = row["logged_at"] or row["session_start"]
+            by_completion[(row["session_key"], row["completion_key"])].append(row)
+
+        with transaction.atomic():
+            sessions = {}
+            for row in rows:
+                key = self.client_id("session", row["session_key"])
+                end = max(row["session_end"] or row["logged_at"], row["session_start"])
+                session = sessions.get(key)
+                if session is None:
+                    sessions[key] = GymSession(
+                        client_id=key,
+                        user=self.user,
+                        start_time=row["session_start"],
+                        end_time=end,
+                        location=self.resolve_location(row["location"]),
+                        created_at=row["session_start"],
+                        updated_at=now,
+                    )
+                elif end > session.end_time:
+                    session.end_time = end
+            self.extend_sessions(sessions, now)
+            created, session_ids = self._insert(GymSession, sessions)
+            self.report["sessions"] += created
+
+            completions = {}
+            events = {}
+            for (session_key, completion_key), completion_rows in by_completion.items():
+                key = self.client_id("completion", session_key, completion_key)
+                completions[key] = ExerciseCompletion(
+                    client_id=key,
+                    user=self.user,
+                    session_id=session_ids[self.client_id("session", session_key)],
+                    exercise=self.resolve_exercise(completion_rows),
+                    created_at=min(r["logged_at"] for r in completion_rows),
+                    updated_at=now,
+                )
+                for row in completion_rows:
+                    # Rows without a set number follow the highest one seen.
+                    set_number = row["set"] or self.set_numbers[key] + 1
+                    self.set_numbers[key] = max(self.set_numbers[key], set_number)
+                    occurrence = self.seen_sets[(key, set_number)]
+                    self.seen_sets[(key, set_number)] += 1
+                    event_key = self.client_id(
+                        "event", session_key, completion_key, set_number, occurrence
+                    )
+                    events[event_key] = (key, ExerciseEvent(
+                        client_id=event_key,
+                        order_index=set_number,
+                        reps=row["reps"],
+                        weight=row["weight"],
+                        distance=row["distance"],
+                        duration_seconds=row["duration_seconds"],
+                        resistance_numeric=row["resistance_numeric"],
+                        resistance_string=row["resistance_string"],
+                        note=row["note"],
+                        created_at=row["logged_at"],
+                        updated_at=now,
+                    ))
+            created, completion_ids = self._insert(ExerciseCompletion, completions)
+            self.report["completions"] += created
+
+            for completion_key, event in events.values():
+                event.completion_id = completion_ids[completion_key]
+            created, _ = self._insert(
+                ExerciseEvent, {key: event for key, (_, event) in events.items()}
+            )
+            self.report["events"] += created
+
+        if self.progress:
+            self.progress(self.report)
+
+    def rebuild_derived(self):
+        history.rebuild([self.user.pk])
+
+
+def import_file(
+    user, stream, fmt=None, name=None, progress=None, chunk_rows=CHUNK_ROWS, max_rows=None
+):
+    """
+    Import `stream` for `user`; returns the report dict. A file of more
+    than `max_rows` rows raises ImportTooLarge, with nothing imported.
+    """
+    importer = Importer(user, chunk_rows=chunk_rows, progress=progress, max_rows=max_rows)
+    return importer.run(read_rows(stream, fmt=fmt, name=name))
@@ -0,0 +1,294 @@
+"""
+Database-backed job queue for long operations (imports, exports, rebuilds).
+
+The web process only inserts a Job row (`enqueue`); `manage.py run_worker`
+claims runnable jobs (`claim`) and runs each one in a pool process
+(`execute`). No broker: the jobs table is the queue.
+
+- Claiming locks candidate rows with SELECT ... FOR UPDATE SKIP LOCKED, so
+  several workers can poll the same table, and locks the owner's user row
+  while counting their running jobs, so GYM_JOBS_PER_USER holds across
+  workers.
+- A failed attempt is retried with exponential backoff until the job's
+  max_attempts is used up. Handlers must therefore be idempotent (imports
+  are, through their deterministic client_ids).
+- Workers heartbeat the jobs they run; a running job whose heartbeat is
+  older than GYM_JOB_STALE_AFTER (the worker died) is put back in the queue.
+"""
+import gzip
+import io
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from ..models import Job, JobOutputChunk
+from . import defaults, export, history, importer
+
+User = get_user_model()
+
+HANDLERS = {}
+
+# Columns polling and listing never need.
+BLOB_FIELDS = ("input_data",)
+
+# Bytes of output per JobOutputChunk row.
+OUTPUT_CHUNK_BYTES = 1024 * 1024
+
+# Failures retrying cannot fix (a malformed upload); the job fails at once.
+PERMANENT_ERRORS = (importer.ImportFileError, UnicodeDecodeError)
+
+
+class JobLimitError(Exception):
+    pass
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------------
+
+def enqueue(user, kind, payload=None, input_data=None):
+    """
+    Queue a `kind` job for `user`. Raises JobLimitError when the user
+    already has GYM_JOBS_MAX_PENDING jobs waiting or running.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}.")
+    pending = Job.objects.filter(user=user, status__in=[Job.QUEUED, Job.RUNNING]).count()
+    if pending >= settings.GYM_JOBS_MAX_PENDING:
+        raise JobLimitError(
+            f"You already have {pending} jobs pending; wait for one to finish."
+        )
+    return Job.objects.create(
+        user=user,
+        kind=kind,
+        payload=payload or {},
+        input_data=input_data,
+        max_attempts=settings.GYM_JOB_MAX_ATTEMPTS,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _running_counts(user_ids):
+    return dict(
+        Job.objects.filter(user_id__in=user_ids, status=Job.RUNNING)
+        .order_by().values("user_id").annotate(n=Count("id")).values_list("user_id", "n")
+    )
+
+
+def claim(worker, limit):
+    """
+    Mark up to `limit` runnable jobs as running by `worker` and return them,
+    oldest first, skipping users already at GYM_JOBS_PER_USER.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    per_user = settings.GYM_JOBS_PER_USER
+    busy_users = (
+        Job.objects.filter(status=Job.RUNNING).order_by().values("user_id")
+        .annotate(n=Count("id")).filter(n__gte=per_user).values("user_id")
+    )
+    claimed = []
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=now)
+            .exclude(user_id__in=busy_users)
+            .defer(*BLOB_FIELDS)
+            .order_by("run_after", "id")[:limit * 4]
+        )
+        user_ids = sorted({job.user_id for job in candidates})
+        # Serializes concurrent claims for the same users (see module docstring).
+        list(User.objects.select_for_update().filter(pk__in=user_ids).values_list("pk"))
+        running = _running_counts(user_ids)
+        for job in candidates:
+            if len(claimed) >= limit:
+                break
+            if running.get(job.user_id, 0) >= per_user:
+                continue
+            running[job.user_id] = running.get(job.user_id, 0) + 1
+            claimed.append(job)
+
+        Job.objects.filter(pk__in=[job.pk for job in claimed]).update(
+            status=Job.RUNNING,
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+        )
+    for job in claimed:
+        job.status, job.worker, job.started_at, job.heartbeat_at = Job.RUNNING, worker, now, now
+    return claimed
+
+
+def heartbeat(job_ids):
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status=Job.RUNNING).update(
+            heartbeat_at=timezone.now()
+        )
+
+
+def requeue_stale():
+    """
+    Put running jobs whose worker stopped heartbeating back in the queue
+    (or fail them when out of attempts). Returns how many were found.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.GYM_JOB_STALE_AFTER)
+    stale = list(
+        Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff).values_list("pk", flat=True)
+    )
+    for job_id in stale:
+        fail(job_id, "Worker stopped responding.", expected_status=Job.RUNNING)
+    return len(stale)
+
+
+def fail(job_id, error, expected_status=Job.RUNNING, retry=True, worker=None):
+    """
+    Record a failed attempt: retry later with backoff while attempts
+    remain (and `retry`), otherwise mark the job failed. With `worker`,
+    only while that worker still holds the job.
+    """
+    with transaction.atomic():
+        rows = Job.objects.select_for_update().defer(*BLOB_FIELDS).filter(pk=job_id, status=expected_status)
+        if worker is not None:
+            rows = rows.filter(worker=worker)
+        job = rows.first()
+        if job is None:
+            return None
+        job.attempts += 1
+        job.error = error
+        job.heartbeat_at = None
+        if retry and job.attempts < job.max_attempts:
+            delay = settings.GYM_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=[
+            "attempts", "error", "status", "run_after", "heartbeat_at", "finished_at", "updated_at",
+        ])
+    return job
+
+
+def _succeed(job, result):
+    """
+    Record the result, unless the job was taken away from this worker in
+    the meantime (requeued as stale, maybe claimed by another worker).
+    Returns whether it was recorded.
+    """
+    now = timezone.now()
+    return bool(
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(
+            status=Job.SUCCEEDED,
+            result=result,
+            attempts=F("attempts") + 1,
+            error="",
+            finished_at=now,
+            updated_at=now,
+        )
+    )
+
+
+def execute(job_id):
+    """
+    Run a claimed job to completion. Called in a worker pool process (or
+    inline); never raises, failures are recorded on the job. Returns
+    whether the job succeeded.
+    """
+    job = Job.objects.select_related("user").get(pk=job_id)
+    # Jobs are the worker's requests: pick up default rows seeded since.
+    defaults.expire()
+    try:
+        result = HANDLERS[job.kind](job)
+    except PERMANENT_ERRORS as exc:
+        fail(job.pk, str(exc), retry=False, worker=job.worker)
+        return False
+    except Exception as exc:  # any other handler failure is a failed attempt
+        fail(job.pk, f"{type(exc).__name__}: {exc}", worker=job.worker)
+        return False
+    return _succeed(job, result)
+
+
+def set_progress(job, progress):
+    Job.objects.filter(pk=job.pk).update(progress=progress, heartbeat_at=timezone.now())
+
+
+# ---------------------------------------------------------------------------
+# Handlers: return the result dict.
+# ---------------------------------------------------------------------------
+
+@handler("import")
+def run_import(job):
+    def progress(report):
+        set_progress(job, {k: v for k, v in report.items() if k != "errors"})
+
+    return importer.import_file(
+        job.user,
+        io.BytesIO(job.input_data),
+        fmt=job.payload.get("format"),
+        name=job.payload.get("name"),
+        progress=progress,
+    )
+
+
+def _pieces(chunks, size):
+    """
+    Regroup byte `chunks` into pieces of `size` bytes (but the last).
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+@handler("export")
+def run_export(job):
+    fmt = job.payload.get("format", "csv")
+    size = 0
+    # The file is written as it is encoded; an attempt leaves all of it or
+    # none, and a retry starts it over.
+    with transaction.atomic():
+        JobOutputChunk.objects.filter(job=job).delete()
+        pieces = _pieces(export.stream(job.user, fmt, gzip=True), OUTPUT_CHUNK_BYTES)
+        for index, data in enumerate(pieces):
+            JobOutputChunk.objects.create(job=job, index=index, data=data)
+            size += len(data)
+    return {"format": fmt, "bytes": size}
+
+
+@handler("rebuild")
+def run_rebuild(job):
+    history.rebuild([job.user_id])
+    return {"rebuilt": True}
+
+
+def compress_upload(upload):
+    """
+    Bytes of an uploaded file for Job.input_data, gzipped unless it already is.
+    """
+    data = upload.read()
+    return data if data[:2] == b"\x1f\x8b" else gzip.compress(data)
@@ -0,0 +1,125 @@
+"""
+Maintenance of ExerciseLastCompletion, the precomputed answer to
+"what did I do last time for this exercise?".
+
+A completion qualifies when it has at least one event and its session is
+closed; the latest one is the one whose newest event is most recent.
+Callers refresh the affected (user, exercise) pairs after any write that
+can change that answer: closing/reopening sessions, creating/deleting
+events, and moving/deleting completions.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import ExerciseCompletion, ExerciseLastCompletion
+
+
+def _latest_by_pair(completions):
+    """
+    Map (user_id, exercise_id) -> (completion_id, last_event_at) for the
+    latest qualifying completion among `completions`.
+    """
+    rows = (
+        completions
+        .filter(events__isnull=False, session__end_time__isnull=False)
+        .values("id", "user_id", "exercise_id")
+        .annotate(last_event_at=Max("events__created_at"))
+        .order_by("user_id", "exercise_id", "-last_event_at")
+    )
+    latest = {}
+    for row in rows:
+        key = (row["user_id"], row["exercise_id"])
+        if key not in latest:
+            latest[key] = (row["id"], row["last_event_at"])
+    return latest
+
+
+def _upsert(latest):
+    now = timezone.now()
+    ExerciseLastCompletion.objects.bulk_create(
+        [
+            ExerciseLastCompletion(
+                user_id=user_id,
+                exercise_id=exercise_id,
+                completion_id=completion_id,
+                last_event_at=last_event_at,
+                created_at=now,
+                updated_at=now,
+            )
+            for (user_id, exercise_id), (completion_id, last_event_at) in latest.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "exercise"],
+        update_fields=["completion", "last_event_at", "updated_at"],
+    )
+
+
+@transaction.atomic
+def refresh(user_id, exercise_ids):
+    """
+    Recompute the last completion for `user_id` and each of `exercise_ids`.
+    """
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return
+    latest = _latest_by_pair(
+        ExerciseCompletion.objects.filter(user_id=user_id, exercise_id__in=exercise_ids)
+    )
+    missing = exercise_ids - {exercise_id for _, exercise_id in latest}
+    if missing:
+        ExerciseLastCompletion.objects.filter(
+            user_id=user_id, exercise_id__in=missing
+        ).delete()
+    _upsert(latest)
+
+
+def refresh_pairs(pairs):
+    """
+    Refresh an iterable of (user_id, exercise_id) pairs, one pass per user.
+    """
+    by_user = defaultdict(set)
+    for user_id, exercise_id in pairs:
+        by_user[user_id].add(exercise_id)
+    for user_id, exercise_ids in by_user.items():
+        refresh(user_id, exercise_ids)
+
+
+def session_pairs(session_ids):
+    """
+    The (user_id, exercise_id) pairs touched by the given sessions.
+    Collect these *before* deleting sessions.
+    """
+    return set(
+        ExerciseCompletion.objects
+        .filter(session_id__in=session_ids)
+        .values_list("user_id", "exercise_id")
+        .distinct()
+    )
+
+
+def refresh_for_sessions(session_ids):
+    """
+    Refresh every exercise done in the given sessions, e.g. after they
+    were closed or reopened.
+    """
+    refresh_pairs(session_pairs(session_ids))
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """
+    Rebuild the table from scratch, for everyone or just `user_ids`.
+    Returns the number of rows written.
+    """
+    records = ExerciseLastCompletion.objects.all()
+    completions = ExerciseCompletion.objects.all()
+    if user_ids is not None:
+        records = records.filter(user_id__in=user_ids)
+        completions = completions.filter(user_id__in=user_ids)
+    records.delete()
+    latest = _latest_by_pair(completions)
+    _upsert(latest)
+    return len(latest)
@@ -0,0 +1,188 @@
+"""
+Personal records per (user, exercise, metric).
+
+Writing a set checks it against the stored records for that exercise in
+one query and upserts whatever it beats, so PR detection never scans
+history. Only when a record-holding event is edited or removed (or history
+is moved/deleted in bulk) is the exercise recomputed from its events.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Exercise, ExerciseEvent, PersonalRecord
+
+TWO_PLACES = Decimal("0.01")
+ZERO = Decimal("0")
+
+
+def _q(value):
+    return Decimal(value).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def event_metrics(exercise, reps, weight, distance, duration_seconds):
+    """
+    Map (metric, at_weight) -> value for one set, honouring the exercise's
+    track_* flags. Sets without the needed inputs contribute nothing.
+    """
+    metrics = {}
+    if exercise.track_weight and weight:
+        metrics[(PersonalRecord.MAX_WEIGHT, ZERO)] = _q(weight)
+        if exercise.track_reps and reps:
+            metrics[(PersonalRecord.MAX_REPS_AT_WEIGHT, _q(weight))] = _q(reps)
+            e1rm = weight if reps == 1 else weight * (30 + reps) / Decimal(30)
+            metrics[(PersonalRecord.BEST_ESTIMATED_1RM, ZERO)] = _q(e1rm)
+    if exercise.track_distance and distance:
+        metrics[(PersonalRecord.MAX_DISTANCE, ZERO)] = _q(distance)
+        if exercise.track_duration and duration_seconds:
+            metrics[(PersonalRecord.BEST_PACE, ZERO)] = _q(Decimal(duration_seconds) / distance)
+    return metrics
+
+
+def _beats(metric, value, current):
+    if metric in PersonalRecord.LOWER_IS_BETTER:
+        return value < current
+    return value > current
+
+
+def _upsert(records):
+    PersonalRecord.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=["user", "exercise", "metric", "at_weight"],
+        update_fields=["value", "event", "updated_at"],
+    )
+
+
+def _as_json(record, previous):
+    return {
+        "metric": record.metric,
+        "at_weight": str(record.at_weight) if record.metric == PersonalRecord.MAX_REPS_AT_WEIGHT else None,
+        "value": str(record.value),
+        "previous": str(previous) if previous is not None else None,
+    }
+
+
+@transaction.atomic
+def record_event(event, exercise=None):
+    """
+    Check a newly written set against the stored records and upsert any it
+    sets or beats. Returns the records it *beat* (first-ever values only
+    establish a baseline and are not reported).
+    """
+    completion = event.completion
+    exercise = exercise or completion.exercise
+    candidates = event_metrics(
+        exercise, event.reps, event.weight, event.distance, event.duration_seconds
+    )
+    if not candidates:
+        return []
+
+    current = {
+        (r.metric, r.at_weight): r
+        for r in PersonalRecord.objects.filter(
+            user_id=completion.user_id,
+            exercise_id=exercise.id,
+            metric__in={metric for metric, _ in candidates},
+        )
+    }
+    now = timezone.now()
+    changed, beaten = [], []
+    for (metric, at_weight), value in candidates.items():
+        existing = current.get((metric, at_weight))
+        if existing is not None and not _beats(metric, value, existing.value):
+            continue
+        record = PersonalRecord(
+            user_id=completion.user_id,
+            exercise_id=exercise.id,
+            metric=metric,
+            at_weight=at_weight,
+            value=value,
+            event=event,
+            created_at=now,
+            updated_at=now,
+        )
+        changed.append(record)
+        if existing is not None:
+            beaten.append(_as_json(record, existing.value))
+    if changed:
+        _upsert(changed)
+    return beaten
+
+
+def holds_record(event):
+    return PersonalRecord.objects.filter(event=event).exists()
+
+
+@transaction.atomic
+def recompute(user_id, exercise_ids):
+    """
+    Rebuild the records for `user_id` and `exercise_ids` from their events,
+    e.g. after a record-holding set was lowered or deleted.
+    """
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return
+    exercises = Exercise.objects.in_bulk(exercise_ids)
+    best = {}
+    events = (
+        ExerciseEvent.objects
+        .filter(completion__user_id=user_id, completion__exercise_id__in=exercise_ids)
+        .order_by("created_at", "id")
+        .values_list(
+            "id", "completion__exercise_id", "reps", "weight", "distance", "duration_seconds"
+        )
+    )
+    for event_id, exercise_id, reps, weight, distance, duration in events.iterator(chunk_size=2000):
+        metrics = event_metrics(exercises[exercise_id], reps, weight, distance, duration)
+        for (metric, at_weight), value in metrics.items():
+            key = (exercise_id, metric, at_weight)
+            if key not in best or _beats(metric, value, best[key][0]):
+                best[key] = (value, event_id)
+
+    PersonalRecord.objects.filter(user_id=user_id, exercise_id__in=exercise_ids).delete()
+    now = timezone.now()
+    PersonalRecord.objects.bulk_create(
+        [
+            PersonalRecord(
+                user_id=user_id,
+                exercise_id=exercise_id,
+                metric=metric,
+                at_weight=at_weight,
+                value=value,
+                event_id=event_id,
+                created_at=now,
+                updated_at=now,
+            )
+            for (exercise_id, metric, at_weight), (value, event_id) in best.items()
+        ],
+        batch_size=2000,
+    )
+
+
+def recompute_pairs(pairs):
+    by_user = defaultdict(set)
+    for user_id, exercise_id in pairs:
+        by_user[user_id].add(exercise_id)
+    for user_id, exercise_ids in by_user.items():
+        recompute(user_id, exercise_ids)
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """
+    Recompute every record for `user_ids` (everyone with history when None).
+    """
+    pairs = ExerciseEvent.objects.order_by().values_list(
+        "completion__user_id", "completion__exercise_id"
+    ).distinct()
+    if user_ids is not None:
+        pairs = pairs.filter(completion__user_id__in=user_ids)
+        PersonalRecord.objects.filter(user_id__in=user_ids).delete()
+    else:
+        PersonalRecord.objects.all().delete()
+    pairs = set(pairs)
+    recompute_pairs(pairs)
+    return len(pairs)
@@ -0,0 +1,309 @@
+"""
+Incrementally maintained analytics rollups.
+
+- ExerciseDailyRollup: (user, exercise, day) aggregates of ExerciseEvent.
+- MuscleGroupWeeklyRollup: (user, muscle group, week) totals derived from
+  the daily rollups, so they never touch raw events.
+
+Writes that change event history report the (user_id, exercise_id, day)
+cells they touched and `refresh()` recomputes just those cells (and the
+muscle-group weeks containing them). `rebuild()` recomputes everything for
+a set of users from scratch.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils import timezone
+
+from ..models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseDailyRollup,
+    ExerciseEvent,
+    MuscleGroupWeeklyRollup,
+)
+
+_decimal = DecimalField(max_digits=14, decimal_places=2)
+
+VOLUME = ExpressionWrapper(F("reps") * F("weight"), output_field=_decimal)
+
+# Epley estimate: weight * (1 + reps / 30); a single is its own 1RM.
+ESTIMATED_1RM = Case(
+    When(reps=1, then=F("weight")),
+    default=ExpressionWrapper(
+        F("weight") * (Value(30) + F("reps")) / Value(Decimal("30")),
+        output_field=_decimal,
+    ),
+    output_field=_decimal,
+)
+
+BATCH_SIZE = 2000
+
+DAILY_FIELDS = [
+    "set_count",
+    "total_reps",
+    "top_set_weight",
+    "total_volume",
+    "estimated_1rm",
+    "total_distance",
+    "total_duration_seconds",
+]
+
+WEEKLY_FIELDS = [
+    "set_count",
+    "total_reps",
+    "total_volume",
+    "total_distance",
+    "total_duration_seconds",
+]
+
+
+def _zero(expression):
+    return Coalesce(expression, 0)
+
+
+def _decimal_zero(expression):
+    return Coalesce(expression, Value(Decimal("0")), output_field=_decimal)
+
+
+def event_day(event):
+    """
+    The rollup day an event belongs to (matches TruncDate in SQL).
+    """
+    return timezone.localdate(event.created_at)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _daily_rows(events):
+    return (
+        events
+        .order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values("completion__user_id", "completion__exercise_id", "day")
+        .annotate(
+            set_count=Count("id"),
+            total_reps=_zero(Sum("reps")),
+            top_set_weight=Max("weight"),
+            total_volume=_decimal_zero(Sum(VOLUME)),
+            estimated_1rm=Max(ESTIMATED_1RM),
+            total_distance=_decimal_zero(Sum("distance")),
+            total_duration_seconds=_zero(Sum("duration_seconds")),
+        )
+    )
+
+
+def _weekly_rows(daily):
+    return (
+        daily
+        .order_by()
+        .annotate(week=TruncWeek("day"))
+        .values("user_id", "exercise__muscle_groups", "week")
+        .annotate(
+            set_count=Sum("set_count"),
+            total_reps=Sum("total_reps"),
+            total_volume=Sum("total_volume"),
+            total_distance=Sum("total_distance"),
+            total_duration_seconds=Sum("total_duration_seconds"),
+        )
+    )
+
+
+def _daily_objects(rows):
+    now = timezone.now()
+    for row in rows:
+        yield ExerciseDailyRollup(
+            user_id=row["completion__user_id"],
+            exercise_id=row["completion__exercise_id"],
+            day=row["day"],
+            created_at=now,
+            updated_at=now,
+            **{field: row[field] for field in DAILY_FIELDS},
+        )
+
+
+def _weekly_objects(rows):
+    now = timezone.now()
+    for row in rows:
+        if row["exercise__muscle_groups"] is None:
+            continue
+        week = row["week"]
+        yield MuscleGroupWeeklyRollup(
+            user_id=row["user_id"],
+            muscle_group_id=row["exercise__muscle_groups"],
+            week=week.date() if hasattr(week, "date") else week,
+            created_at=now,
+            updated_at=now,
+            **{field: row[field] for field in WEEKLY_FIELDS},
+        )
+
+
+def _upsert(model, objs, unique_fields, fields):
+    model.objects.bulk_create(
+        objs,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=fields + ["updated_at"],
+    )
+
+
+def _refresh_days(user_id, cells):
+    """
+    Recompute one user's daily rollup `cells` ((exercise_id, day) pairs)
+    with one aggregate query, however many exercises they span.
+    """
+    exercise_ids = {exercise_id for exercise_id, _ in cells}
+    days = {day for _, day in cells}
+    events = ExerciseEvent.objects.filter(
+        completion__user_id=user_id,
+        completion__exercise_id__in=exercise_ids,
+        created_at__date__in=days,
+    )
+    # The filter spans every exercise x day combination; keep the touched cells.
+    objs = [
+        obj for obj in _daily_objects(_daily_rows(events))
+        if (obj.exercise_id, obj.day) in cells
+    ]
+    fresh = {(obj.exercise_id, obj.day) for obj in objs}
+    existing = ExerciseDailyRollup.objects.filter(
+        user_id=user_id, exercise_id__in=exercise_ids, day__in=days
+    ).values_list("id", "exercise_id", "day")
+    stale_ids = [
+        pk for pk, exercise_id, day in existing
+        if (exercise_id, day) in cells and (exercise_id, day) not in fresh
+    ]
+    if stale_ids:
+        ExerciseDailyRollup.objects.filter(id__in=stale_ids).delete()
+    _upsert(ExerciseDailyRollup, objs, ["user", "exercise", "day"], DAILY_FIELDS)
+
+
+def refresh_muscle_group_weeks(user_id, muscle_group_ids, weeks=None):
+    """
+    Recompute weekly rollups for the given muscle groups from the daily
+    rollups; all weeks when `weeks` is None.
+    """
+    muscle_group_ids = set(muscle_group_ids)
+    if not muscle_group_ids:
+        return
+    exercise_ids = Exercise.muscle_groups.through.objects.filter(
+        musclegroup_id__in=muscle_group_ids
+    ).values("exercise_id")
+    daily = ExerciseDailyRollup.objects.filter(
+        user_id=user_id, exercise_id__in=exercise_ids
+    )
+    stale = MuscleGroupWeeklyRollup.objects.filter(
+        user_id=user_id, muscle_group_id__in=muscle_group_ids
+    )
+    if weeks is not None:
+        weeks = set(weeks)
+        if not weeks:
+            return
+        daily = daily.filter(
+            day__gte=min(weeks), day__lt=max(weeks) + timedelta(days=7)
+        )
+        stale = stale.filter(week__in=weeks)
+
+    objs = [
+        obj
+        for obj in _weekly_objects(_weekly_rows(daily))
+        if obj.muscle_group_id in muscle_group_ids
+        and (weeks is None or obj.week in weeks)
+    ]
+    fresh = {(obj.muscle_group_id, obj.week) for obj in objs}
+    stale_ids = [
+        pk
+        for pk, muscle_group_id, week in stale.values_list("id", "muscle_group_id", "week")
+        if (muscle_group_id, week) not in fresh
+    ]
+    if stale_ids:
+        MuscleGroupWeeklyRollup.objects.filter(id__in=stale_ids).delete()
+    _upsert(MuscleGroupWeeklyRollup, objs, ["user", "muscle_group", "week"], WEEKLY_FIELDS)
+
+
+@transaction.atomic
+def refresh(touched):
+    """
+    Recompute the rollup cells for an iterable of (user_id, exercise_id, day).
+    """
+    cells_by_user = defaultdict(set)
+    for user_id, exercise_id, day in touched:
+        cells_by_user[user_id].add((exercise_id, day))
+
+    for user_id, cells in cells_by_user.items():
+        _refresh_days(user_id, cells)
+        muscle_group_ids = Exercise.muscle_groups.through.objects.filter(
+            exercise_id__in={exercise_id for exercise_id, _ in cells}
+        ).values_list("musclegroup_id", flat=True)
+        refresh_muscle_group_weeks(user_id, muscle_group_ids, {week_start(day) for _, day in cells})
+
+
+def touched_by(events):
+    """
+    The (user_id, exercise_id, day) cells covered by an ExerciseEvent
+    queryset. Collect these *before* deleting or moving events.
+    """
+    return set(
+        events
+        .order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values_list("completion__user_id", "completion__exercise_id", "day")
+        .distinct()
+    )
+
+
+def _rebuild_chunk(user_ids):
+    with transaction.atomic():
+        ExerciseDailyRollup.objects.filter(user_id__in=user_ids).delete()
+        MuscleGroupWeeklyRollup.objects.filter(user_id__in=user_ids).delete()
+
+        daily = list(_daily_objects(_daily_rows(
+            ExerciseEvent.objects.filter(completion__user_id__in=user_ids)
+        )))
+        ExerciseDailyRollup.objects.bulk_create(daily, batch_size=BATCH_SIZE)
+
+        weekly = list(_weekly_objects(_weekly_rows(
+            ExerciseDailyRollup.objects.filter(user_id__in=user_ids)
+        )))
+        MuscleGroupWeeklyRollup.objects.bulk_create(weekly, batch_size=BATCH_SIZE)
+    return len(daily), len(weekly)
+
+
+def _rebuild_chunk_in_thread(user_ids):
+    try:
+        return _rebuild_chunk(user_ids)
+    finally:
+        # Worker threads get their own connections; don't leak them.
+        connections.close_all()
+
+
+def rebuild(user_ids=None, workers=1, chunk_size=50):
+    """
+    Rebuild all rollups for `user_ids` (everyone with history when None),
+    in chunks of users processed by up to `workers` threads.
+    Returns (daily_rows, weekly_rows) written.
+    """
+    if user_ids is None:
+        user_ids = (
+            ExerciseCompletion.objects.order_by("user_id")
+            .values_list("user_id", flat=True).distinct()
+        )
+    user_ids = list(user_ids)
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    if workers <= 1:
+        results = [_rebuild_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_rebuild_chunk_in_thread, chunks))
+    return (
+        sum(daily for daily, _ in results),
+        sum(weekly for _, weekly in results),
+    )
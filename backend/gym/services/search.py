@@ -0,0 +1,120 @@
+"""
+Exercise search.
+
+Each exercise stores a lower-cased search document (its name plus the
+names of its tags and muscle groups) in Exercise.search_text. On Postgres
+that column carries a pg_trgm GIN index, so the substring matches below
+are index scans instead of LIKEs over a three-way join; on SQLite the same
+queries run unindexed.
+
+The document is refreshed (see gym.signals) whenever an exercise is saved,
+its tag/muscle-group links change, or a linked tag or muscle group is
+renamed or deleted. The refresh runs once the transaction commits, so
+saving an exercise and setting its links rebuilds its document once.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+from ..models import Exercise
+
+BATCH_SIZE = 1000
+
+
+def document(name, tag_names=(), muscle_group_names=()):
+    parts = [name, *sorted(tag_names), *sorted(muscle_group_names)]
+    return " ".join(part.strip().lower() for part in parts if part)
+
+
+def _names_by_exercise(through, exercise_ids, name_field):
+    names = defaultdict(list)
+    rows = through.objects.filter(exercise_id__in=exercise_ids).values_list(
+        "exercise_id", name_field
+    )
+    for exercise_id, name in rows:
+        names[exercise_id].append(name)
+    return names
+
+
+def refresh(exercise_ids):
+    """
+    Recompute the search document of the given exercises.
+    """
+    exercise_ids = list(set(exercise_ids))
+    for i in range(0, len(exercise_ids), BATCH_SIZE):
+        chunk = exercise_ids[i:i + BATCH_SIZE]
+        tags = _names_by_exercise(Exercise.tags.through, chunk, "tag__name")
+        groups = _names_by_exercise(Exercise.muscle_groups.through, chunk, "musclegroup__name")
+        stale = []
+        for exercise in Exercise.objects.filter(pk__in=chunk).only("id", "name", "search_text"):
+            text = document(exercise.name, tags[exercise.pk], groups[exercise.pk])
+            if text != exercise.search_text:
+                exercise.search_text = text
+                stale.append(exercise)
+        Exercise.objects.bulk_update(stale, ["search_text"])
+
+
+# Exercise ids waiting for the current transaction to commit, per thread
+# (like the database connection they belong to). Those of a rolled-back
+# transaction are refreshed with the next commit, which finds them current.
+_pending = threading.local()
+
+
+def _refresh_pending():
+    exercise_ids = getattr(_pending, "exercise_ids", None)
+    if not exercise_ids:
+        return
+    _pending.exercise_ids = set()
+    refresh(exercise_ids)
+
+
+def schedule(exercise_ids):
+    """
+    Refresh the search document of the given exercises when the current
+    transaction commits (right away outside one), once per exercise however
+    often it is scheduled.
+    """
+    if not hasattr(_pending, "exercise_ids"):
+        _pending.exercise_ids = set()
+    _pending.exercise_ids.update(exercise_ids)
+    transaction.on_commit(_refresh_pending)
+
+
+def exercises_linked_to(category):
+    """
+    Ids of exercises tagged with a Tag or MuscleGroup.
+    """
+    return list(category.exercises.values_list("id", flat=True))
+
+
+def search(queryset, term):
+    """
+    Filter `queryset` to exercises whose document contains every word of
+    `term` (each word may be a prefix being typed) and order by relevance:
+    exact name, name prefix, word prefix in the name, anywhere in the name,
+    then tag/muscle-group matches only.
+    """
+    words = term.lower().split()
+    if not words:
+        return queryset
+    phrase = " ".join(words)
+    for word in words:
+        queryset = queryset.filter(search_text__contains=word)
+    return (
+        queryset
+        .alias(name_lower=Lower("name"))
+        .annotate(
+            search_rank=Case(
+                When(Q(name_lower=phrase), then=Value(0)),
+                When(Q(name_lower__startswith=phrase), then=Value(1)),
+                When(Q(name_lower__contains=f" {phrase}"), then=Value(2)),
+                When(Q(name_lower__contains=phrase), then=Value(3)),
+                default=Value(4),
+                output_field=IntegerField(),
+            ),
+        )
+        .order_by("search_rank", "name")
+    )
@@ -0,0 +1,127 @@
+"""
+Session lifecycle helpers shared by the REST and sync endpoints.
+
+Starting, closing and reopening sessions run in one transaction that
+first locks the user's row, so concurrent requests for the same user
+(double taps, a sync push racing the app) are applied one after the
+other and can never leave two sessions open.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import bootstrap, last_completions
+from ..models import ExerciseEvent, GymSession
+
+User = get_user_model()
+
+
+def lock_user(user_id):
+    """
+    Serialize lifecycle changes for the user until the transaction ends.
+    The user row is locked rather than their open session, which may not
+    exist yet.
+    """
+    list(User.objects.select_for_update().filter(pk=user_id).values_list("pk"))
+
+
+def open_sessions(user):
+    """
+    The user's open session (at most one), unordered so the lookup is
+    answered from the gym_one_open_session_per_user partial index.
+    """
+    return GymSession.objects.filter(user=user, end_time__isnull=True).order_by()
+
+
+def last_event_time():
+    """
+    Subquery: created_at of the latest event in the outer session.
+    """
+    return Subquery(
+        ExerciseEvent.objects
+        .filter(completion__session=OuterRef("pk"))
+        .order_by()
+        .values("completion__session")
+        .annotate(last=Max("created_at"))
+        .values("last")
+    )
+
+
+@transaction.atomic
+def close_open_sessions(user, exclude_id=None, when=None):
+    """
+    Close every open session of `user` (except `exclude_id`) -- at `when`,
+    or by default at each session's last event (now if it has none) --
+    and refresh "last time" for what was done in them. Returns the closed
+    session ids.
+    """
+    lock_user(user.pk)
+    now = timezone.now()
+    sessions = open_sessions(user)
+    if exclude_id is not None:
+        sessions = sessions.exclude(id=exclude_id)
+    closed_ids = list(sessions.values_list("id", flat=True))
+    if closed_ids:
+        GymSession.objects.filter(id__in=closed_ids).update(
+            end_time=when or Coalesce(last_event_time(), Value(now)),
+            updated_at=now,
+        )
+        bootstrap.bump(user.pk)
+        last_completions.refresh_for_sessions(closed_ids)
+    return closed_ids
+
+
+@transaction.atomic
+def start(user, **fields):
+    """
+    Create a session for `user`. An open one (no end_time) first closes
+    whatever session the user still has open.
+    """
+    if fields.get("end_time") is None:
+        close_open_sessions(user)
+    return GymSession.objects.create(user=user, **fields)
+
+
+@transaction.atomic
+def close(session, when=None):
+    """
+    Close `session` at `when`, by default at its last event.
+    """
+    lock_user(session.user_id)
+    session.close(when)
+    return session
+
+
+@transaction.atomic
+def reopen(session):
+    """
+    Make `session` the user's open session, closing any other.
+    """
+    close_open_sessions(session.user, exclude_id=session.id)
+    session.end_time = None
+    session.save(update_fields=["end_time", "updated_at"])
+    # This session no longer counts as "last time".
+    last_completions.refresh_for_sessions([session.id])
+    return session
+
+
+@transaction.atomic
+def update(session, **fields):
+    """
+    Save `fields` onto `session`. Clearing end_time reopens it and setting
+    it closes it, through reopen() and close(), so "last time" follows and
+    the user never ends up with two open sessions.
+    """
+    lock_user(session.user_id)
+    end_time = fields.pop("end_time", session.end_time)
+    for field, value in fields.items():
+        setattr(session, field, value)
+    if fields:
+        session.save(update_fields=[*fields, "updated_at"])
+    if end_time is None:
+        return session if session.is_open else reopen(session)
+    if end_time != session.end_time:
+        return close(session, end_time)
+    return session
@@ -0,0 +1,24 @@
+"""
+Entry points for run_worker's pool processes. Spawned processes import this
+module before Django is set up, so it must not import models at load time.
+"""
+import signal
+
+import django
+
+
+def init():
+    # Ctrl-C is for the parent, which lets running jobs finish.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+def execute(job_id):
+    from django.db import connections
+
+    from . import jobs
+
+    try:
+        return jobs.execute(job_id)
+    finally:
+        connections.close_all()
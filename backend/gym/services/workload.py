@@ -0,0 +1,486 @@
+"""
+Synthetic training histories for benchmarks (see the generate_workload
+and explain_hot_queries commands).
+
+Each user gets custom tags and muscle groups next to the shared defaults
+(seed_defaults), exercises drawn from a catalog of mixed kinds -- weights,
+bodyweight, machines, bands, cardio, timed holds -- with the matching
+track_* flags, a few locations, and sessions every few days with a handful
+of completions of a few sets each. Users favour some exercises over
+others and get slowly stronger over their history.
+
+Each user's rows are drawn from their own random.Random seeded with
+(seed, user number) and dated back from a fixed `until`, so the same
+arguments produce the same data however the users are chunked. Users are
+written in chunks, each in one transaction, with bulk_create, which keeps
+the timestamps they were built with -- except on Postgres, where sessions,
+completions and events (the bulk of the rows) are streamed with COPY, ids
+reserved from their sequences. Bulk writes
+send no signals, so derived tables are rebuilt at the end
+(history.rebuild).
+"""
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.db import connection, transaction
+
+from ..models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseEvent,
+    GymSession,
+    MuscleGroup,
+    Tag,
+    UserLocation,
+)
+from . import history, search
+
+User = get_user_model()
+
+# Newest a session can start; fixed so the data does not depend on the
+# day it is generated.
+UNTIL = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+CHUNK_USERS = 100
+BATCH_SIZE = 5000
+
+TRACK_FLAGS = [
+    "track_reps",
+    "track_weight",
+    "track_distance",
+    "track_duration",
+    "track_resistance_numeric",
+    "track_resistance_string",
+]
+
+# kind -> track_* flags set
+KINDS = {
+    "weights": {"track_reps", "track_weight"},
+    "bodyweight": {"track_reps"},
+    "machine": {"track_reps", "track_resistance_numeric"},
+    "band": {"track_reps", "track_resistance_string"},
+    "cardio": {"track_distance", "track_duration"},
+    "timed": {"track_duration"},
+}
+
+# (name, kind, default muscle groups, default tags)
+CATALOG = [
+    ("Bench Press", "weights", ["Chest", "Arms"], ["push"]),
+    ("Incline Dumbbell Press", "weights", ["Chest", "Shoulders"], ["push"]),
+    ("Overhead Press", "weights", ["Shoulders"], ["push"]),
+    ("Push-up", "bodyweight", ["Chest"], ["push"]),
+    ("Dip", "bodyweight", ["Chest", "Arms"], ["push"]),
+    ("Tricep Pushdown", "machine", ["Arms"], ["push", "machine"]),
+    ("Chest Fly Machine", "machine", ["Chest"], ["push", "machine"]),
+    ("Deadlift", "weights", ["Back", "Legs"], ["pull"]),
+    ("Barbell Row", "weights", ["Back"], ["pull"]),
+    ("Pull-up", "bodyweight", ["Back", "Arms"], ["pull"]),
+    ("Lat Pulldown", "machine", ["Back"], ["pull", "machine"]),
+    ("Seated Cable Row", "machine", ["Back"], ["pull", "machine"]),
+    ("Bicep Curl", "weights", ["Arms"], ["pull"]),
+    ("Back Squat", "weights", ["Legs"], []),
+    ("Romanian Deadlift", "weights", ["Legs", "Back"], ["pull"]),
+    ("Walking Lunge", "weights", ["Legs"], []),
+    ("Leg Press", "machine", ["Legs"], ["machine"]),
+    ("Calf Raise", "machine", ["Legs"], ["machine"]),
+    ("Kettlebell Swing", "weights", ["Full Body"], []),
+    ("Hanging Leg Raise", "bodyweight", ["Core"], []),
+    ("Plank", "timed", ["Core"], []),
+    ("Wall Sit", "timed", ["Legs"], ["physical therapy"]),
+    ("Band Pull-apart", "band", ["Shoulders"], ["physical therapy"]),
+    ("Band External Rotation", "band", ["Shoulders"], ["physical therapy"]),
+    ("Run", "cardio", ["Cardio"], ["cardio"]),
+    ("Rowing Machine", "cardio", ["Cardio", "Full Body"], ["cardio", "machine"]),
+    ("Bike", "cardio", ["Cardio", "Legs"], ["cardio", "machine"]),
+]
+
+CUSTOM_TAGS = ["home", "warm-up", "heavy", "deload", "superset", "travel", "rehab", "accessory"]
+CUSTOM_MUSCLE_GROUPS = ["Glutes", "Forearms", "Traps", "Obliques", "Hip Flexors", "Neck"]
+LOCATIONS = ["Home", "Downtown Gym", "Office Gym", "Climbing Hall", "Hotel", "Park"]
+BAND_COLORS = ["yellow", "red", "green", "blue", "black"]
+NOTES = ["felt strong", "tired today", "short rest", "form check", "new gym shoes"]
+
+# ExerciseEvent columns written, in COPY order.
+EVENT_FIELDS = [
+    "created_at",
+    "updated_at",
+    "completion_id",
+    "order_index",
+    "reps",
+    "duration_seconds",
+    "weight",
+    "distance",
+    "resistance_numeric",
+    "resistance_string",
+    "note",
+]
+
+def username(prefix, number):
+    return f"{prefix}{number}@example.com"
+
+
+def _clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+def _decimal(value):
+    return Decimal(f"{value:.2f}")
+
+
+class UserPlan:
+    """
+    One user's rows as unsaved instances, related through the instances so
+    their ids can be filled in level by level as they are written, plus
+    what drawing their sets needs. Events are only drawn as rows, once
+    completions have ids.
+    """
+
+    def __init__(self, workload, number):
+        self.workload = workload
+        rng = self.rng = random.Random(f"{workload.seed}:{number}")
+
+        self.starts = self.session_starts()
+        joined = self.starts[0] - timedelta(days=rng.randint(1, 30))
+        self.user = User(
+            username=username(workload.prefix, number),
+            email=username(workload.prefix, number),
+            password=workload.password,
+            date_joined=joined,
+        )
+        stamps = {"created_at": joined, "updated_at": joined}
+
+        self.tags = [
+            Tag(user=self.user, name=name, **stamps)
+            for name in rng.sample(CUSTOM_TAGS, rng.randint(2, 5))
+        ]
+        self.muscle_groups = [
+            MuscleGroup(user=self.user, name=name, **stamps)
+            for name in rng.sample(CUSTOM_MUSCLE_GROUPS, rng.randint(1, 3))
+        ]
+        self.locations = [
+            UserLocation(user=self.user, name=name, **stamps)
+            for name in rng.sample(LOCATIONS, rng.randint(1, 3))
+        ]
+        self.make_exercises(stamps)
+        self.make_sessions()
+
+    def session_starts(self):
+        """
+        Session start times, oldest first: one every few days, around the
+        user's usual hour.
+        """
+        rng, workload = self.rng, self.workload
+        hour = rng.uniform(6, 20)
+        day = workload.until.replace(hour=0, minute=0, second=0, microsecond=0)
+        starts = []
+        for _ in range(workload.sessions_per_user):
+            day -= timedelta(days=max(1, round(rng.expovariate(1 / 2.5))))
+            starts.append(day + timedelta(hours=_clamp(rng.gauss(hour, 1.5), 5, 22)))
+        starts.reverse()
+        return starts
+
+    def make_exercises(self, stamps):
+        rng = self.rng
+        default_tags, default_groups = self.workload.default_tags, self.workload.default_groups
+        order = rng.sample(range(len(CATALOG)), len(CATALOG))
+        self.exercises, self.kinds, self.bases = [], [], []
+        self.tag_links, self.muscle_group_links = [], []
+        for i in range(self.workload.exercises_per_user):
+            name, kind, group_names, tag_names = CATALOG[order[i % len(CATALOG)]]
+            if i >= len(CATALOG):
+                name = f"{name} (variation {i // len(CATALOG)})"
+            groups = [default_groups[g] for g in group_names if g in default_groups]
+            tags = [default_tags[t] for t in tag_names if t in default_tags]
+            if rng.random() < 0.3:
+                groups.append(rng.choice(self.muscle_groups))
+            if rng.random() < 0.3:
+                tags.append(rng.choice(self.tags))
+
+            flags = {flag: flag in KINDS[kind] for flag in TRACK_FLAGS}
+            exercise = Exercise(
+                user=self.user,
+                name=name,
+                search_text=search.document(
+                    name, [t.name for t in tags], [g.name for g in groups]
+                ),
+                track_notes=rng.random() < 0.1,
+                **flags,
+                **stamps,
+            )
+            self.exercises.append(exercise)
+            self.kinds.append(kind)
+            self.bases.append(self.base_value(kind))
+            self.tag_links += [Exercise.tags.through(exercise=exercise, tag=t) for t in tags]
+            self.muscle_group_links += [
+                Exercise.muscle_groups.through(exercise=exercise, musclegroup=g) for g in groups
+            ]
+        # Everyone has favourites: the first exercises come up far more often.
+        self.cum_weights = []
+        total = 0
+        for rank in range(len(self.exercises)):
+            total += 1 / (rank + 1)
+            self.cum_weights.append(total)
+
+    def base_value(self, kind):
+        """
+        Where the user starts on an exercise: pounds, reps, resistance
+        level, band, miles or seconds, depending on its kind.
+        """
+        rng = self.rng
+        if kind == "weights":
+            return rng.uniform(25, 185)
+        if kind == "bodyweight":
+            return rng.uniform(6, 18)
+        if kind == "machine":
+            return rng.uniform(3, 12)
+        if kind == "band":
+            return rng.randrange(len(BAND_COLORS) - 1)
+        if kind == "cardio":
+            return rng.uniform(1, 5)
+        return rng.uniform(30, 90)
+
+    def make_sessions(self):
+        rng, workload = self.rng, self.workload
+        home = self.locations[0]
+        stay_open = rng.random() < workload.open_fraction
+        self.sessions, self.completions = [], []
+        for i, start in enumerate(self.starts):
+            minutes = _clamp(rng.gauss(60, 15), 20, 150)
+            is_last = i == len(self.starts) - 1
+            end = None if stay_open and is_last else start + timedelta(minutes=minutes)
+            location = None
+            if rng.random() < 0.9:
+                location = home if rng.random() < 0.75 else rng.choice(self.locations)
+                location.updated_at = start
+            self.sessions.append(GymSession(
+                user=self.user,
+                start_time=start,
+                end_time=end,
+                location=location,
+                note=rng.choice(NOTES) if rng.random() < 0.05 else "",
+                created_at=start,
+                updated_at=end or start,
+            ))
+
+            count = _clamp(round(rng.gauss(workload.exercises_per_session, 1.5)), 1, len(self.exercises))
+            chosen = []
+            while len(chosen) < count:
+                index = rng.choices(range(len(self.exercises)), cum_weights=self.cum_weights)[0]
+                if index not in chosen:
+                    chosen.append(index)
+            # 0 for the first session, 1 for the latest.
+            progress = i / max(len(self.starts) - 1, 1)
+            for j, index in enumerate(chosen):
+                at = start + timedelta(minutes=minutes * j / count)
+                completion = ExerciseCompletion(
+                    user=self.user,
+                    session=self.sessions[-1],
+                    exercise=self.exercises[index],
+                    created_at=at,
+                    updated_at=at,
+                )
+                self.completions.append((completion, index, progress))
+
+    def event_rows(self):
+        """
+        EVENT_FIELDS tuples for every completion's sets, in order.
+        """
+        rng, workload = self.rng, self.workload
+        for completion, index, progress in self.completions:
+            kind, base = self.kinds[index], self.bases[index]
+            track_notes = self.exercises[index].track_notes
+            sets = round(rng.gauss(workload.sets_per_exercise, 1))
+            sets = _clamp(sets, 1, 3 if kind == "cardio" else 8)
+            at = completion.created_at
+            for order_index in range(1, sets + 1):
+                values = self.set_values(kind, base, progress)
+                note = rng.choice(NOTES) if track_notes and rng.random() < 0.2 else ""
+                yield (at, at, completion.pk, order_index, *values, note)
+                at += timedelta(seconds=rng.uniform(90, 240))
+
+    def set_values(self, kind, base, progress):
+        """
+        (reps, duration_seconds, weight, distance, resistance_numeric,
+        resistance_string) of one set.
+        """
+        rng = self.rng
+        stronger = 1 + 0.3 * progress
+        if kind == "weights":
+            weight = max(5, round(base * stronger / 5) * 5)
+            return max(1, round(rng.gauss(8, 2))), None, Decimal(weight), None, None, None
+        if kind == "bodyweight":
+            return max(1, round(rng.gauss(base * stronger, 2))), None, None, None, None, None
+        if kind == "machine":
+            level = Decimal(max(1, round(base * stronger)))
+            return max(1, round(rng.gauss(12, 2))), None, None, None, level, None
+        if kind == "band":
+            band = BAND_COLORS[min(base + (progress > 0.5), len(BAND_COLORS) - 1)]
+            return max(1, round(rng.gauss(15, 3))), None, None, None, None, band
+        if kind == "cardio":
+            miles = max(0.25, rng.gauss(base * (1 + 0.2 * progress), 0.3))
+            seconds = round(miles * rng.uniform(480, 660))
+            return None, seconds, None, _decimal(miles), None, None
+        return None, max(10, round(rng.gauss(base * stronger, 10))), None, None, None, None
+
+
+class Workload:
+    def __init__(
+        self,
+        users,
+        sessions_per_user,
+        seed=1,
+        exercises_per_user=15,
+        exercises_per_session=4,
+        sets_per_exercise=4,
+        open_fraction=0.2,
+        until=UNTIL,
+        prefix="workload-",
+        password=None,
+        chunk_users=CHUNK_USERS,
+        progress=None,
+    ):
+        self.users = users
+        self.sessions_per_user = sessions_per_user
+        self.seed = seed
+        self.exercises_per_user = exercises_per_user
+        self.exercises_per_session = exercises_per_session
+        self.sets_per_exercise = sets_per_exercise
+        self.open_fraction = open_fraction
+        self.until = until
+        self.prefix = prefix
+        # One hash for everyone: hashing per user would dominate the run.
+        self.password = make_password(password) if password else UNUSABLE_PASSWORD_PREFIX
+        self.chunk_users = chunk_users
+        self.progress = progress
+        self.default_tags = {tag.name: tag for tag in Tag.objects.filter(user=None)}
+        self.default_groups = {group.name: group for group in MuscleGroup.objects.filter(user=None)}
+        self.user_ids = []
+        self.report = dict.fromkeys(
+            ["users", "tags", "muscle_groups", "exercises", "locations", "sessions", "completions", "events"],
+            0,
+        )
+
+    def run(self, rebuild_derived=True):
+        for first in range(0, self.users, self.chunk_users):
+            numbers = range(first, min(first + self.chunk_users, self.users))
+            with transaction.atomic():
+                self.write([UserPlan(self, number) for number in numbers])
+            if self.progress:
+                self.progress(self.report)
+        if rebuild_derived:
+            history.rebuild(self.user_ids)
+        return self.report
+
+    def write(self, plans):
+        def insert(model, key, objs):
+            model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+            if key:
+                self.report[key] += len(objs)
+
+        insert(User, "users", [plan.user for plan in plans])
+        self.user_ids += [plan.user.pk for plan in plans]
+        insert(Tag, "tags", [tag for plan in plans for tag in plan.tags])
+        insert(MuscleGroup, "muscle_groups", [group for plan in plans for group in plan.muscle_groups])
+        insert(UserLocation, "locations", [loc for plan in plans for loc in plan.locations])
+        insert(Exercise, "exercises", [e for plan in plans for e in plan.exercises])
+        insert(Exercise.tags.through, None, [link for plan in plans for link in plan.tag_links])
+        insert(
+            Exercise.muscle_groups.through, None,
+            [link for plan in plans for link in plan.muscle_group_links],
+        )
+
+        sessions = [session for plan in plans for session in plan.sessions]
+        completions = [completion for plan in plans for completion, _, _ in plan.completions]
+        rows = (row for plan in plans for row in plan.event_rows())
+        if connection.vendor == "postgresql":
+            # The bulk of the rows skip bulk_create's per-row overhead.
+            for model, objs in ((GymSession, sessions), (ExerciseCompletion, completions)):
+                for obj, pk in zip(objs, reserve_ids(model, len(objs))):
+                    obj.pk = pk
+                copy_instances(model, objs)
+            events = copy_rows(ExerciseEvent, EVENT_FIELDS, rows)
+        else:
+            insert(GymSession, None, sessions)
+            insert(ExerciseCompletion, None, completions)
+            events = insert_events(rows)
+        self.report["sessions"] += len(sessions)
+        self.report["completions"] += len(completions)
+        self.report["events"] += events
+
+
+def reserve_ids(model, count):
+    """
+    `count` primary keys from `model`'s sequence (Postgres), so rows can be
+    COPYed with their ids known up front.
+    """
+    opts = model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [opts.db_table, opts.pk.column, count],
+        )
+        return [pk for (pk,) in cursor.fetchall()]
+
+
+def copy_rows(model, attnames, rows):
+    """
+    Stream `rows` (tuples of `attnames` values) into `model`'s table with
+    COPY (psycopg 3). Returns the number of rows.
+    """
+    quote = connection.ops.quote_name
+    columns = {field.attname: field.column for field in model._meta.concrete_fields}
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(model._meta.db_table), ", ".join(quote(columns[name]) for name in attnames)
+    )
+    count = 0
+    with connection.cursor() as cursor, cursor.cursor.copy(sql) as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+def copy_instances(model, objs):
+    """
+    COPY unsaved instances whose pks are already set. Foreign keys are
+    taken from the related instances they were built with.
+    """
+    fields = model._meta.concrete_fields
+
+    def value(obj, field):
+        if field.is_relation and field.is_cached(obj):
+            related = field.get_cached_value(obj)
+            return related.pk if related is not None else None
+        return getattr(obj, field.attname)
+
+    return copy_rows(
+        model,
+        [field.attname for field in fields],
+        (tuple(value(obj, field) for field in fields) for obj in objs),
+    )
+
+
+def insert_events(rows):
+    def insert(batch):
+        ExerciseEvent.objects.bulk_create(batch)
+        return len(batch)
+
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(ExerciseEvent(**dict(zip(EVENT_FIELDS, row))))
+        if len(batch) == BATCH_SIZE:
+            count += insert(batch)
+            batch = []
+    return count + insert(batch)
+
+
+def generate(users, sessions_per_user, rebuild_derived=True, **options):
+    """
+    Generate `users` users with `sessions_per_user` sessions each (see
+    Workload for the other options); returns the report of rows written.
+    """
+    return Workload(users, sessions_per_user, **options).run(rebuild_derived=rebuild_derived)
@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from .models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseEvent,
+    GymSession,
+    MuscleGroup,
+    Tag,
+    Tombstone,
+    UserLocation,
+)
+from .services import bootstrap, catalog_cache, defaults, exercise_usage, search
+
+# Model -> type name used by the sync API.
+SYNC_TYPES = {
+    UserLocation: "location",
+    MuscleGroup: "muscle_group",
+    Tag: "tag",
+    Exercise: "exercise",
+    GymSession: "session",
+    ExerciseCompletion: "completion",
+    ExerciseEvent: "event",
+}
+
+
+def _owner_id(instance):
+    if isinstance(instance, ExerciseEvent):
+        return instance.completion.user_id
+    return instance.user_id
+
+
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for the change feed when a synced row is deleted
+    directly (instance.delete()). Rows removed by cascade are covered by
+    their parent's; queryset deletes write their own tombstones.
+    """
+    if origin is not instance:
+        return
+    Tombstone.objects.create(
+        user_id=_owner_id(instance),
+        model=SYNC_TYPES[sender],
+        object_id=instance.pk,
+        client_id=instance.client_id,
+    )
+
+
+for _model in SYNC_TYPES:
+    post_delete.connect(record_tombstone, sender=_model, dispatch_uid=f"tombstone-{_model.__name__}")
+
+
+def invalidate_catalog(sender, instance, **kwargs):
+    """
+    Catalog rows (and completions, which drive exercises' last_completed_at)
+    changed: drop the owner's cached catalog responses.
+    """
+    catalog_cache.bump(instance.user_id)
+    if instance.user_id is None:
+        defaults.expire()
+
+
+def invalidate_catalog_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse and pk_set:
+        owners = Exercise.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+    else:
+        owners = [instance.user_id]
+    for owner_id in set(owners):
+        catalog_cache.bump(owner_id)
+
+
+for _model in (MuscleGroup, Tag, Exercise, ExerciseCompletion):
+    post_save.connect(invalidate_catalog, sender=_model, dispatch_uid=f"catalog-save-{_model.__name__}")
+    post_delete.connect(invalidate_catalog, sender=_model, dispatch_uid=f"catalog-delete-{_model.__name__}")
+
+for _through in (Exercise.muscle_groups.through, Exercise.tags.through):
+    m2m_changed.connect(invalidate_catalog_links, sender=_through, dispatch_uid=f"catalog-m2m-{_through.__name__}")
+
+
+def invalidate_bootstrap(sender, instance, **kwargs):
+    """
+    Sessions, locations and the profile are part of the cached bootstrap
+    payload (see gym.services.bootstrap).
+    """
+    bootstrap.bump(instance.user_id)
+
+
+def invalidate_bootstrap_profile(sender, instance, **kwargs):
+    bootstrap.bump(instance.pk)
+
+
+for _model in (GymSession, UserLocation):
+    post_save.connect(invalidate_bootstrap, sender=_model, dispatch_uid=f"bootstrap-save-{_model.__name__}")
+    post_delete.connect(invalidate_bootstrap, sender=_model, dispatch_uid=f"bootstrap-delete-{_model.__name__}")
+
+post_save.connect(invalidate_bootstrap_profile, sender=settings.AUTH_USER_MODEL, dispatch_uid="bootstrap-profile")
+
+
+def refresh_exercise_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.schedule([instance.pk])
+
+
+def refresh_search_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            search.schedule([instance.pk])
+    elif action == "pre_clear":
+        instance._search_exercise_ids = search.exercises_linked_to(instance)
+    elif action == "post_clear":
+        search.schedule(instance._search_exercise_ids)
+    elif action.startswith("post_"):
+        search.schedule(pk_set)
+
+
+def refresh_category_search(sender, instance, raw=False, **kwargs):
+    """
+    A renamed tag/muscle group changes the documents of its exercises.
+    """
+    if not raw:
+        search.schedule(search.exercises_linked_to(instance))
+
+
+def remember_category_exercises(sender, instance, **kwargs):
+    # The links are gone by post_delete.
+    instance._search_exercise_ids = search.exercises_linked_to(instance)
+
+
+def refresh_deleted_category_search(sender, instance, **kwargs):
+    search.schedule(instance._search_exercise_ids)
+
+
+post_save.connect(refresh_exercise_search, sender=Exercise, dispatch_uid="search-exercise")
+
+for _through in (Exercise.muscle_groups.through, Exercise.tags.through):
+    m2m_changed.connect(refresh_search_links, sender=_through, dispatch_uid=f"search-m2m-{_through.__name__}")
+
+for _model in (MuscleGroup, Tag):
+    post_save.connect(refresh_category_search, sender=_model, dispatch_uid=f"search-save-{_model.__name__}")
+    pre_delete.connect(remember_category_exercises, sender=_model, dispatch_uid=f"search-pre-delete-{_model.__name__}")
+    post_delete.connect(refresh_deleted_category_search, sender=_model, dispatch_uid=f"search-delete-{_model.__name__}")
+
+
+def track_completion_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        exercise_usage.touch(instance)
+
+
+def track_completion_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, GymSession):
+        # Deleted along with its session: forgotten together, below.
+        origin._deleted_completions = [*getattr(origin, "_deleted_completions", []), instance]
+        return
+    exercise_usage.forget(instance)
+
+
+def track_session_deleted(sender, instance, **kwargs):
+    # Cascaded completions are deleted (and their post_delete sent) first.
+    exercise_usage.forget_many(getattr(instance, "_deleted_completions", []))
+
+
+post_save.connect(track_completion_saved, sender=ExerciseCompletion, dispatch_uid="usage-completion-save")
+post_delete.connect(track_completion_deleted, sender=ExerciseCompletion, dispatch_uid="usage-completion-delete")
+post_delete.connect(track_session_deleted, sender=GymSession, dispatch_uid="usage-session-delete")
+
+# Every request checks the default rows' version once (see services.defaults).
+request_started.connect(defaults.expire, dispatch_uid="defaults-expire")
@@ -1,3 +1,2128 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import metrics, query_budget, urls
+from .serializers import fast
+from .serializers.events import ExerciseEventSerializer
+from .services import catalog_cache, defaults, importer, jobs, records, rollups, search
+from .services import sessions as sessions_service
+from .views.exercises import ExerciseViewSet
+from .models import (
+    CacheVersion,
+    Exercise,
+    ExerciseCompletion,
+    ExerciseDailyRollup,
+    ExerciseEvent,
+    ExerciseLastCompletion,
+    GymSession,
+    Job,
+    JobOutputChunk,
+    MuscleGroup,
+    MuscleGroupWeeklyRollup,
+    PersonalRecord,
+    Tag,
+    Tombstone,
+    UserLocation,
+)
+
+User = get_user_model()
+
+
+@override_settings(GYM_ENFORCE_QUERY_BUDGETS=True)
+class GymTestCase(APITestCase):
+    """
+    Shared fixtures: one authenticated user with a couple of exercises
+    and categories, plus helpers to build session history. Every request
+    is held to its view's query budget (see gym.query_budget).
+    """
+
+    def setUp(self):
+        # Cached catalog responses are keyed by user id, which the test
+        # database hands out again after every rollback.
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="lifter@example.com",
+            email="lifter@example.com",
+            password="pw",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.chest = MuscleGroup.objects.create(name="Chest", is_default=True)
+        self.arms = MuscleGroup.objects.create(user=self.user, name="Arms")
+        self.push = Tag.objects.create(name="push", is_default=True)
+        self.barbell = Tag.objects.create(user=self.user, name="barbell")
+
+        self.bench = Exercise.objects.create(user=self.user, name="Bench Press")
+        self.bench.muscle_groups.set([self.chest, self.arms])
+        self.bench.tags.set([self.push, self.barbell])
+        self.curl = Exercise.objects.create(user=self.user, name="Curl")
+        self.curl.muscle_groups.set([self.arms])
+
+        self.location = UserLocation.objects.create(user=self.user, name="Home gym")
+
+    def make_session(self, exercises=None, sets=3, closed=True, user=None):
+        user = user or self.user
+        session = GymSession.objects.create(user=user, location=self.location)
+        for exercise in exercises if exercises is not None else [self.bench, self.curl]:
+            completion = ExerciseCompletion.objects.create(
+                user=user, session=session, exercise=exercise
+            )
+            for i in range(1, sets + 1):
+                ExerciseEvent.objects.create(
+                    completion=completion,
+                    order_index=i,
+                    reps=10,
+                    weight=Decimal("100.00") + i,
+                )
+        if closed:
+            session.close()
+        return session
+
+    def count_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(resp.status_code, 400, resp.content)
+        return len(ctx.captured_queries)
+
+
+class SessionQueryPlanTests(GymTestCase):
+    def test_list_query_count_is_constant(self):
+        self.make_session()
+        small = self.count_queries("get", "/api/sessions/")
+
+        for _ in range(10):
+            self.make_session(sets=5)
+        large = self.count_queries("get", "/api/sessions/")
+
+        self.assertEqual(small, large)
+
+    def test_detail_runs_fixed_number_of_queries(self):
+        session = self.make_session()
+        # session+location, completions+exercise, muscle groups, tags, events
+        with self.assertNumQueries(5):
+            resp = self.client.get(f"/api/sessions/{session.id}/")
+        completions = resp.data["exercise_completions"]
+        self.assertEqual(len(completions), 2)
+        self.assertEqual(
+            [e["order_index"] for e in completions[0]["events"]], [1, 2, 3]
+        )
+
+    def test_detail_query_count_is_constant(self):
+        small = self.make_session(sets=1)
+        large = self.make_session(sets=20)
+        self.assertEqual(
+            self.count_queries("get", f"/api/sessions/{small.id}/"),
+            self.count_queries("get", f"/api/sessions/{large.id}/"),
+        )
+
+
+class SessionHistoryTests(GymTestCase):
+    def test_list_is_cursor_paginated_newest_first(self):
+        sessions = [self.make_session(sets=1) for _ in range(5)]
+
+        resp = self.client.get("/api/sessions/", {"page_size": 2})
+        self.assertEqual(
+            [s["id"] for s in resp.data["results"]],
+            [sessions[4].id, sessions[3].id],
+        )
+
+        seen = [s["id"] for s in resp.data["results"]]
+        next_url = resp.data["next"]
+        while next_url:
+            resp = self.client.get(next_url)
+            seen += [s["id"] for s in resp.data["results"]]
+            next_url = resp.data["next"]
+        self.assertEqual(seen, [s.id for s in reversed(sessions)])
+
+    def test_cursor_pages_sessions_with_the_same_start_time(self):
+        when = timezone.now()
+        sessions = [
+            GymSession.objects.create(user=self.user, start_time=when, end_time=when)
+            for _ in range(5)
+        ]
+
+        seen = []
+        next_url = "/api/sessions/?page_size=2"
+        while next_url:
+            resp = self.client.get(next_url)
+            seen += [s["id"] for s in resp.data["results"]]
+            next_url = resp.data["next"]
+        self.assertEqual(seen, [s.id for s in reversed(sessions)])
+
+    def test_list_serves_summaries(self):
+        session = self.make_session(sets=3)
+        row = self.client.get("/api/sessions/").data["results"][0]
+
+        self.assertNotIn("exercise_completions", row)
+        self.assertEqual(row["id"], session.id)
+        self.assertEqual(row["exercise_count"], 2)
+        self.assertEqual(row["set_count"], 6)
+        # 2 exercises x (10x101 + 10x102 + 10x103)
+        self.assertEqual(Decimal(row["total_volume"]), Decimal("6120"))
+        self.assertEqual(row["total_reps"], 60)
+        self.assertEqual(row["total_distance"], "0.00")
+        self.assertEqual(row["total_duration_seconds"], 0)
+        self.assertEqual(row["location"]["name"], "Home gym")
+        self.assertEqual(
+            row["elapsed_seconds"], int((session.end_time - session.start_time).total_seconds())
+        )
+        self.assertNotIn("duration_seconds", row)
+
+    def test_summary_totals_cardio(self):
+        session = GymSession.objects.create(user=self.user)
+        completion = ExerciseCompletion.objects.create(user=self.user, session=session, exercise=self.curl)
+        ExerciseEvent.objects.create(completion=completion, distance=Decimal("1.50"), duration_seconds=600)
+        ExerciseEvent.objects.create(completion=completion, distance=Decimal("1.25"), duration_seconds=540)
+        session.close(when=session.start_time + timedelta(minutes=25))
+
+        row = self.client.get("/api/sessions/").data["results"][0]
+        self.assertEqual(row["total_distance"], "2.75")
+        self.assertEqual(row["total_duration_seconds"], 1140)
+        self.assertEqual(row["total_reps"], 0)
+        self.assertEqual(row["total_volume"], "0.00")
+        self.assertEqual(row["elapsed_seconds"], 25 * 60)
+
+    def test_summary_list_of_100_runs_one_query(self):
+        for _ in range(100):
+            self.make_session(sets=2)
+        # Sessions, location and every total in a single SELECT.
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/sessions/", {"page_size": 100})
+        self.assertEqual(len(resp.data["results"]), 100)
+        self.assertTrue(all(row["set_count"] == 4 for row in resp.data["results"]))
+
+    def test_summary_view_on_detail(self):
+        session = self.make_session(exercises=[], closed=False)
+        row = self.client.get(
+            f"/api/sessions/{session.id}/", {"view": "summary"}
+        ).data
+        self.assertEqual(row["exercise_count"], 0)
+        self.assertEqual(row["set_count"], 0)
+        self.assertEqual(Decimal(row["total_volume"]), Decimal("0"))
+        self.assertIsNone(row["elapsed_seconds"])
+
+        current = self.client.get("/api/sessions/current/", {"view": "summary"})
+        self.assertNotIn("exercise_completions", current.data)
+
+
+class LastCompletionTests(GymTestCase):
+    def last_completion_id(self, exercise):
+        resp = self.client.get(f"/api/exercises/{exercise.id}/last_completion/")
+        return resp.data["id"] if resp.status_code == 200 else None
+
+    def bench_completion(self, session):
+        return session.exercise_completions.get(exercise=self.bench)
+
+    def test_tracks_latest_closed_completion(self):
+        first = self.make_session()
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(first).id)
+
+        second = self.make_session()
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(second).id)
+
+        # An open session never counts as "last time".
+        self.make_session(closed=False)
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(second).id)
+
+    def test_reopen_and_close_update_record(self):
+        first = self.make_session()
+        second = self.make_session()
+
+        self.client.post(f"/api/sessions/{second.id}/reopen/")
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(first).id)
+
+        self.client.post(f"/api/sessions/{second.id}/close/")
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(second).id)
+
+    def test_event_and_completion_deletes_fall_back(self):
+        first = self.make_session()
+        second = self.make_session(sets=1)
+        completion = self.bench_completion(second)
+
+        event = completion.events.get()
+        self.client.delete(f"/api/events/{event.id}/")
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(first).id)
+
+        self.client.delete(f"/api/exercise-completions/{self.bench_completion(first).id}/")
+        self.assertIsNone(self.last_completion_id(self.bench))
+
+    def test_open_session_writes_skip_the_refresh(self):
+        self.make_session()
+        current = self.make_session(sets=1, closed=False)
+        completion = self.bench_completion(current)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(
+                "/api/events/", {"completion": completion.id, "reps": 5}, format="json"
+            )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertFalse(any("gym_exerciselastcompletion" in q["sql"] for q in ctx.captured_queries))
+
+    def test_sets_added_to_a_closed_session_count(self):
+        first = self.make_session()
+        second = self.make_session(exercises=[self.curl])
+        completion = ExerciseCompletion.objects.create(
+            user=self.user, session=second, exercise=self.bench
+        )
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(first).id)
+
+        self.client.post("/api/events/", {"completion": completion.id, "reps": 5}, format="json")
+        self.assertEqual(self.last_completion_id(self.bench), completion.id)
+
+    def test_session_delete_falls_back(self):
+        first = self.make_session()
+        second = self.make_session()
+        self.client.delete(f"/api/sessions/{second.id}/")
+        self.assertEqual(self.last_completion_id(self.bench), self.bench_completion(first).id)
+
+    def test_rebuild_command(self):
+        self.make_session()
+        latest = self.make_session()
+        expected = set(ExerciseLastCompletion.objects.values_list("exercise_id", "completion_id"))
+        ExerciseLastCompletion.objects.all().delete()
+
+        call_command("rebuild_last_completions", stdout=StringIO())
+        self.assertEqual(
+            set(ExerciseLastCompletion.objects.values_list("exercise_id", "completion_id")),
+            expected,
+        )
+        self.assertIn((self.bench.id, self.bench_completion(latest).id), expected)
+
+
+class IndexTests(GymTestCase):
+    def test_only_one_open_session_per_user(self):
+        GymSession.objects.create(user=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GymSession.objects.create(user=self.user)
+        # Closed sessions are unconstrained.
+        GymSession.objects.create(user=self.user, end_time=timezone.now())
+        GymSession.objects.create(user=self.user, end_time=timezone.now())
+
+    def test_explain_hot_queries_rolls_back(self):
+        out = StringIO()
+        call_command(
+            "explain_hot_queries", users=2, sessions_per_user=5, stdout=out
+        )
+        self.assertIn("=== BEFORE (without indexes) ===", out.getvalue())
+        self.assertIn("gym_session_user_start_idx", out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith="explain-").exists())
+
+
+class ProgressTests(GymTestCase):
+    def backdate(self, session, when):
+        ExerciseEvent.objects.filter(completion__session=session).update(created_at=when)
+        rollups.rebuild([self.user.id])
+
+    def test_daily_and_weekly_buckets(self):
+        monday = timezone.now().replace(year=2025, month=3, day=3, hour=12)
+        self.backdate(self.make_session(sets=2), monday)
+        self.backdate(self.make_session(sets=1), monday + timedelta(days=2))
+
+        resp = self.client.get(f"/api/exercises/{self.bench.id}/progress/", {"bucket": "day"})
+        self.assertEqual(resp.status_code, 200)
+        series = resp.data["series"]
+        self.assertEqual([p["period"] for p in series], ["2025-03-03", "2025-03-05"])
+        first = series[0]
+        self.assertEqual(first["set_count"], 2)
+        self.assertEqual(first["top_set_weight"], "102.00")
+        self.assertEqual(first["total_volume"], "2030.00")
+        # Epley on 102 x 10
+        self.assertEqual(first["estimated_1rm"], "136.00")
+        self.assertNotIn("total_distance", first)
+
+        weekly = self.client.get(f"/api/exercises/{self.bench.id}/progress/").data
+        self.assertEqual(weekly["bucket"], "week")
+        self.assertEqual(len(weekly["series"]), 1)
+        self.assertEqual(weekly["series"][0]["set_count"], 3)
+
+    def test_honours_track_flags_and_range(self):
+        run = Exercise.objects.create(
+            user=self.user, name="Run", track_reps=False, track_weight=False,
+            track_distance=True, track_duration=True,
+        )
+        session = GymSession.objects.create(user=self.user)
+        completion = ExerciseCompletion.objects.create(user=self.user, session=session, exercise=run)
+        ExerciseEvent.objects.create(completion=completion, distance=Decimal("1.50"), duration_seconds=600)
+        ExerciseEvent.objects.create(completion=completion, distance=Decimal("1.25"), duration_seconds=540)
+        rollups.rebuild([self.user.id])
+
+        data = self.client.get(f"/api/exercises/{run.id}/progress/").data
+        self.assertEqual(data["metrics"], ["set_count", "total_distance", "total_duration_seconds"])
+        self.assertEqual(data["series"][0]["total_distance"], "2.75")
+        self.assertEqual(data["series"][0]["total_duration_seconds"], 1140)
+
+        empty = self.client.get(
+            f"/api/exercises/{run.id}/progress/", {"until": "2000-01-01"}
+        ).data
+        self.assertEqual(empty["series"], [])
+
+        bad = self.client.get(
+            f"/api/exercises/{run.id}/progress/", {"since": "2025-02-01", "until": "2025-01-01"}
+        )
+        self.assertEqual(bad.status_code, 400)
+
+
+
+class RollupTests(GymTestCase):
+    def daily(self, exercise=None):
+        return ExerciseDailyRollup.objects.get(user=self.user, exercise=exercise or self.bench)
+
+    def weekly(self, muscle_group):
+        return MuscleGroupWeeklyRollup.objects.get(user=self.user, muscle_group=muscle_group)
+
+    def test_event_writes_update_rollups_incrementally(self):
+        session = GymSession.objects.create(user=self.user)
+        completion = self.client.post(
+            "/api/exercise-completions/", {"session": session.id, "exercise_id": self.bench.id}
+        ).data
+        first = self.client.post(
+            "/api/events/", {"completion": completion["id"], "reps": 5, "weight": "100"}
+        ).data
+        self.client.post(
+            "/api/events/", {"completion": completion["id"], "order_index": 2, "reps": 5, "weight": "120"}
+        )
+
+        day = self.daily()
+        self.assertEqual(day.set_count, 2)
+        self.assertEqual(day.total_volume, Decimal("1100"))
+        self.assertEqual(day.top_set_weight, Decimal("120"))
+        # Chest and Arms both get the bench volume.
+        self.assertEqual(self.weekly(self.chest).total_volume, Decimal("1100"))
+        self.assertEqual(self.weekly(self.arms).set_count, 2)
+
+        self.client.patch(f"/api/events/{first['id']}/", {"weight": "110"})
+        self.assertEqual(self.daily().total_volume, Decimal("1150"))
+
+        self.client.delete(f"/api/events/{first['id']}/")
+        self.assertEqual(self.daily().set_count, 1)
+        self.assertEqual(self.weekly(self.chest).total_volume, Decimal("600"))
+
+        self.client.delete(f"/api/exercise-completions/{completion['id']}/")
+        self.assertFalse(ExerciseDailyRollup.objects.exists())
+        self.assertFalse(MuscleGroupWeeklyRollup.objects.exists())
+
+    def test_completion_move_and_regrouping(self):
+        session = self.make_session(exercises=[self.bench], sets=2, closed=False)
+        rollups.rebuild([self.user.id])
+        completion = session.exercise_completions.get()
+
+        self.client.patch(
+            f"/api/exercise-completions/{completion.id}/", {"exercise_id": self.curl.id}
+        )
+        self.assertFalse(ExerciseDailyRollup.objects.filter(exercise=self.bench).exists())
+        self.assertEqual(self.daily(self.curl).set_count, 2)
+        self.assertFalse(MuscleGroupWeeklyRollup.objects.filter(muscle_group=self.chest).exists())
+
+        self.client.patch(
+            f"/api/exercises/{self.curl.id}/", {"muscle_group_ids": [self.chest.id]}, format="json"
+        )
+        self.assertEqual(self.weekly(self.chest).set_count, 2)
+        self.assertFalse(MuscleGroupWeeklyRollup.objects.filter(muscle_group=self.arms).exists())
+
+    def test_rebuild_matches_incremental(self):
+        session = GymSession.objects.create(user=self.user)
+        for exercise in [self.bench, self.curl, self.bench]:
+            completion = self.client.post(
+                "/api/exercise-completions/",
+                {"session": session.id, "exercise_id": exercise.id},
+            ).data
+            for reps in (5, 8):
+                self.client.post(
+                    "/api/events/", {"completion": completion["id"], "reps": reps, "weight": "60"}
+                )
+        incremental = sorted(ExerciseDailyRollup.objects.values_list("exercise_id", "set_count", "total_volume"))
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertEqual(
+            sorted(ExerciseDailyRollup.objects.values_list("exercise_id", "set_count", "total_volume")),
+            incremental,
+        )
+
+    def test_muscle_group_progress(self):
+        self.make_session(sets=2)
+        rollups.rebuild([self.user.id])
+        data = self.client.get(f"/api/muscle-groups/{self.arms.id}/progress/").data
+        # bench (2 sets) + curl (2 sets)
+        self.assertEqual(data["series"][0]["set_count"], 4)
+
+
+class PersonalRecordTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        session = GymSession.objects.create(user=self.user)
+        self.completion = ExerciseCompletion.objects.create(
+            user=self.user, session=session, exercise=self.bench
+        )
+
+    def log(self, reps, weight):
+        resp = self.client.post(
+            "/api/events/", {"completion": self.completion.id, "reps": reps, "weight": weight}
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        return resp.data
+
+    def record(self, metric, at_weight=0):
+        return PersonalRecord.objects.get(
+            user=self.user, exercise=self.bench, metric=metric, at_weight=at_weight
+        )
+
+    def test_failed_bookkeeping_rolls_back_the_set(self):
+        self.log(5, "100")
+        with mock.patch.object(rollups, "refresh", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    "/api/events/", {"completion": self.completion.id, "reps": 3, "weight": "110"}
+                )
+        self.assertEqual(self.completion.events.count(), 1)
+        self.assertEqual(self.record(PersonalRecord.MAX_WEIGHT).value, Decimal("100"))
+
+        session = self.completion.session
+        with mock.patch.object(rollups, "refresh", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.delete(f"/api/sessions/{session.id}/")
+        self.assertTrue(GymSession.objects.filter(pk=session.pk).exists())
+        self.assertEqual(self.record(PersonalRecord.MAX_WEIGHT).value, Decimal("100"))
+
+    def test_detects_new_records_on_create(self):
+        baseline = self.log(5, "100")
+        self.assertEqual(baseline["new_records"], [])
+
+        same = self.log(5, "100")
+        self.assertEqual(same["new_records"], [])
+
+        heavier = self.log(3, "110")
+        metrics = {r["metric"]: r for r in heavier["new_records"]}
+        self.assertEqual(metrics["max_weight"]["value"], "110.00")
+        self.assertEqual(metrics["max_weight"]["previous"], "100.00")
+        # 3 reps at 110 is a new weight, so it is a baseline, not a beaten record.
+        self.assertNotIn("max_reps_at_weight", metrics)
+
+        more_reps = self.log(8, "100")
+        metrics = {r["metric"]: r for r in more_reps["new_records"]}
+        self.assertEqual(metrics["max_reps_at_weight"]["at_weight"], "100.00")
+        self.assertEqual(metrics["max_reps_at_weight"]["value"], "8.00")
+        self.assertIn("best_estimated_1rm", metrics)
+
+    def test_detection_does_not_scan_history(self):
+        for _ in range(10):
+            self.log(5, "100")
+        event = ExerciseEvent.objects.create(completion=self.completion, reps=5, weight=Decimal("120"))
+        with CaptureQueriesContext(connection) as ctx:
+            records.record_event(event, exercise=self.bench)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if "gym_exerciseevent" in q["sql"]]
+        )
+
+    def test_deleting_and_lowering_the_holder_recomputes(self):
+        self.log(5, "100")
+        top = self.log(5, "120")
+        self.assertEqual(self.record("max_weight").event_id, top["id"])
+
+        self.client.patch(f"/api/events/{top['id']}/", {"weight": "90"})
+        self.assertEqual(self.record("max_weight").value, Decimal("100"))
+
+        second = self.log(5, "130")
+        self.client.delete(f"/api/events/{second['id']}/")
+        self.assertEqual(self.record("max_weight").value, Decimal("100"))
+
+        self.client.delete(f"/api/exercise-completions/{self.completion.id}/")
+        self.assertFalse(PersonalRecord.objects.exists())
+
+    def test_pace_and_distance(self):
+        run = Exercise.objects.create(
+            user=self.user, name="Run", track_reps=False, track_weight=False,
+            track_distance=True, track_duration=True,
+        )
+        completion = ExerciseCompletion.objects.create(
+            user=self.user, session=self.completion.session, exercise=run
+        )
+        self.client.post("/api/events/", {"completion": completion.id, "distance": "2", "duration_seconds": 960})
+        resp = self.client.post("/api/events/", {"completion": completion.id, "distance": "1", "duration_seconds": 420})
+        metrics = {r["metric"]: r["value"] for r in resp.data["new_records"]}
+        self.assertEqual(metrics, {"best_pace": "420.00"})
+
+        call_command("rebuild_records", stdout=StringIO())
+        self.assertEqual(
+            PersonalRecord.objects.get(exercise=run, metric="max_distance").value, Decimal("2")
+        )
+
+
+class BulkEventTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = GymSession.objects.create(user=self.user)
+        self.completion = ExerciseCompletion.objects.create(
+            user=self.user, session=self.session, exercise=self.bench
+        )
+        self.url = f"/api/exercise-completions/{self.completion.id}/events/bulk/"
+
+    def test_create_update_delete_in_one_request(self):
+        resp = self.client.post(self.url, [
+            {"op": "create", "order_index": 1, "reps": 5, "weight": "100"},
+            {"op": "create", "order_index": 2, "reps": 5, "weight": "105"},
+            {"op": "create", "order_index": 3, "reps": 5, "weight": "110"},
+        ], format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual([e["order_index"] for e in resp.data], [1, 2, 3])
+
+        resp = self.client.post(self.url, [
+            {"op": "update", "order_index": 2, "reps": 8},
+            {"op": "delete", "order_index": 3},
+            {"op": "create", "order_index": 4, "duration_value": 2, "duration_unit": "min"},
+        ], format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        rows = {e["order_index"]: e for e in resp.data}
+        self.assertEqual(sorted(rows), [1, 2, 4])
+        self.assertEqual(rows[2]["reps"], 8)
+        self.assertEqual(rows[2]["weight"], "105.00")
+        self.assertEqual(rows[4]["duration_seconds"], 120)
+
+        # Derived tables follow the batch.
+        self.assertEqual(ExerciseDailyRollup.objects.get(exercise=self.bench).set_count, 3)
+        self.assertEqual(
+            PersonalRecord.objects.get(exercise=self.bench, metric="max_weight").value,
+            Decimal("105"),
+        )
+
+    def test_deletes_leave_tombstones_in_one_insert(self):
+        self.client.post(self.url, [
+            {"op": "create", "order_index": i, "reps": 5} for i in range(1, 6)
+        ], format="json")
+        # The budget's repeat limit fails the request on a per-event query.
+        self.count_queries("post", self.url, data=[
+            {"op": "delete", "order_index": i} for i in range(1, 6)
+        ], format="json")
+        self.assertFalse(self.completion.events.exists())
+        self.assertEqual(
+            list(Tombstone.objects.values_list("model", "user_id")), [("event", self.user.id)] * 5
+        )
+
+    def test_invalid_batch_changes_nothing(self):
+        self.client.post(self.url, [{"op": "create", "order_index": 1, "reps": 5}], format="json")
+        resp = self.client.post(self.url, [
+            {"op": "update", "order_index": 1, "reps": 6},
+            {"op": "delete", "order_index": 9},
+        ], format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.completion.events.get().reps, 5)
+
+        resp = self.client.post(self.url, [
+            {"op": "create", "order_index": 2},
+            {"op": "create", "order_index": 2},
+        ], format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_other_users_completion_is_not_found(self):
+        other = User.objects.create_user(username="other", password="pw")
+        self.client.force_authenticate(other)
+        resp = self.client.post(self.url, [{"op": "create", "order_index": 1}], format="json")
+        self.assertEqual(resp.status_code, 404)
+        self.assertFalse(self.completion.events.exists())
+
+
+class SyncTests(GymTestCase):
+    def sync_push(self, operations):
+        resp = self.client.post("/api/sync/push/", {"operations": operations}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()["results"]
+
+    def test_changes_since_token(self):
+        full = self.client.get("/api/sync/changes/").json()
+        self.assertEqual(
+            {row["name"] for row in full["changes"]["exercises"]}, {"Bench Press", "Curl"}
+        )
+        self.assertEqual(full["deleted"], [])
+
+        # Everything so far is older than the next token.
+        for model in (Exercise, UserLocation, MuscleGroup, Tag):
+            model.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        token = self.client.get("/api/sync/changes/").json()["token"]
+
+        self.client.patch(f"/api/exercises/{self.curl.id}/", {"name": "Hammer Curl"}, format="json")
+        self.client.delete(f"/api/locations/{self.location.id}/")
+
+        data = self.client.get("/api/sync/changes/", {"since": token}).json()
+        self.assertEqual([row["name"] for row in data["changes"]["exercises"]], ["Hammer Curl"])
+        self.assertEqual(data["changes"]["exercises"][0]["muscle_groups"], [self.arms.id])
+        self.assertEqual(data["changes"]["locations"], [])
+        self.assertEqual(data["deleted"], [
+            {"type": "location", "id": self.location.id, "client_id": None},
+        ])
+
+    def test_changes_are_paged_with_a_cursor(self):
+        self.make_session()
+        since = self.client.get("/api/sync/changes/").json()["token"]
+        full = self.client.get("/api/sync/changes/").json()
+        self.client.delete(f"/api/locations/{self.location.id}/")
+
+        pages, params = [], {"limit": 3}
+        while True:
+            page = self.client.get("/api/sync/changes/", params).json()
+            pages.append(page)
+            if not page["has_more"]:
+                break
+            params = {"cursor": page["cursor"], "limit": 3}
+        self.assertGreater(len(pages), 2)
+        self.assertTrue(all(sum(map(len, p["changes"].values())) <= 3 for p in pages))
+        # Every row once, in feed order; one token for the whole pass.
+        for key, rows in full["changes"].items():
+            paged = [row["id"] for p in pages for row in p["changes"][key]]
+            if key == "locations":
+                rows = []
+            self.assertEqual(paged, [row["id"] for row in rows], key)
+        self.assertEqual(len({p["token"] for p in pages}), 1)
+
+        pages = [self.client.get("/api/sync/changes/", {"since": since, "limit": 1}).json()]
+        while pages[-1]["has_more"]:
+            pages.append(self.client.get(
+                "/api/sync/changes/", {"cursor": pages[-1]["cursor"], "limit": 1}
+            ).json())
+        self.assertEqual([p["deleted"] for p in pages][-1], [
+            {"type": "location", "id": self.location.id, "client_id": None},
+        ])
+        self.assertTrue(all(p["deleted"] == [] for p in pages[:-1]))
+
+        resp = self.client.get("/api/sync/changes/", {"cursor": "nope"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_cascaded_children_get_no_tombstone(self):
+        session = self.make_session()
+        self.client.delete(f"/api/sessions/{session.id}/")
+        self.assertEqual(list(Tombstone.objects.values_list("model", flat=True)), ["session"])
+
+    def test_push_is_idempotent_and_resolves_client_ids(self):
+        session_cid, completion_cid, event_cid = (str(uuid.uuid4()) for _ in range(3))
+        operations = [
+            {"type": "session", "op": "upsert", "client_id": session_cid,
+             "data": {"location_id": str(self.location.id)}},
+            {"type": "completion", "op": "upsert", "client_id": completion_cid,
+             "data": {"session": session_cid, "exercise_id": self.bench.id}},
+            {"type": "event", "op": "upsert", "client_id": event_cid,
+             "data": {"completion": completion_cid, "order_index": 1, "reps": 5, "weight": "100"}},
+        ]
+        first = self.sync_push(operations)
+        self.assertEqual([r["status"] for r in first], ["applied"] * 3)
+        second = self.sync_push(operations)
+        self.assertEqual([r["id"] for r in second], [r["id"] for r in first])
+
+        self.assertEqual(GymSession.objects.get().client_id, uuid.UUID(session_cid))
+        event = ExerciseEvent.objects.get()
+        self.assertEqual(event.completion.session.location, self.location)
+        # Pushed writes go through the normal hooks.
+        self.assertEqual(ExerciseDailyRollup.objects.get().set_count, 1)
+
+        results = self.sync_push([
+            {"type": "event", "op": "upsert", "client_id": event_cid, "data": {"reps": 8}},
+            {"type": "event", "op": "delete", "client_id": str(uuid.uuid4())},
+        ])
+        self.assertEqual([r["status"] for r in results], ["applied", "applied"])
+        event.refresh_from_db()
+        self.assertEqual(event.reps, 8)
+
+        self.sync_push([{"type": "session", "op": "delete", "client_id": session_cid}])
+        self.assertFalse(ExerciseEvent.objects.exists())
+        self.assertEqual(Tombstone.objects.get().client_id, uuid.UUID(session_cid))
+
+    def test_pushed_session_writes_go_through_the_lifecycle(self):
+        first, second = str(uuid.uuid4()), str(uuid.uuid4())
+        self.sync_push([
+            {"type": "session", "op": "upsert", "client_id": first, "data": {}},
+            {"type": "completion", "op": "upsert", "client_id": str(uuid.uuid4()),
+             "data": {"session": first, "exercise_id": self.bench.id}},
+        ])
+        completion = ExerciseCompletion.objects.get()
+        ExerciseEvent.objects.create(completion=completion, order_index=1, reps=5)
+
+        self.sync_push([{"type": "session", "op": "upsert", "client_id": first,
+                         "data": {"end_time": timezone.now().isoformat()}}])
+        self.assertEqual(ExerciseLastCompletion.objects.get().completion, completion)
+
+        results = self.sync_push([
+            {"type": "session", "op": "upsert", "client_id": second, "data": {}},
+            {"type": "session", "op": "upsert", "client_id": first, "data": {"end_time": None}},
+        ])
+        self.assertEqual([r["status"] for r in results], ["applied", "applied"])
+        self.assertEqual(
+            sessions_service.open_sessions(self.user).get().client_id, uuid.UUID(first)
+        )
+
+        with mock.patch.object(sessions_service, "update", side_effect=IntegrityError("raw")):
+            results = self.sync_push([
+                {"type": "session", "op": "upsert", "client_id": second, "data": {"end_time": None}},
+            ])
+        self.assertEqual(results[0]["status"], "conflict")
+        self.assertNotIn("raw", results[0]["errors"]["detail"])
+
+    def test_pushed_tag_can_be_referenced_in_the_same_batch(self):
+        tag_cid, group_cid, exercise_cid = (str(uuid.uuid4()) for _ in range(3))
+        results = self.sync_push([
+            {"type": "tag", "op": "upsert", "client_id": tag_cid, "data": {"name": "band"}},
+            {"type": "muscle_group", "op": "upsert", "client_id": group_cid, "data": {"name": "Grip"}},
+            {"type": "exercise", "op": "upsert", "client_id": exercise_cid,
+             "data": {"name": "Band Pull", "tag_ids": [tag_cid], "muscle_group_ids": [group_cid]}},
+        ])
+        self.assertEqual([r["status"] for r in results], ["applied"] * 3)
+
+        tag = Tag.objects.get(client_id=tag_cid)
+        self.assertEqual(tag.user, self.user)
+        exercise = Exercise.objects.get(client_id=exercise_cid)
+        self.assertEqual(list(exercise.tags.all()), [tag])
+        self.assertEqual(exercise.muscle_groups.get().client_id, uuid.UUID(group_cid))
+
+        self.sync_push([{"type": "tag", "op": "delete", "client_id": tag_cid}])
+        self.assertFalse(exercise.tags.exists())
+        self.assertEqual(Tombstone.objects.get().client_id, uuid.UUID(tag_cid))
+
+        self.assertEqual(self.client.delete(f"/api/tags/{self.push.id}/").status_code, 400)
+        self.assertTrue(Tag.objects.filter(id=self.push.id).exists())
+
+    def test_push_rejects_other_users_rows(self):
+        cid = str(uuid.uuid4())
+        self.sync_push([{"type": "location", "op": "upsert", "client_id": cid, "data": {"name": "Mine"}}])
+
+        other = User.objects.create_user(username="other", password="pw")
+        self.client.force_authenticate(other)
+        results = self.sync_push([
+            {"type": "location", "op": "upsert", "client_id": cid, "data": {"name": "Theirs"}},
+            {"type": "completion", "op": "upsert", "client_id": str(uuid.uuid4()),
+             "data": {"session": cid, "exercise_id": self.bench.id}},
+            {"type": "location", "op": "upsert", "client_id": str(uuid.uuid4()), "data": {}},
+        ])
+        self.assertEqual([r["status"] for r in results], ["rejected"] * 3)
+        self.assertEqual(UserLocation.objects.get(client_id=cid).name, "Mine")
+        self.assertFalse(ExerciseCompletion.objects.exists())
+
+
+class CatalogCacheTests(GymTestCase):
+    def test_lists_are_served_from_cache(self):
+        for url in ("/api/tags/", "/api/muscle-groups/", "/api/exercises/?ordering=recent"):
+            first = self.client.get(url)
+            # Only the cache versions are read.
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second.json(), first.json())
+
+    def test_etag_and_not_modified(self):
+        resp = self.client.get("/api/tags/")
+        etag = resp["ETag"]
+        resp = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/tags/", {"name": "dumbbell"}, format="json")
+        resp = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("dumbbell", [tag["name"] for tag in resp.json()])
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_writes_invalidate(self):
+        self.client.get("/api/exercises/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/exercises/{self.curl.id}/", {"tag_ids": [self.barbell.id]}, format="json"
+            )
+        curl = next(e for e in self.client.get("/api/exercises/").json() if e["id"] == self.curl.id)
+        self.assertEqual([tag["name"] for tag in curl["tags"]], ["barbell"])
+        self.assertIsNone(curl["last_completed_at"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_session([self.curl])
+        curl = next(e for e in self.client.get("/api/exercises/").json() if e["id"] == self.curl.id)
+        self.assertIsNotNone(curl["last_completed_at"])
+
+    def test_default_rows_invalidate_every_user(self):
+        other = User.objects.create_user(username="other", password="pw")
+        self.client.get("/api/muscle-groups/")
+        self.client.force_authenticate(other)
+        self.client.get("/api/muscle-groups/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MuscleGroup.objects.create(name="Back", is_default=True)
+        for user in (self.user, other):
+            self.client.force_authenticate(user)
+            names = [group["name"] for group in self.client.get("/api/muscle-groups/").json()]
+            self.assertIn("Back", names)
+        self.assertNotIn("Arms", names)
+
+    def test_bumps_from_other_processes_are_seen(self):
+        self.client.get("/api/tags/")
+        # Another process renames a default tag and bumps the shared version.
+        Tag.objects.filter(id=self.push.id).update(name="Pull")
+        CacheVersion.objects.update_or_create(
+            space=catalog_cache.CATALOG, owner_id=catalog_cache.GLOBAL,
+            defaults={"version": F("version") + 1}, create_defaults={"version": 1},
+        )
+        names = [tag["name"] for tag in self.client.get("/api/tags/").json()]
+        self.assertIn("Pull", names)
+
+    def test_bumps_wait_for_the_commit(self):
+        # Also flushes the bumps the fixtures left waiting.
+        with self.captureOnCommitCallbacks(execute=True):
+            catalog_cache.bump(self.user.id)
+        before = catalog_cache.version(self.user.id)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            catalog_cache.bump(self.user.id)
+            raise RuntimeError
+        self.assertEqual(catalog_cache.version(self.user.id), before)
+
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                catalog_cache.bump(self.user.id)
+                catalog_cache.bump(self.user.id)
+            self.assertEqual(len(queries), 0)
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len(queries), 1)
+        self.assertNotEqual(catalog_cache.version(self.user.id), before)
+
+
+class DefaultsCacheTests(GymTestCase):
+    def test_defaults_are_loaded_once(self):
+        self.assertEqual(defaults.rows(Tag), (self.push,))
+        defaults.rows(MuscleGroup)
+        with self.assertNumQueries(0):
+            self.assertEqual(defaults.get(MuscleGroup, str(self.chest.id)), self.chest)
+            self.assertIsNone(defaults.get(MuscleGroup, self.arms.id))
+
+    def test_category_list_reads_defaults_from_cache(self):
+        defaults.rows(MuscleGroup)
+        # cache versions, default rows' version, the user's rows
+        self.assertEqual(self.count_queries("get", "/api/muscle-groups/"), 3)
+        names = [group["name"] for group in self.client.get("/api/muscle-groups/").json()]
+        self.assertEqual(names, ["Arms", "Chest"])
+
+    def test_pk_validation_uses_cache(self):
+        defaults.rows(Tag)
+        resp = self.client.post(
+            "/api/exercises/",
+            {"name": "Dip", "tag_ids": [self.push.id, self.barbell.id]},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual({tag["name"] for tag in resp.json()["tags"]}, {"push", "barbell"})
+
+    def test_seed_defaults_invalidates(self):
+        defaults.rows(Tag)
+        # Bypasses signals, like a change made by another process.
+        Tag.objects.filter(user=None).update(icon="stale")
+        self.assertEqual(defaults.rows(Tag)[0].icon, "")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("seed_defaults", stdout=StringIO())
+        icons = {tag.name: tag.icon for tag in defaults.rows(Tag)}
+        self.assertEqual(icons["push"], "sym_o_arrow_circle_up")
+        self.assertEqual(len(icons), 5)
+
+
+class ExerciseSearchTests(GymTestCase):
+    def setUp(self):
+        # Documents are refreshed on commit, which a TestCase never reaches.
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+
+    def names(self, term, **params):
+        resp = self.client.get("/api/exercises/", {"search": term, **params})
+        return [exercise["name"] for exercise in resp.json()]
+
+    def test_document(self):
+        self.bench.refresh_from_db()
+        self.assertEqual(self.bench.search_text, "bench press barbell push arms chest")
+
+    def test_document_is_built_once_per_write(self):
+        with mock.patch.object(search, "refresh", wraps=search.refresh) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = self.client.post(
+                    "/api/exercises/",
+                    {"name": "Row", "muscle_group_ids": [self.arms.id], "tag_ids": [self.barbell.id]},
+                    format="json",
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    f"/api/exercises/{resp.json()['id']}/",
+                    {"name": "Barbell Row", "muscle_group_ids": [], "tag_ids": [self.push.id]},
+                    format="json",
+                )
+        self.assertEqual(refresh.call_count, 2)
+        self.assertEqual(self.names("row"), ["Barbell Row"])
+        self.assertEqual(
+            Exercise.objects.get(name="Barbell Row").search_text, "barbell row push"
+        )
+
+    def test_rolled_back_refresh_does_not_swallow_later_ones(self):
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.curl.tags.set([self.push])
+                raise RuntimeError
+            Exercise.objects.filter(pk=self.curl.pk).update(name="Hammer Curl")
+            self.curl.tags.set([self.barbell])
+        self.curl.refresh_from_db()
+        self.assertEqual(self.curl.search_text, "hammer curl barbell arms")
+
+    def test_ranked_prefix_search(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.create(user=self.user, name="Incline Bench")
+            Exercise.objects.create(user=self.user, name="Bench")
+        self.assertEqual(self.names("ben"), ["Bench", "Bench Press", "Incline Bench"])
+        self.assertEqual(self.names("ben", ordering="name"), ["Bench", "Bench Press", "Incline Bench"])
+        self.assertEqual(self.names("inc ben"), ["Incline Bench"])
+        # Matches through tags/groups rank after name matches, once each.
+        self.assertEqual(self.names("arm"), ["Bench Press", "Curl"])
+        self.assertEqual(self.names("ARMS chest"), ["Bench Press"])
+
+    def test_follows_category_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barbell.name = "olympic bar"
+            self.barbell.save()
+        self.assertEqual(self.names("olymp"), ["Bench Press"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/exercises/{self.curl.id}/", {"tag_ids": [self.barbell.id]}, format="json"
+            )
+        self.assertEqual(self.names("olymp"), ["Bench Press", "Curl"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arms.delete()
+        self.assertEqual(self.names("arms"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barbell.exercises.clear()
+        self.assertEqual(self.names("olymp"), [])
+
+    def test_only_own_exercises(self):
+        other = User.objects.create_user(username="other", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.create(user=other, name="Bench Dip")
+        self.assertEqual(self.names("bench"), ["Bench Press"])
+
+
+class LastCompletedAtTests(GymTestCase):
+    def last_completed_at(self, exercise):
+        exercise.refresh_from_db()
+        return exercise.last_completed_at
+
+    def test_list_does_not_aggregate_completions(self):
+        self.make_session([self.curl])
+        self.make_session([self.bench])
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/exercises/", {"ordering": "recent"})
+        self.assertEqual([e["name"] for e in resp.json()][0], "Bench Press")
+        self.assertFalse(any("gym_exercisecompletion" in q["sql"] for q in ctx.captured_queries))
+
+    def test_follows_completion_writes(self):
+        older = self.make_session([self.bench])
+        older_completion = older.exercise_completions.get()
+        session = GymSession.objects.create(user=self.user)
+
+        resp = self.client.post(
+            "/api/exercise-completions/",
+            {"session": session.id, "exercise_id": self.bench.id},
+            format="json",
+        )
+        latest = ExerciseCompletion.objects.get(pk=resp.json()["id"])
+        self.assertEqual(self.last_completed_at(self.bench), latest.created_at)
+
+        self.client.patch(
+            f"/api/exercise-completions/{latest.id}/", {"exercise_id": self.curl.id}, format="json"
+        )
+        self.assertEqual(self.last_completed_at(self.bench), older_completion.created_at)
+        self.assertEqual(self.last_completed_at(self.curl), latest.created_at)
+
+        self.client.delete(f"/api/exercise-completions/{latest.id}/")
+        self.assertIsNone(self.last_completed_at(self.curl))
+
+    def test_reconcile(self):
+        self.make_session([self.bench])
+        expected = self.last_completed_at(self.bench)
+        Exercise.objects.update(last_completed_at=None)
+        Exercise.objects.filter(pk=self.curl.pk).update(last_completed_at=timezone.now())
+
+        call_command("rebuild_last_completions", stdout=StringIO())
+        self.assertEqual(self.last_completed_at(self.bench), expected)
+        self.assertIsNone(self.last_completed_at(self.curl))
+
+
+class NormalizedShapeTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exercises = [self.bench, self.curl] + [
+            Exercise.objects.create(user=self.user, name=f"Accessory {n}") for n in range(3)
+        ]
+        for exercise in self.exercises[2:]:
+            exercise.muscle_groups.set([self.chest, self.arms])
+            exercise.tags.set([self.push, self.barbell])
+
+    def test_session_detail(self):
+        session = self.make_session()
+        data = self.client.get(f"/api/sessions/{session.id}/", {"shape": "normalized"}).json()
+        completion = data["session"]["exercise_completions"][0]
+        self.assertEqual(completion["exercise"], self.bench.id)
+        self.assertNotIn("distance", completion["events"][0])
+        self.assertEqual(data["session"]["location"], self.location.id)
+        self.assertEqual(set(data["exercises"]), {str(self.bench.id), str(self.curl.id)})
+        self.assertEqual(
+            data["exercises"][str(self.bench.id)]["muscle_groups"],
+            [self.arms.id, self.chest.id],
+        )
+        self.assertEqual(set(data["tags"]), {str(self.push.id), str(self.barbell.id)})
+        self.assertEqual(data["locations"][str(self.location.id)]["name"], "Home gym")
+
+    def test_list_query_count_is_flat(self):
+        for _ in range(3):
+            self.make_session(self.exercises)
+        few = self.count_queries("get", "/api/sessions/", data={"shape": "normalized"})
+        for _ in range(5):
+            self.make_session(self.exercises)
+        self.assertEqual(
+            self.count_queries("get", "/api/sessions/", data={"shape": "normalized"}), few
+        )
+
+    def test_payload_size(self):
+        """
+        A page of 20 sessions x 5 exercises x 4 sets: the normalized page
+        against the same sessions as nested trees.
+        """
+        for _ in range(20):
+            self.make_session(self.exercises, sets=4)
+        normalized = self.client.get("/api/sessions/", {"shape": "normalized", "page_size": 20})
+        self.assertEqual(len(normalized.json()["results"]), 20)
+        nested = b"".join(
+            self.client.get(f"/api/sessions/{session.id}/").content
+            for session in GymSession.objects.filter(user=self.user)
+        )
+        # About 2.3x on this data.
+        self.assertGreater(len(nested) / len(normalized.content), 2)
+        # Exercise definitions: once per completion (100) vs once per exercise (5).
+        self.assertEqual(nested.count(b"track_notes"), 100)
+        self.assertEqual(normalized.content.count(b"track_notes"), 5)
+
+
+class FastEventSerializerTests(GymTestCase):
+    def make_events(self, count):
+        session = GymSession.objects.create(user=self.user)
+        completion = ExerciseCompletion.objects.create(
+            user=self.user, session=session, exercise=self.bench
+        )
+        ExerciseEvent.objects.bulk_create([
+            ExerciseEvent(
+                completion=completion,
+                order_index=i,
+                reps=i % 12 or None,
+                weight=Decimal(i % 300) + Decimal("0.5") if i % 7 else None,
+                distance=Decimal("1.25") if i % 5 == 0 else None,
+                duration_seconds=i if i % 3 == 0 else None,
+                resistance_string="red band" if i % 4 == 0 else None,
+                resistance_numeric=Decimal(i % 9),
+                note="felt heavy" if i % 10 == 0 else "",
+            )
+            for i in range(count)
+        ])
+        return ExerciseEvent.objects.filter(completion=completion)
+
+    def test_parity_with_model_serializer(self):
+        events = self.make_events(50)
+        expected = ExerciseEventSerializer(events, many=True).data
+        self.assertEqual(fast.event_rows(events), expected)
+        with timezone.override("America/New_York"):
+            self.assertEqual(
+                fast.event_rows(events), ExerciseEventSerializer(events, many=True).data
+            )
+
+        resp = self.client.get("/api/events/")
+        self.assertEqual(resp.content, JSONRenderer().render(expected))
+
+    def test_rows_skip_model_instances(self):
+        """
+        2000 events in one query, without building a model instance each.
+        """
+        events = self.make_events(2000)
+        with mock.patch.object(ExerciseEvent, "from_db") as from_db, self.assertNumQueries(1):
+            rows = fast.event_rows(events.all())
+        from_db.assert_not_called()
+        self.assertEqual(len(rows), 2000)
+
+
+class ExportTests(GymTestCase):
+    def download(self, **params):
+        resp = self.client.get("/api/export/", params)
+        self.assertEqual(resp.status_code, 200)
+        return resp, b"".join(resp.streaming_content)
+
+    def test_csv(self):
+        self.make_session(sets=2)
+        self.make_session([self.curl], sets=1)
+        resp, body = self.download(format="csv")
+        self.assertEqual(resp["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="training-history.csv"', resp["Content-Disposition"])
+
+        rows = list(csv.DictReader(body.decode().splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(
+            [(row["exercise"], row["set"]) for row in rows],
+            [("Bench Press", "1"), ("Bench Press", "2"), ("Curl", "1"), ("Curl", "2"), ("Curl", "1")],
+        )
+        self.assertEqual(rows[0]["weight"], "101.00")
+        self.assertEqual(rows[0]["location"], "Home gym")
+        self.assertEqual(rows[0]["distance"], "")
+
+    def test_ndjson_and_gzip(self):
+        self.make_session()
+        other = User.objects.create_user(username="other", password="pw")
+        self.make_session(user=other)
+
+        _, body = self.download(format="ndjson")
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertIsNone(rows[0]["distance"])
+        self.assertEqual(rows[0]["reps"], 10)
+
+        resp, compressed = self.download(format="ndjson", gzip="1")
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        self.assertEqual(gzip.decompress(compressed), body)
+
+    def test_streams_lazily(self):
+        self.make_session()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/export/", {"format": "csv"})
+        self.assertFalse(any("gym_exerciseevent" in q["sql"] for q in ctx.captured_queries))
+        with CaptureQueriesContext(connection) as ctx:
+            b"".join(resp.streaming_content)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get("/api/export/", {"format": "xml"}).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/export/", {"format": "csv"}).status_code, 403)
+
+
+class ImportTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            username="other@example.com", email="other@example.com", password="pw"
+        )
+
+    def export(self, fmt="csv"):
+        resp = self.client.get("/api/export/", {"format": fmt})
+        return b"".join(resp.streaming_content)
+
+    def upload(self, body, name="history.csv", **data):
+        self.client.force_authenticate(self.other)
+        resp = self.client.post(
+            "/api/import/",
+            {"file": SimpleUploadedFile(name, body), **data},
+            format="multipart",
+        )
+        self.client.force_authenticate(self.user)
+        return resp
+
+    def test_round_trip_is_idempotent(self):
+        self.make_session(sets=2)
+        self.make_session([self.curl], sets=1)
+        body = self.export()
+
+        resp = self.upload(body)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data["sessions"], 2)
+        self.assertEqual(resp.data["completions"], 3)
+        self.assertEqual(resp.data["events"], 5)
+        self.assertEqual(resp.data["exercises_created"], 2)
+        self.assertEqual(resp.data["errors"], [])
+
+        def sets(body):
+            rows = csv.DictReader(body.decode().splitlines())
+            return [(r["session_start"], r["exercise"], r["set"], r["weight"]) for r in rows]
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(sets(self.export()), sets(body))
+        self.client.force_authenticate(self.user)
+
+        again = self.upload(body)
+        self.assertEqual(
+            (again.data["sessions"], again.data["completions"], again.data["events"]),
+            (0, 0, 0),
+        )
+        self.assertEqual(ExerciseEvent.objects.filter(completion__user=self.other).count(), 5)
+
+    def test_keeps_history_and_rebuilds_derived(self):
+        session = self.make_session(sets=2)
+        logged = timezone.now() - timedelta(days=30)
+        GymSession.objects.filter(pk=session.pk).update(start_time=logged, end_time=logged)
+        ExerciseEvent.objects.update(created_at=logged)
+
+        self.upload(self.export("ndjson"), name="history.ndjson")
+        imported = GymSession.objects.get(user=self.other)
+        self.assertEqual(imported.start_time, logged)
+        self.assertEqual(imported.created_at, logged)
+        self.assertEqual(
+            set(ExerciseEvent.objects.filter(completion__user=self.other)
+                .values_list("created_at", flat=True)),
+            {logged},
+        )
+        self.assertEqual(imported.location.name, "Home gym")
+        self.assertEqual(imported.location.user, self.other)
+
+        bench = Exercise.objects.get(user=self.other, name="Bench Press")
+        self.assertEqual(bench.last_completed_at, logged)
+        self.assertTrue(ExerciseDailyRollup.objects.filter(exercise=bench).exists())
+
+    def test_gzip_tags_and_bad_rows(self):
+        rows = (
+            "session_start,exercise,set,reps,weight,tags,muscle_groups\n"
+            "2024-03-01T10:00:00Z,Row,1,8,60,Pull;barbell,Back;chest\n"
+            "2024-03-01T10:00:00Z,Row,,8,62.5,,\n"
+            "2024-03-01T10:00:00Z,,1,8,60,,\n"
+            "not a date,Row,1,8,60,,\n"
+            "2024-03-01T10:00:00Z,Row,3,eight,60,,\n"
+            "2024-03-01T10:00:00Z,Row,4,-5,60,,\n"
+            "2024-03-01T10:00:00Z,Row,5,8,123456.78,,\n"
+        )
+        resp = self.upload(gzip.compress(rows.encode()), name="upload.bin", format="csv")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data["events"], 2)
+        self.assertEqual(resp.data["skipped_rows"], 5)
+        self.assertEqual([e["row"] for e in resp.data["errors"]], [3, 4, 5, 6, 7])
+        # Out of the column's range: rejected with the row, not at insert.
+        self.assertTrue(resp.data["errors"][3]["error"].startswith("reps: "))
+        self.assertTrue(resp.data["errors"][4]["error"].startswith("weight: "))
+
+        row = Exercise.objects.get(user=self.other, name="Row")
+        # Shared defaults are reused by name; missing names become the user's.
+        self.assertEqual(
+            sorted((g.name, g.user_id) for g in row.muscle_groups.all()),
+            [("Back", self.other.pk), ("Chest", None)],
+        )
+        self.assertEqual(
+            sorted(t.name for t in row.tags.all()), ["Pull", "barbell"]
+        )
+        self.assertFalse(row.tags.filter(user=self.user).exists())
+        self.assertEqual(
+            list(ExerciseEvent.objects.filter(completion__exercise=row)
+                 .order_by("order_index").values_list("order_index", "weight")),
+            [(1, Decimal("60.00")), (2, Decimal("62.50"))],
+        )
+
+    def test_sessions_split_across_chunks_end_with_their_last_set(self):
+        rows = (
+            "session_start,session_end,exercise,set,reps,logged_at\n"
+            "2024-03-01T10:00:00Z,,Row,1,8,2024-03-01T10:05:00Z\n"
+            "2024-03-01T10:00:00Z,,Row,2,8,2024-03-01T10:10:00Z\n"
+            "2024-03-01T10:00:00Z,,Squat,1,5,2024-03-01T10:40:00Z\n"
+        )
+        importer.import_file(self.other, BytesIO(rows.encode()), name="split.csv", chunk_rows=2)
+        session = GymSession.objects.get(user=self.other)
+        self.assertEqual(session.end_time.isoformat(), "2024-03-01T10:40:00+00:00")
+        self.assertEqual(session.created_at.isoformat(), "2024-03-01T10:00:00+00:00")
+
+    def test_unreadable_file(self):
+        resp = self.upload(b"{}", name="history.xml", format="xml")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.client.post("/api/import/", {}, format="multipart").status_code, 400)
+
+    @override_settings(GYM_IMPORT_MAX_SYNC_ROWS=2)
+    def test_large_files_need_a_job(self):
+        rows = (
+            "session_start,exercise,set,reps\n"
+            "2024-03-01T10:00:00Z,Row,1,8\n"
+            "2024-03-01T10:00:00Z,Row,2,8\n"
+        )
+        self.assertEqual(self.upload(rows.encode()).status_code, 200)
+
+        resp = self.upload((rows + "2024-03-02T10:00:00Z,Row,1,8\n").encode())
+        self.assertEqual(resp.status_code, 413)
+        self.assertIn("/api/jobs/", resp.data["detail"])
+        self.assertEqual(GymSession.objects.filter(user=self.other).count(), 1)
+
+    def test_large_import_query_count(self):
+        lines = ["session_id,session_start,exercise,set,reps,weight"]
+        start = timezone.now() - timedelta(days=400)
+        for n in range(10_000):
+            session = n // 20
+            when = (start + timedelta(days=session)).isoformat()
+            lines.append(f"{session},{when},Exercise {n % 5},{n % 4 + 1},5,{n % 100}")
+        body = "\n".join(lines).encode()
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = importer.import_file(
+                self.other, BytesIO(body), name="big.csv", chunk_rows=2500
+            )
+
+        self.assertEqual(report["events"], 10_000)
+        self.assertEqual(report["sessions"], 500)
+        self.assertLess(len(ctx.captured_queries), 600)
+
+    def test_management_command(self):
+        self.make_session(sets=2)
+        with tempfile.NamedTemporaryFile(suffix=".csv.gz") as fh:
+            fh.write(gzip.compress(self.export()))
+            fh.flush()
+            out = StringIO()
+            call_command("import_history", fh.name, user="other@example.com", stdout=out)
+        self.assertIn("Imported 1 sessions, 2 completions and 4 sets", out.getvalue())
+
+
+class JobQueueTests(GymTestCase):
+    def run_worker(self):
+        out = StringIO()
+        call_command("run_worker", processes=0, once=True, stdout=out)
+        return out.getvalue()
+
+    def test_import_job(self):
+        self.make_session(sets=2)
+        body = b"".join(self.client.get("/api/export/", {"format": "csv"}).streaming_content)
+        other = User.objects.create_user(username="o@example.com", email="o@example.com", password="pw")
+        self.client.force_authenticate(other)
+
+        resp = self.client.post(
+            "/api/jobs/",
+            {"kind": "import", "file": SimpleUploadedFile("history.csv", body)},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 202, resp.content)
+        self.assertEqual(resp.data["status"], "queued")
+        job_url = f"/api/jobs/{resp.data['id']}/"
+
+        self.run_worker()
+        job = self.client.get(job_url).data
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["result"]["events"], 4)
+        self.assertEqual(job["progress"]["events"], 4)
+        self.assertEqual(ExerciseEvent.objects.filter(completion__user=other).count(), 4)
+
+        # Other users can't see it.
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+
+    def test_export_job_download(self):
+        self.make_session(sets=2)
+        resp = self.client.post("/api/jobs/", {"kind": "export", "format": "ndjson"}, format="json")
+        job_id = resp.data["id"]
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/download/").status_code, 404)
+
+        # The file is stored (and served) in pieces as it is encoded.
+        with mock.patch.object(jobs, "OUTPUT_CHUNK_BYTES", 64):
+            self.run_worker()
+        self.assertGreater(JobOutputChunk.objects.filter(job_id=job_id).count(), 1)
+        job = self.client.get(f"/api/jobs/{job_id}/").data
+        self.assertEqual(job["download_url"], f"/api/jobs/{job_id}/download/")
+        resp = self.client.get(job["download_url"])
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        body = b"".join(resp.streaming_content)
+        self.assertEqual(len(body), job["result"]["bytes"])
+        rows = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(rows), 4)
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        def flaky(job):
+            raise ConnectionError("database went away")
+
+        self.enterContext(mock.patch.dict(jobs.HANDLERS, {"flaky": flaky}))
+        job = jobs.enqueue(self.user, "flaky")
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertEqual(job.error, "ConnectionError: database went away")
+        self.assertGreater(job.run_after, timezone.now())
+
+        # Not runnable before its backoff is over.
+        self.assertEqual(jobs.claim("test", 5), [])
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_bad_upload_fails_without_retry(self):
+        job = jobs.enqueue(
+            self.user, "import", {"format": "xml"}, input_data=gzip.compress(b"x")
+        )
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+
+    def test_per_user_concurrency_and_pending_limits(self):
+        other = User.objects.create_user(username="o@example.com", email="o@example.com", password="pw")
+        first = jobs.enqueue(self.user, "rebuild")
+        second = jobs.enqueue(self.user, "rebuild")
+        theirs = jobs.enqueue(other, "rebuild")
+
+        claimed = jobs.claim("a", 5)
+        self.assertEqual({job.pk for job in claimed}, {first.pk, theirs.pk})
+        self.assertEqual(jobs.claim("b", 5), [])
+
+        jobs.execute(first.pk)
+        self.assertEqual([job.pk for job in jobs.claim("b", 5)], [second.pk])
+
+        with self.settings(GYM_JOBS_MAX_PENDING=3):
+            jobs.enqueue(self.user, "rebuild")
+            jobs.enqueue(self.user, "rebuild")
+            resp = self.client.post("/api/jobs/", {"kind": "rebuild"}, format="json")
+        self.assertEqual(resp.status_code, 429)
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue(self.user, "rebuild")
+        jobs.claim("dead-worker", 1)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+
+    def test_inline_worker_heartbeats_running_jobs(self):
+        beaten = threading.Event()
+
+        def slow(job):
+            beaten.wait(5)
+            return {}
+
+        self.enterContext(mock.patch.dict(jobs.HANDLERS, {"slow": slow}))
+        beat = self.enterContext(mock.patch.object(jobs, "heartbeat", side_effect=lambda ids: beaten.set()))
+        job = jobs.enqueue(self.user, "slow")
+        call_command("run_worker", processes=0, once=True, poll_interval=0.01, stdout=StringIO())
+        self.assertTrue(beaten.is_set())
+        beat.assert_called_with([job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    def test_lost_jobs_are_not_finished_by_their_old_worker(self):
+        def lost(job):
+            # Meanwhile the job went stale and another worker took it over.
+            Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+            jobs.requeue_stale()
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.claim("b", 1)
+            return {"events": 1}
+
+        self.enterContext(mock.patch.dict(jobs.HANDLERS, {"lost": lost}))
+        job = jobs.enqueue(self.user, "lost")
+        jobs.claim("a", 1)
+        self.assertFalse(jobs.execute(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.attempts), (Job.RUNNING, "b", 1))
+        self.assertIsNone(job.result)
+
+    def test_validation(self):
+        self.assertEqual(self.client.post("/api/jobs/", {"kind": "import"}).status_code, 400)
+        self.assertEqual(self.client.post("/api/jobs/", {"kind": "shell"}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/jobs/").status_code, 403)
+
+
+class SessionLifecycleTests(GymTestCase):
+    def test_start_closes_open_session_at_its_last_event(self):
+        earlier = self.make_session(closed=False)
+        last_event = ExerciseEvent.objects.filter(completion__session=earlier).latest("created_at")
+
+        resp = self.client.post("/api/sessions/", {"note": "new"})
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertTrue(resp.data["is_open"])
+        earlier.refresh_from_db()
+        self.assertEqual(earlier.end_time, last_event.created_at)
+
+        # Without events, the session is closed "now".
+        before = timezone.now()
+        self.client.post("/api/sessions/", {})
+        self.assertGreaterEqual(GymSession.objects.get(pk=resp.data["id"]).end_time, before)
+        self.assertEqual(sessions_service.open_sessions(self.user).count(), 1)
+
+    def test_close_writes_only_lifecycle_columns(self):
+        session = self.make_session(closed=False)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(f"/api/sessions/{session.id}/close/")
+        self.assertFalse(resp.data["is_open"])
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE \"gym_gymsession\"")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"end_time"', updates[0])
+        self.assertNotIn('"note"', updates[0])
+
+    def test_reopen_closes_the_other_open_session(self):
+        first = self.make_session()
+        second = self.make_session(closed=False)
+        self.client.post(f"/api/sessions/{first.id}/reopen/")
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNone(first.end_time)
+        self.assertIsNotNone(second.end_time)
+
+    def test_patching_end_time_closes_and_reopens(self):
+        first = self.make_session()
+        second = self.make_session(closed=False)
+        completion = second.exercise_completions.get(exercise=self.bench)
+
+        ended = timezone.now()
+        resp = self.client.patch(
+            f"/api/sessions/{second.id}/", {"end_time": ended.isoformat()}, format="json"
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertFalse(resp.data["is_open"])
+        self.assertEqual(
+            ExerciseLastCompletion.objects.get(user=self.user, exercise=self.bench).completion,
+            completion,
+        )
+
+        resp = self.client.patch(f"/api/sessions/{first.id}/", {"end_time": None}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertTrue(resp.data["is_open"])
+        second.refresh_from_db()
+        self.assertEqual(second.end_time, ended)
+        self.assertEqual(sessions_service.open_sessions(self.user).get(), first)
+
+        resp = self.client.patch(
+            f"/api/sessions/{second.id}/", {"end_time": None, "note": "again"}, format="json"
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(sessions_service.open_sessions(self.user).get(), second)
+        self.assertFalse(
+            ExerciseLastCompletion.objects.filter(completion__session=second).exists()
+        )
+
+    def test_current_uses_unordered_lookup(self):
+        self.make_session(closed=False)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/sessions/current/", {"view": "summary"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("ORDER BY", ctx.captured_queries[0]["sql"])
+
+
+class OwnedRelatedFieldTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username="o@example.com", email="o@example.com", password="pw")
+        self.tags = [Tag.objects.create(user=self.user, name=f"tag {i}") for i in range(10)]
+        defaults.rows(Tag)
+
+    def tag_lookups(self, tag_ids):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(
+                "/api/exercises/", {"name": "Dip", "tag_ids": tag_ids}, format="json"
+            )
+        lookups = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith('SELECT "gym_tag"') and " IN (" in q["sql"] and "gym_exercise" not in q["sql"]
+        ]
+        return resp, lookups
+
+    def test_many_ids_resolve_in_one_query(self):
+        resp, lookups = self.tag_lookups([tag.id for tag in self.tags] + [self.push.id])
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(len(resp.json()["tags"]), 11)
+        self.assertEqual(len(lookups), 1)
+        # Only the user's ten tags are queried; the shared default comes
+        # from the cache.
+        in_list = lookups[0]["sql"].split(" IN (")[1].split(")")[0]
+        self.assertEqual(len(in_list.split(",")), 10)
+
+    def test_other_users_ids_are_rejected(self):
+        theirs = Tag.objects.create(user=self.other, name="theirs")
+        resp, lookups = self.tag_lookups([self.tags[0].id, theirs.id])
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn(str(theirs.id), str(resp.json()["tag_ids"]))
+        self.assertEqual(len(lookups), 1)
+
+        resp = self.client.post("/api/exercises/", {"name": "Dip", "tag_ids": ["x"]}, format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_single_ids_are_owner_scoped(self):
+        their_exercise = Exercise.objects.create(user=self.other, name="Theirs")
+        their_location = UserLocation.objects.create(user=self.other, name="Their gym")
+        session = GymSession.objects.create(user=self.user)
+
+        resp = self.client.post(
+            "/api/exercise-completions/",
+            {"session": session.id, "exercise_id": their_exercise.id},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("exercise_id", resp.json())
+
+        their_session = GymSession.objects.create(user=self.other)
+        their_completion = ExerciseCompletion.objects.create(
+            user=self.other, session=their_session, exercise=their_exercise
+        )
+        completion = ExerciseCompletion.objects.create(user=self.user, session=session, exercise=self.bench)
+        event = ExerciseEvent.objects.create(completion=completion, order_index=1, reps=5)
+        for url, data in [
+            ("/api/exercise-completions/", {"session": their_session.id, "exercise_id": self.bench.id}),
+            ("/api/events/", {"completion": their_completion.id, "order_index": 1}),
+        ]:
+            resp = self.client.post(url, data, format="json")
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn(next(iter(data)), resp.json())
+        for url, data in [
+            (f"/api/exercise-completions/{completion.id}/", {"session": their_session.id}),
+            (f"/api/events/{event.id}/", {"completion": their_completion.id}),
+        ]:
+            resp = self.client.patch(url, data, format="json")
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn(next(iter(data)), resp.json())
+        self.assertEqual(their_session.exercise_completions.get(), their_completion)
+        self.assertFalse(their_completion.events.exists())
+
+        resp = self.client.patch(
+            f"/api/sessions/{session.id}/", {"location_id": their_location.id}, format="json"
+        )
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.patch(
+            f"/api/sessions/{session.id}/", {"location_id": self.location.id}, format="json"
+        )
+        self.assertEqual(resp.status_code, 200)
+
+
+class BootstrapTests(GymTestCase):
+    def bootstrap(self, **headers):
+        resp = self.client.get("/api/bootstrap/", **headers)
+        self.assertIn(resp.status_code, (200, 304), resp.content)
+        return resp
+
+    def test_payload_matches_individual_endpoints(self):
+        self.make_session()
+        open_session = self.make_session([self.curl], closed=False)
+        data = self.bootstrap().data
+
+        self.assertEqual(data["user"]["email"], "lifter@example.com")
+        self.assertEqual(data["current_session"]["id"], open_session.id)
+        self.assertEqual(
+            data["current_session"]["exercise_completions"][0]["exercise"], self.curl.id
+        )
+        self.assertEqual(data["sessions"]["results"], self.client.get("/api/sessions/").data["results"])
+        self.assertEqual(data["locations"], self.client.get("/api/locations/").data)
+        self.assertEqual(data["tags"], self.client.get("/api/tags/").json())
+        self.assertEqual(data["muscle_groups"], self.client.get("/api/muscle-groups/").json())
+        bench = next(e for e in data["exercises"] if e["name"] == "Bench Press")
+        self.assertEqual(sorted(bench["tags"]), sorted([self.push.id, self.barbell.id]))
+
+    def test_query_count_is_constant_and_cached(self):
+        open_session = self.make_session(sets=1, closed=False)
+        defaults.rows(Tag), defaults.rows(MuscleGroup)
+        small = self.count_queries("get", "/api/bootstrap/")
+
+        open_session.close()
+        for _ in range(25):
+            self.make_session(sets=3)
+        for i in range(10):
+            Exercise.objects.create(user=self.user, name=f"Exercise {i}").tags.set([self.barbell])
+        self.make_session(closed=False, sets=5)
+        cache.clear()
+        defaults.rows(Tag), defaults.rows(MuscleGroup)
+        self.assertEqual(self.count_queries("get", "/api/bootstrap/"), small)
+        # cache versions, default rows' version, open session + completions
+        # + events, summaries, locations, exercises + muscle groups + tags,
+        # user tags, user muscle groups
+        self.assertEqual(small, 12)
+
+        # Served from the cache afterwards; only the versions are read.
+        with self.assertNumQueries(1):
+            resp = self.bootstrap()
+        self.assertEqual(len(resp.data["sessions"]["results"]), 20)
+        self.assertTrue(resp.data["sessions"]["next"].startswith("http://testserver/api/sessions/?cursor="))
+
+    def test_writes_invalidate(self):
+        session = self.make_session(closed=False)
+        first = self.bootstrap()
+        etag = first["ETag"]
+        self.assertEqual(self.bootstrap(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        completion = session.exercise_completions.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/events/", {"completion": completion.id, "reps": 5, "weight": "50"})
+        second = self.bootstrap(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data["sessions"]["results"][0]["set_count"], 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/sessions/{session.id}/close/")
+        self.assertIsNone(self.bootstrap().data["current_session"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch("/api/auth/me/", {"first_name": "Sam"})
+        self.assertEqual(self.bootstrap().data["user"]["first_name"], "Sam")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/locations/", {"name": "Office"})
+        self.assertEqual(len(self.bootstrap().data["locations"]), 2)
+
+
+class RequestMetricsTests(GymTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def scrape(self):
+        staff = User.objects.create_user(username="ops", password="pw", is_staff=True)
+        self.client.force_authenticate(staff)
+        resp = self.client.get("/api/_metrics")
+        self.client.force_authenticate(self.user)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return resp.content.decode()
+
+    def test_routes_are_observed(self):
+        session = self.make_session()
+        self.client.get("/api/sessions/")
+        self.client.get(f"/api/sessions/{session.id}/")
+        self.client.get(f"/api/exercises/{self.bench.id}/last_completion/")
+        self.client.get("/api/nowhere/")
+        body = self.scrape()
+
+        self.assertIn('gym_requests_total{route="gymsession-list",method="GET",status="200"} 1', body)
+        self.assertIn('gym_requests_total{route="exercise-last-completion",method="GET",status="200"} 1', body)
+        self.assertIn('gym_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        # The detail view runs 5 queries.
+        self.assertIn(
+            'gym_request_db_queries_bucket{route="gymsession-detail",method="GET",le="5"} 1', body
+        )
+        self.assertIn(
+            'gym_request_db_queries_bucket{route="gymsession-detail",method="GET",le="2"} 0', body
+        )
+        self.assertIn('gym_response_size_bytes_count{route="gymsession-detail",method="GET"} 1', body)
+
+        stats = metrics.registry.histograms[("gymsession-detail", "GET")]
+        self.assertGreater(stats["gym_request_serializer_duration_seconds"].sum, 0)
+        self.assertGreater(stats["gym_request_db_duration_seconds"].sum, 0)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get("/api/_metrics").status_code, 403)
+
+    def test_slow_request_log(self):
+        with self.settings(GYM_SLOW_REQUEST_MS=0), self.assertLogs("gym.requests", "WARNING") as logs:
+            self.client.get("/api/sessions/")
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["event"], "slow_request")
+        self.assertEqual(line["route"], "gymsession-list")
+        self.assertEqual(line["user_id"], self.user.pk)
+        self.assertGreaterEqual(line["db_queries"], 1)
+        self.assertIn("serializer_ms", line)
+
+
+class QueryBudgetTests(GymTestCase):
+    """
+    Every gym route, run against histories of several sizes: each stays
+    within its @query_budget and runs the same number of queries at every
+    size.
+    """
+    SIZES = (1, 4, 12)
+
+    def populate(self, index, sessions):
+        user = User.objects.create_user(
+            username=f"budget{index}@example.com",
+            email=f"budget{index}@example.com",
+            password="pw",
+            is_staff=True,
+        )
+        group = MuscleGroup.objects.create(user=user, name="Back")
+        tag = Tag.objects.create(user=user, name="cable")
+        location = UserLocation.objects.create(user=user, name="Club")
+        exercises = []
+        for name in ("Row", "Squat", "Run"):
+            exercise = Exercise.objects.create(user=user, name=name, track_distance=name == "Run")
+            exercise.muscle_groups.set([group, self.chest])
+            exercise.tags.set([tag, self.push])
+            exercises.append(exercise)
+        for i in range(sessions):
+            self.make_session(exercises, sets=3, user=user)
+        GymSession.objects.filter(user=user).update(location=location)
+        current = self.make_session(exercises, sets=2, closed=False, user=user)
+        completion = current.exercise_completions.order_by("id").first()
+        job = Job.objects.create(
+            user=user, kind="export", status=Job.SUCCEEDED, result={"format": "csv"},
+        )
+        JobOutputChunk.objects.create(job=job, index=0, data=gzip.compress(b"x"))
+        closed = GymSession.objects.filter(user=user, end_time__isnull=False).first()
+        GymSession.objects.filter(pk=closed.pk).update(client_id=uuid.uuid4())
+        closed.refresh_from_db()
+        return {
+            "user": user, "group": group, "tag": tag, "location": location,
+            "exercise": exercises[0], "exercises": exercises,
+            "current": current, "completion": completion,
+            "event": completion.events.first(), "job": job,
+            "closed": closed,
+        }
+
+    def requests(self, d, index):
+        """
+        (method, url, kwargs) for every route and action. Deletes target
+        rows made just for them.
+        """
+        user, exercise, completion = d["user"], d["exercise"], d["completion"]
+        spare_group = MuscleGroup.objects.create(user=user, name="Spare")
+        spare_tag = Tag.objects.create(user=user, name="spare")
+        spare_exercise = Exercise.objects.create(user=user, name="Spare")
+        spare_location = UserLocation.objects.create(user=user, name="Spare")
+        spare_session = GymSession.objects.create(user=user, end_time=timezone.now())
+        spare_completions = [
+            ExerciseCompletion.objects.create(user=user, session=session, exercise=other)
+            for session in (spare_session, d["current"])
+            for other in d["exercises"]
+        ]
+        for spare_completion in spare_completions:
+            for i in range(1, 4):
+                ExerciseEvent.objects.create(completion=spare_completion, order_index=i, reps=5)
+        spare_event = ExerciseEvent.objects.create(completion=completion, order_index=9, reps=1)
+        csv_body = (
+            "session_start,exercise,set,reps,weight\n"
+            "2024-01-01T10:00:00Z,Row,1,10,50\n"
+            "2024-01-01T10:00:00Z,Row,2,8,55\n"
+        ).encode()
+        json_ = {"format": "json"}
+        sync_ops = [
+            {"type": "session", "op": "upsert", "client_id": str(uuid.uuid4()), "data": {}},
+            {"type": "session", "op": "delete", "client_id": str(d["closed"].client_id)},
+            {"type": "event", "op": "upsert", "client_id": str(uuid.uuid4()),
+             "data": {"completion": completion.id, "order_index": 5, "reps": 5}},
+        ]
+        return [
+            ("get", "/api/muscle-groups/", {}),
+            ("post", "/api/muscle-groups/", {"data": {"name": "Grip"}, **json_}),
+            ("get", f"/api/muscle-groups/{d['group'].id}/", {}),
+            ("put", f"/api/muscle-groups/{d['group'].id}/", {"data": {"name": "Lats"}, **json_}),
+            ("patch", f"/api/muscle-groups/{d['group'].id}/", {"data": {"name": "Back"}, **json_}),
+            ("get", f"/api/muscle-groups/{d['group'].id}/progress/", {}),
+            ("delete", f"/api/muscle-groups/{spare_group.id}/", {}),
+
+            ("get", "/api/tags/", {}),
+            ("post", "/api/tags/", {"data": {"name": "band"}, **json_}),
+            ("get", f"/api/tags/{d['tag'].id}/", {}),
+            ("put", f"/api/tags/{d['tag'].id}/", {"data": {"name": "cables"}, **json_}),
+            ("patch", f"/api/tags/{d['tag'].id}/", {"data": {"name": "cable"}, **json_}),
+            ("delete", f"/api/tags/{spare_tag.id}/", {}),
+
+            ("get", "/api/exercises/", {}),
+            ("get", "/api/exercises/", {"data": {"search": "ro"}}),
+            ("post", "/api/exercises/", {"data": {
+                "name": "Deadlift", "muscle_group_ids": [d["group"].id, self.chest.id],
+                "tag_ids": [d["tag"].id, self.push.id],
+            }, **json_}),
+            ("get", f"/api/exercises/{exercise.id}/", {}),
+            ("put", f"/api/exercises/{exercise.id}/", {"data": {
+                "name": "Rows", "muscle_group_ids": [d["group"].id], "tag_ids": [d["tag"].id],
+            }, **json_}),
+            ("patch", f"/api/exercises/{exercise.id}/", {"data": {
+                "name": "Row", "muscle_group_ids": [d["group"].id, self.chest.id],
+            }, **json_}),
+            ("get", f"/api/exercises/{exercise.id}/last_completion/", {}),
+            ("get", f"/api/exercises/{exercise.id}/progress/", {}),
+            ("delete", f"/api/exercises/{spare_exercise.id}/", {}),
+
+            ("get", "/api/sessions/", {}),
+            ("get", "/api/sessions/", {"data": {"shape": "normalized"}}),
+            ("get", "/api/sessions/current/", {}),
+            ("get", f"/api/sessions/{d['closed'].id}/", {}),
+            ("get", f"/api/sessions/{d['closed'].id}/", {"data": {"shape": "normalized"}}),
+            ("put", f"/api/sessions/{d['closed'].id}/", {"data": {"note": "ok"}, **json_}),
+            ("patch", f"/api/sessions/{d['closed'].id}/", {
+                "data": {"location_id": d["location"].id}, **json_,
+            }),
+            ("post", f"/api/sessions/{d['closed'].id}/reopen/", {}),
+            ("post", f"/api/sessions/{d['closed'].id}/close/", {}),
+            ("post", f"/api/sessions/{d['current'].id}/reopen/", {}),
+            ("patch", f"/api/sessions/{d['closed'].id}/", {
+                "data": {"end_time": None, "note": "again"}, **json_,
+            }),
+            ("put", f"/api/sessions/{d['closed'].id}/", {
+                "data": {"end_time": timezone.now().isoformat()}, **json_,
+            }),
+            ("delete", f"/api/sessions/{spare_session.id}/", {}),
+            ("post", "/api/sessions/", {"data": {"location_id": d["location"].id}, **json_}),
+
+            ("get", "/api/exercise-completions/", {}),
+            ("post", "/api/exercise-completions/", {"data": {
+                "session": d["current"].id, "exercise_id": exercise.id,
+            }, **json_}),
+            ("get", f"/api/exercise-completions/{completion.id}/", {}),
+            ("put", f"/api/exercise-completions/{completion.id}/", {"data": {
+                "session": d["current"].id, "exercise_id": exercise.id, "note": "ok",
+            }, **json_}),
+            ("patch", f"/api/exercise-completions/{completion.id}/", {"data": {
+                "exercise_id": d["exercises"][1].id,
+            }, **json_}),
+            ("get", f"/api/exercise-completions/{completion.id}/last_values/", {}),
+            ("post", f"/api/exercise-completions/{completion.id}/events/bulk/", {"data": [
+                {"op": "create", "order_index": 7, "reps": 5},
+                {"op": "create", "order_index": 8, "reps": 5},
+                {"op": "update", "order_index": 1, "reps": 12},
+                {"op": "delete", "order_index": spare_event.order_index},
+            ], **json_}),
+            ("delete", f"/api/exercise-completions/{spare_completion.id}/", {}),
+
+            ("get", "/api/events/", {"data": {"completion": completion.id}}),
+            ("post", "/api/events/", {"data": {
+                "completion": completion.id, "order_index": 10, "reps": 6, "weight": "60",
+            }, **json_}),
+            ("get", f"/api/events/{d['event'].id}/", {}),
+            ("put", f"/api/events/{d['event'].id}/", {"data": {
+                "completion": completion.id, "order_index": 1, "reps": 11,
+            }, **json_}),
+            ("patch", f"/api/events/{d['event'].id}/", {"data": {"weight": "70"}, **json_}),
+
+            ("get", "/api/locations/", {}),
+            ("post", "/api/locations/", {"data": {"name": "Hotel"}, **json_}),
+            ("get", "/api/locations/most_recent/", {}),
+            ("get", f"/api/locations/{d['location'].id}/", {}),
+            ("put", f"/api/locations/{d['location'].id}/", {"data": {"name": "Club 2"}, **json_}),
+            ("patch", f"/api/locations/{d['location'].id}/", {"data": {"name": "Club"}, **json_}),
+            ("delete", f"/api/locations/{spare_location.id}/", {}),
+
+            ("post", "/api/jobs/", {"data": {"kind": "export", "format": "csv"}, **json_}),
+            ("get", "/api/jobs/", {}),
+            ("get", f"/api/jobs/{d['job'].id}/", {}),
+            ("get", f"/api/jobs/{d['job'].id}/download/", {}),
+
+            ("get", "/api/auth/me/", {}),
+            ("patch", "/api/auth/me/", {"data": {"first_name": "Sam"}, **json_}),
+            ("get", "/api/bootstrap/", {}),
+            ("get", "/api/sync/changes/", {}),
+            ("get", "/api/sync/changes/", {"data": {"since": "0"}}),
+            ("post", "/api/sync/push/", {"data": {"operations": sync_ops}, **json_}),
+            ("get", "/api/export/", {"data": {"format": "csv"}}),
+            ("post", "/api/import/", {
+                "data": {"file": SimpleUploadedFile("rows.csv", csv_body)}, "format": "multipart",
+            }),
+            ("get", "/api/_metrics", {}),
+
+            ("delete", f"/api/events/{d['event'].id}/", {}),
+            ("post", "/api/auth/logout/", {}),
+            ("post", "/api/auth/login/", {"data": {
+                "email": f"budget{index}@example.com", "password": "pw",
+            }, **json_}),
+            ("post", "/api/auth/signup/", {"data": {
+                "email": f"new{index}@example.com", "password": "pw", "access_code": "",
+            }, **json_}),
+        ]
+
+    def test_every_route_within_budget_at_every_size(self):
+        seen = []
+
+        def check(label, budget, request, recorder):
+            seen.append((label, len(recorder.data_queries)))
+            return real_check(label, budget, request, recorder)
+
+        real_check = query_budget.check
+        runs = []
+        with mock.patch.object(query_budget, "check", side_effect=check):
+            for index, size in enumerate(self.SIZES):
+                cache.clear()
+                d = self.populate(index, size)
+                defaults.rows(Tag), defaults.rows(MuscleGroup)
+                # Drop the session cookie the previous run's login left.
+                self.client.logout()
+                self.client.force_authenticate(d["user"])
+                del seen[:]
+                for method, url, kwargs in self.requests(d, index):
+                    resp = getattr(self.client, method)(url, **kwargs)
+                    body = b"".join(resp.streaming_content) if resp.streaming else resp.content
+                    self.assertLess(resp.status_code, 400, (method, url, body))
+                runs.append(list(seen))
+
+        for size, run in zip(self.SIZES[1:], runs[1:]):
+            self.assertEqual(run, runs[0], f"query counts changed with {size} sessions")
+
+    def test_every_gym_view_declares_budgets(self):
+        def views(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from views(pattern.url_patterns)
+                else:
+                    yield pattern.callback
+
+        for func in views(urls.urlpatterns):
+            if not query_budget.is_budgeted_view(func):
+                continue
+            actions = getattr(func, "actions", None)
+            for action in actions.values() if actions else [query_budget.ALL_ACTIONS]:
+                self.assertIsNotNone(
+                    query_budget.budget_for(func, action), (func.__name__, action)
+                )
+
+    def test_n_plus_one_fails_the_request(self):
+        user = User.objects.create_user(username="n1@example.com", password="pw")
+        self.client.force_authenticate(user)
+        for i in range(3):
+            Exercise.objects.create(user=user, name=f"E{i}").tags.set([self.push])
+
+        # What listing exercises would cost without prefetch_related().
+        def unprefetched(viewset):
+            return Exercise.objects.filter(user=user)
+
+        with mock.patch.object(ExerciseViewSet, "get_queryset", unprefetched):
+            with self.assertRaisesMessage(query_budget.QueryBudgetExceeded, "ran this 3 times"):
+                self.client.get("/api/exercises/")
+
+
+class WorkloadTests(GymTestCase):
+    def generate(self, prefix, **options):
+        call_command(
+            "generate_workload", users=3, sessions_per_user=6, prefix=prefix,
+            stdout=StringIO(), **options,
+        )
+        return list(
+            ExerciseEvent.objects
+            .filter(completion__user__username__startswith=prefix)
+            .order_by("completion__user__username", "completion__created_at", "order_index")
+            .values_list(
+                "completion__session__start_time", "completion__session__end_time",
+                "completion__session__location__name", "completion__exercise__name",
+                "created_at", "order_index", "reps", "weight", "distance",
+                "duration_seconds", "resistance_numeric", "resistance_string", "note",
+            )
+        )
+
+    def test_same_seed_same_data(self):
+        first = self.generate("a-", seed=3)
+        self.assertTrue(first)
+        # However the users are chunked.
+        self.assertEqual(self.generate("b-", seed=3, chunk_users=1), first)
+        self.assertNotEqual(self.generate("c-", seed=4), first)
+
+    def test_history_is_realistic_and_derived_tables_built(self):
+        self.generate("w-")
+        users = User.objects.filter(username__startswith="w-")
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(GymSession.objects.filter(user__in=users).count(), 18)
+        # Dated with the history, not when it was generated.
+        self.assertFalse(GymSession.objects.filter(user__in=users).exclude(created_at=F("start_time")).exists())
+        self.assertTrue(Tag.objects.filter(user__in=users).exists())
+        self.assertTrue(MuscleGroup.objects.filter(user__in=users).exists())
+
+        exercises = Exercise.objects.filter(user__in=users)
+        profiles = set(exercises.values_list("track_reps", "track_weight", "track_distance", "track_duration"))
+        self.assertGreater(len(profiles), 2)
+        self.assertTrue(exercises.filter(muscle_groups__is_default=True).exists())
+        self.assertFalse(exercises.filter(search_text="").exists())
+        # Sets only carry what their exercise tracks.
+        events = ExerciseEvent.objects.filter(completion__user__in=users)
+        self.assertFalse(events.filter(completion__exercise__track_weight=False, weight__isnull=False).exists())
+        self.assertFalse(events.filter(completion__exercise__track_distance=True, distance__isnull=True).exists())
+
+        self.assertTrue(ExerciseLastCompletion.objects.filter(user__in=users).exists())
+        self.assertTrue(ExerciseDailyRollup.objects.filter(user__in=users).exists())
+        self.assertFalse(
+            exercises.filter(completions__isnull=False, last_completed_at__isnull=True).exists()
+        )
+
+    def test_refuses_existing_prefix(self):
+        self.generate("w-")
+        with self.assertRaisesMessage(CommandError, "already exist"):
+            self.generate("w-")
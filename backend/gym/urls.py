@@ -7,7 +7,13 @@ from .views.sessions import GymSessionViewSet
 from .views.events import ExerciseCompletionViewSet, ExerciseEventViewSet
 
 from .views.auth import signup, login, logout, me
+from .views.bootstrap import bootstrap
 from .views.locations import UserLocationViewSet
+from .views import sync
+from .views.export import export_history
+from .views.imports import import_history
+from .views.jobs import JobViewSet
+from .views.metrics import prometheus_metrics
 
 
 
@@ -19,6 +25,7 @@ router.register("sessions", GymSessionViewSet)
 router.register("exercise-completions", ExerciseCompletionViewSet)
 router.register("events", ExerciseEventViewSet)
 router.register("locations", UserLocationViewSet)
+router.register("jobs", JobViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -27,4 +34,14 @@ urlpatterns = [
     path("auth/login/", login, name="login"),
     path("auth/logout/", logout, name="logout"),
     path("auth/me/", me, name="me"),
+
+    path("bootstrap/", bootstrap, name="bootstrap"),
+
+    path("sync/changes/", sync.changes, name="sync-changes"),
+    path("sync/push/", sync.push, name="sync-push"),
+
+    path("export/", export_history, name="export"),
+    path("import/", import_history, name="import"),
+
+    path("_metrics", prometheus_metrics, name="metrics"),
 ]
\ No newline at end of file
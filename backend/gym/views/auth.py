@@ -4,6 +4,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework import permissions, response, status
 from django.middleware.csrf import get_token
 
+from ..query_budget import query_budget
+
 User = get_user_model()
 
 
@@ -15,6 +17,7 @@ def _normalize_email(raw):
 
 # POST /api/auth/signup/
 # payload: {email, password, access_code, first_name?, last_name?}
+@query_budget(11)
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])
 def signup(request):
@@ -84,6 +87,7 @@ def signup(request):
 
 # POST /api/auth/login/
 # payload: {email, password}
+@query_budget(6)
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])
 def login(request):
@@ -126,6 +130,7 @@ def login(request):
 
 
 # POST /api/auth/logout/
+@query_budget(2)
 @api_view(["POST"])
 def logout(request):
     dj_logout(request)
@@ -133,6 +138,7 @@ def logout(request):
 
 
 # GET/PATCH /api/auth/me/
+@query_budget(2)
 @api_view(["GET", "PATCH"])
 def me(request):
     if not request.user.is_authenticated:
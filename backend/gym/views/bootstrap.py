@@ -0,0 +1,87 @@
+# views/bootstrap.py
+from django.db.models import Prefetch
+from django.urls import reverse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+
+from ..models import Exercise, ExerciseCompletion, ExerciseEvent, GymSession, MuscleGroup, Tag, UserLocation
+from ..pagination import SessionCursorPagination
+from ..query_budget import query_budget
+from ..serializers.categories import MuscleGroupSerializer, TagSerializer
+from ..serializers.locations import UserLocationSerializer
+from ..serializers.normalized import NormalizedExerciseSerializer, NormalizedSessionSerializer
+from ..serializers.sessions import GymSessionSummarySerializer
+from ..services import bootstrap as bootstrap_cache
+from ..services import sessions
+from .categories import with_defaults
+from .mixins import cached_response
+
+
+def current_session(user):
+    """
+    The open session as a normalized tree (exercises and the location are
+    referenced by id; both are in the payload anyway).
+    """
+    completions = ExerciseCompletion.objects.order_by("created_at").prefetch_related(
+        Prefetch("events", queryset=ExerciseEvent.objects.order_by("order_index", "created_at"))
+    )
+    found = sessions.open_sessions(user).prefetch_related(
+        Prefetch("exercise_completions", queryset=completions)
+    )[:1]
+    return NormalizedSessionSerializer(found[0]).data if found else None
+
+
+def session_page(request):
+    """
+    First page of session summaries, as GET /api/sessions/ returns it.
+    """
+    paginator = SessionCursorPagination()
+    page = paginator.paginate_queryset(
+        GymSession.objects.filter(user=request.user).select_related("location").with_summary(),
+        request,
+    )
+    # Point the cursor links at the sessions endpoint, not this one.
+    paginator.base_url = request.build_absolute_uri(reverse("gymsession-list"))
+    return {
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "results": GymSessionSummarySerializer(page, many=True).data,
+    }
+
+
+def bootstrap_data(request):
+    user = request.user
+    exercises = (
+        Exercise.objects.filter(user=user)
+        .prefetch_related("muscle_groups", "tags")
+        .order_by("name")
+    )
+    return {
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+        },
+        "current_session": current_session(user),
+        "sessions": session_page(request),
+        "locations": UserLocationSerializer(
+            UserLocation.objects.for_user(user).recent_first(), many=True
+        ).data,
+        "exercises": NormalizedExerciseSerializer(exercises, many=True).data,
+        "tags": TagSerializer(with_defaults(Tag, user), many=True).data,
+        "muscle_groups": MuscleGroupSerializer(with_defaults(MuscleGroup, user), many=True).data,
+    }
+
+
+# GET /api/bootstrap/
+# Everything the app loads on start in one response: profile, open session,
+# first page of session summaries, locations, exercises, tags and muscle
+# groups. Exercises reference tags / muscle groups by id. Cached per user
+# (see services.bootstrap), with ETag / 304.
+@query_budget(14)
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def bootstrap(request):
+    key = bootstrap_cache.cache_key(request.user.pk, request.query_params)
+    return cached_response(request, key, lambda: bootstrap_data(request))
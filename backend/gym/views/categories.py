@@ -1,20 +1,36 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, decorators, response, serializers
 from django.db import models
 from ..models import MuscleGroup, Tag
+from ..query_budget import query_budget
+from ..serializers.analytics import ProgressRangeQuerySerializer
 from ..serializers.categories import MuscleGroupSerializer, TagSerializer
+from ..services import analytics, defaults
+from .mixins import CachedCatalogListMixin
 
 
-class MuscleGroupViewSet(viewsets.ModelViewSet):
+def with_defaults(model, user):
+    """
+    The user's own rows of `model` plus the cached default rows, by name.
+    """
+    rows = [*defaults.rows(model), *model.objects.filter(user=user)]
+    rows.sort(key=lambda row: (row.name.casefold(), row.name))
+    return rows
+
+
+@query_budget(list=4, create=3, retrieve=1, update=9, partial_update=9, destroy=7, progress=2)
+class MuscleGroupViewSet(CachedCatalogListMixin, viewsets.ModelViewSet):
     """
     Endpoints:
     - GET  /api/muscle-groups/
     - POST /api/muscle-groups/
     - PATCH /api/muscle-groups/{id}/
     - DELETE /api/muscle-groups/{id}/
+    - GET /api/muscle-groups/{id}/progress/  weekly training volume
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MuscleGroupSerializer
     queryset = MuscleGroup.objects.all()
+    catalog_scope = "muscle-groups"
 
     def get_queryset(self):
         """
@@ -27,17 +43,52 @@ class MuscleGroupViewSet(viewsets.ModelViewSet):
             models.Q(user=user) | models.Q(user__isnull=True)
         )
 
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
 
-class TagViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        if instance.user_id is None:
+            raise serializers.ValidationError("Default muscle groups cannot be deleted.")
+        instance.delete()
+
+    def get_catalog_data(self, request, *args, **kwargs):
+        rows = with_defaults(MuscleGroup, request.user)
+        return self.get_serializer(rows, many=True).data
+
+    @decorators.action(detail=True, methods=["get"])
+    def progress(self, request, pk=None):
+        muscle_group = self.get_object()
+        params = ProgressRangeQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return response.Response(
+            analytics.muscle_group_progress(request.user, muscle_group, **params.validated_data)
+        )
+
+
+@query_budget(list=4, create=3, retrieve=1, update=9, partial_update=9, destroy=6)
+class TagViewSet(CachedCatalogListMixin, viewsets.ModelViewSet):
     """
     Same CRUD patterns as MuscleGroupViewSet.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    catalog_scope = "tags"
 
     def get_queryset(self):
         user = self.request.user
         return Tag.objects.filter(
             models.Q(user=user) | models.Q(user__isnull=True)
-        )
\ No newline at end of file
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        if instance.user_id is None:
+            raise serializers.ValidationError("Default tags cannot be deleted.")
+        instance.delete()
+
+    def get_catalog_data(self, request, *args, **kwargs):
+        rows = with_defaults(Tag, request.user)
+        return self.get_serializer(rows, many=True).data
@@ -1,8 +1,23 @@
-from rest_framework import viewsets, permissions, decorators, response
-from ..models import ExerciseEvent, ExerciseCompletion
-from ..serializers.events import ExerciseEventSerializer, ExerciseCompletionSerializer
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import viewsets, permissions, decorators, response, serializers
+from rest_framework.generics import get_object_or_404
+from ..models import ExerciseEvent, ExerciseCompletion, Tombstone
+from ..query_budget import query_budget
+from ..serializers import fast
+from ..serializers.events import (
+    ExerciseEventBulkSerializer,
+    ExerciseEventSerializer,
+    ExerciseCompletionSerializer,
+)
+from ..services import exercise_usage, history, records, rollups
 
 
+@query_budget(
+    list=4, create=8, retrieve=4, update=26, partial_update=26, destroy=25,
+    last_values=2, bulk_events=25,
+)
 class ExerciseCompletionViewSet(viewsets.ModelViewSet):
     """
     Endpoints:
@@ -14,16 +29,50 @@ class ExerciseCompletionViewSet(viewsets.ModelViewSet):
     - DELETE /api/exercise-completions/{id}/
     - GET /api/exercise-completions/{id}/last_values/
       for prefill UI values
+    - POST /api/exercise-completions/{id}/events/bulk/
+      [{op: create|update|delete, order_index, ...}] applied in one transaction
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ExerciseCompletionSerializer
     queryset = ExerciseCompletion.objects.all()
 
+    READ_ACTIONS = {"list", "retrieve"}
+
     def get_queryset(self):
         """
-        Limit completions to the current user.
+        Limit completions to the current user. Reads prefetch what the
+        serializer nests.
+        """
+        qs = ExerciseCompletion.objects.filter(user=self.request.user)
+        if self.action in self.READ_ACTIONS:
+            qs = qs.select_related("exercise").prefetch_related(
+                "exercise__muscle_groups",
+                "exercise__tags",
+                Prefetch("events", queryset=ExerciseEvent.objects.order_by("order_index", "created_at")),
+            )
+        return qs
+
+    def perform_update(self, serializer):
         """
-        return ExerciseCompletion.objects.filter(user=self.request.user)
+        Moving a completion to another exercise changes the history of both.
+        """
+        with transaction.atomic():
+            previous_exercise_id = serializer.instance.exercise_id
+            before = history.touched_by_completions([serializer.instance.id])
+            completion = serializer.save()
+            if completion.exercise_id != previous_exercise_id:
+                exercise_usage.forget(completion, exercise_id=previous_exercise_id)
+                after = history.touched_by_completions([completion.id])
+                history.changed(
+                    before | after, last_completion=history.in_closed_session(completion)
+                )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            touched = history.touched_by_completions([instance.id])
+            closed = history.in_closed_session(instance)
+            instance.delete()
+            history.changed(touched, last_completion=closed)
 
     @decorators.action(detail=True, methods=["get"])
     def last_values(self, request, pk=None):
@@ -34,7 +83,85 @@ class ExerciseCompletionViewSet(viewsets.ModelViewSet):
         completion = self.get_object()
         return response.Response(completion.last_values_for_prefill())
 
+    @decorators.action(detail=True, methods=["post"], url_path="events/bulk")
+    def bulk_events(self, request, pk=None):
+        """
+        Apply a batch of create/update/delete ops to this completion's
+        events, keyed by order_index, with one ownership check and one
+        bulk statement per op type. Returns the resulting event list.
+        """
+        ops = ExerciseEventBulkSerializer(data=request.data)
+        ops.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            completion = get_object_or_404(
+                self.get_queryset().select_for_update(), pk=pk
+            )
+            existing = {}
+            for event in completion.events.order_by("-created_at"):
+                existing[event.order_index] = event  # oldest wins on duplicates
+
+            now = timezone.now()
+            to_create, to_update, to_delete = [], [], []
+            update_fields = {"updated_at"}
+            errors = {}
+            for i, op in enumerate(ops.validated_data):
+                kind = op.pop("op")
+                order_index = op["order_index"]
+                event = existing.get(order_index)
+                if kind == "create":
+                    if event is not None:
+                        errors[i] = f"An event with order_index {order_index} already exists."
+                        continue
+                    to_create.append(ExerciseEvent(completion=completion, **op))
+                elif event is None:
+                    errors[i] = f"No event with order_index {order_index}."
+                elif kind == "update":
+                    for field, value in op.items():
+                        setattr(event, field, value)
+                    event.updated_at = now
+                    update_fields.update(op)
+                    to_update.append(event)
+                else:
+                    to_delete.append(event)
+            if errors:
+                raise serializers.ValidationError(errors)
+
+            touched = history.touched_by_events(
+                ExerciseEvent.objects.filter(id__in=[e.id for e in to_update + to_delete])
+            )
+            if to_delete:
+                # gym.signals only leaves tombstones for single-row deletes.
+                Tombstone.objects.bulk_create([
+                    Tombstone(
+                        user_id=completion.user_id,
+                        model="event",
+                        object_id=event.id,
+                        client_id=event.client_id,
+                    )
+                    for event in to_delete
+                ])
+                ExerciseEvent.objects.filter(id__in=[e.id for e in to_delete]).delete()
+            if to_update:
+                ExerciseEvent.objects.bulk_update(to_update, sorted(update_fields))
+            if to_create:
+                created = ExerciseEvent.objects.bulk_create(to_create)
+                touched |= {
+                    (completion.user_id, completion.exercise_id, rollups.event_day(e))
+                    for e in created
+                }
+            history.changed(
+                touched,
+                # Updates keep created_at, so only adding or removing sets
+                # can change "last time".
+                last_completion=bool(to_create or to_delete) and history.in_closed_session(completion),
+            )
 
+        events = completion.events.order_by("order_index", "created_at")
+        return response.Response(ExerciseEventSerializer(events, many=True).data)
+
+
+@query_budget(list=1, create=17, retrieve=1, update=17, partial_update=16, destroy=21)
 class ExerciseEventViewSet(viewsets.ModelViewSet):
     """
     Endpoints:
@@ -57,11 +184,60 @@ class ExerciseEventViewSet(viewsets.ModelViewSet):
             completion__user=self.request.user
         )
 
-    def perform_create(self, serializer):
+    def list(self, request, *args, **kwargs):
         """
-        Ensure event belongs to user.
+        Read-only fast path: the same JSON as ExerciseEventSerializer,
+        without building model instances (see serializers.fast).
         """
+        return response.Response(fast.event_rows(self.filter_queryset(self.get_queryset())))
+
+    def perform_create(self, serializer):
+        # The serializer only accepts the user's own completions.
         completion = serializer.validated_data["completion"]
-        if completion.user != self.request.user:
-            raise permissions.PermissionDenied("Not your completion")
-        serializer.save()
\ No newline at end of file
+        with transaction.atomic():
+            event = serializer.save()
+            event.new_records = records.record_event(event)
+            history.changed(
+                history.touched_by_event(event),
+                last_completion=history.in_closed_session(completion),
+                personal_records=False,
+            )
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            previous = serializer.instance.completion
+            held_record = records.holds_record(serializer.instance)
+            before = history.touched_by_event(serializer.instance)
+            event = serializer.save()
+            moved = event.completion_id != previous.id
+
+            if moved or held_record:
+                # The old value may have been the record; recompute from history.
+                records.recompute_pairs({
+                    (previous.user_id, previous.exercise_id),
+                    (event.completion.user_id, event.completion.exercise_id),
+                })
+                event.new_records = []
+            else:
+                event.new_records = records.record_event(event)
+
+            history.changed(
+                before | history.touched_by_event(event),
+                # Only moving a set between completions can change "last time".
+                last_completion=moved and history.in_closed_session(previous, event.completion),
+                personal_records=False,
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            completion = instance.completion
+            held_record = records.holds_record(instance)
+            touched = history.touched_by_event(instance)
+            instance.delete()
+            if held_record:
+                records.recompute(completion.user_id, [completion.exercise_id])
+            history.changed(
+                touched,
+                last_completion=history.in_closed_session(completion),
+                personal_records=False,
+            )
\ No newline at end of file
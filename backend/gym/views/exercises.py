@@ -1,27 +1,31 @@
 # gym/api/exercises.py
-from django.db.models import Max, Q
+from django.db import transaction
 from rest_framework import viewsets, permissions, decorators, response, status
 from ..models import Exercise
+from ..query_budget import query_budget
 from ..serializers.exercises import ExerciseSerializer
+from ..serializers.analytics import ExerciseProgressQuerySerializer
 from ..serializers.events import ExerciseCompletionSerializer
+from ..services import analytics, rollups, search
+from .mixins import CachedCatalogListMixin
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+# Writes include the 4 queries of the search refresh run on commit.
+@query_budget(
+    list=4, create=19, retrieve=3, update=21, partial_update=19, destroy=12,
+    last_completion=8, progress=4,
+)
+class ExerciseViewSet(CachedCatalogListMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ExerciseSerializer
     queryset = Exercise.objects.all()
+    catalog_scope = "exercises"
 
     def get_queryset(self):
         user = self.request.user
 
-        qs = (
-            Exercise.objects
-            .filter(user=user)
-            .annotate(
-                # last completion time (any completion; if you prefer last closed-with-events only,
-                # you can copy the logic from last_completion_for_user)
-                last_completed_at=Max("completions__created_at")
-            )
-        )
+        # last_completed_at is stored on Exercise (any completion; see
+        # gym.services.exercise_usage), so this is a plain indexed scan.
+        qs = Exercise.objects.filter(user=user).prefetch_related("muscle_groups", "tags")
 
         # Filter by tag
         tag_id = self.request.query_params.get("tag_id")
@@ -33,26 +37,43 @@ class ExerciseViewSet(viewsets.ModelViewSet):
         if mg_id:
             qs = qs.filter(muscle_groups__id=mg_id)
 
-        # Search by name, muscle group, or tag
-        search = self.request.query_params.get("search")
-        if search:
-            qs = qs.filter(
-                Q(name__icontains=search)
-                | Q(muscle_groups__name__icontains=search)
-                | Q(tags__name__icontains=search)
-            ).distinct()
+        # Search by name, muscle group, or tag (ranked by relevance)
+        search_term = self.request.query_params.get("search", "").strip()
+        if search_term:
+            qs = search.search(qs, search_term)
 
-        # Sort
+        # Sort (a search keeps its relevance order unless asked otherwise)
         ordering = self.request.query_params.get("ordering")
-        if ordering == "name":
-            qs = qs.order_by("name")
-        elif ordering == "recent":
+        if ordering == "recent":
             qs = qs.order_by("-last_completed_at", "name")
-        else:
+        elif ordering == "name" or not search_term:
             qs = qs.order_by("name")
 
         return qs
 
+    def perform_create(self, serializer):
+        # One transaction, so the search document is built once (see
+        # gym.services.search).
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        """
+        Re-tagging an exercise's muscle groups moves its volume between
+        muscle-group rollups.
+        """
+        exercise = serializer.instance
+        groups = serializer.validated_data.get("muscle_groups")
+        with transaction.atomic():
+            if groups is None:
+                serializer.save()
+                return
+            before = set(exercise.muscle_groups.values_list("id", flat=True))
+            exercise = serializer.save()
+            after = {group.id for group in groups}
+            if before != after:
+                rollups.refresh_muscle_group_weeks(exercise.user_id, before | after)
+
     @decorators.action(detail=True, methods=["get"])
     def last_completion(self, request, pk=None):
         exercise = self.get_object()
@@ -63,4 +84,19 @@ class ExerciseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
         data = ExerciseCompletionSerializer(completion).data
-        return response.Response(data)
\ No newline at end of file
+        return response.Response(data)
+
+    @decorators.action(detail=True, methods=["get"])
+    def progress(self, request, pk=None):
+        """
+        GET /api/exercises/{id}/progress/?bucket=day|week&since=&until=
+
+        Daily or weekly series of top set weight, volume, estimated 1RM,
+        distance and duration (whichever the exercise tracks).
+        """
+        exercise = self.get_object()
+        params = ExerciseProgressQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return response.Response(
+            analytics.exercise_progress(request.user, exercise, **params.validated_data)
+        )
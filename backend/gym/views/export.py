@@ -0,0 +1,33 @@
+# views/export.py
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+
+from ..query_budget import query_budget
+from ..renderers import CSVRenderer, NDJSONRenderer
+from ..services import export
+
+
+# GET /api/export/?format=csv|ndjson[&gzip=1]
+# Streams the user's whole history, one row per set (see services.export).
+# Its queries run while the body streams, in chunks, outside the budget.
+@query_budget(0)
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([CSVRenderer, NDJSONRenderer])
+def export_history(request):
+    renderer = request.accepted_renderer
+    gzip = request.query_params.get("gzip") in ("1", "true")
+
+    filename = f"training-history.{renderer.format}"
+    content_type = f"{renderer.media_type}; charset=utf-8"
+    if gzip:
+        filename += ".gz"
+        content_type = "application/gzip"
+
+    resp = StreamingHttpResponse(
+        export.stream(request.user, renderer.format, gzip=gzip),
+        content_type=content_type,
+    )
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
@@ -0,0 +1,51 @@
+# views/imports.py
+import csv
+
+from django.conf import settings
+from rest_framework import permissions, response, status
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
+
+from ..query_budget import count_items, query_budget
+from ..services import importer
+
+
+# POST /api/import/
+# multipart: {file, format?: csv|ndjson}  (format and gzip are detected
+# from the file name / content when omitted)
+# Runs within the request, so it takes up to GYM_IMPORT_MAX_SYNC_ROWS
+# rows; larger files are refused with 413 and must be imported with a job
+# (POST /api/jobs/ {kind: import, file}).
+# Exercises missing from the catalog are created one by one.
+@query_budget(31, per_item=25, repeats=3)
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser])
+def import_history(request):
+    upload = request.FILES.get("file")
+    if upload is None:
+        return response.Response(
+            {"file": "This field is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        report = importer.import_file(
+            request.user,
+            upload.file,
+            fmt=request.data.get("format") or None,
+            name=upload.name,
+            max_rows=settings.GYM_IMPORT_MAX_SYNC_ROWS,
+        )
+    except importer.ImportTooLarge as exc:
+        return response.Response(
+            {"detail": f"{exc} Import this file with a job: POST /api/jobs/ with kind=import."},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    except (importer.ImportFileError, UnicodeDecodeError, csv.Error) as exc:
+        return response.Response(
+            {"detail": f"Could not read file: {exc}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    count_items(request, report["exercises_created"])
+    return response.Response(report)
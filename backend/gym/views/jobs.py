@@ -0,0 +1,65 @@
+# views/jobs.py
+from django.http import StreamingHttpResponse
+from rest_framework import decorators, mixins, permissions, response, status, viewsets
+from rest_framework.exceptions import NotFound, Throttled
+
+from ..models import Job, JobOutputChunk
+from ..query_budget import query_budget
+from ..serializers.jobs import JobCreateSerializer, JobSerializer
+from ..services import jobs
+
+
+@query_budget(list=1, create=2, retrieve=1, download=1)
+class JobViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Endpoints:
+    - POST /api/jobs/
+      {kind: import|export|rebuild, format?, file? (import, multipart)}
+      -> 202 with the queued job; `manage.py run_worker` runs it
+    - GET  /api/jobs/            the user's jobs, newest first
+    - GET  /api/jobs/{id}/       poll status / progress / result
+    - GET  /api/jobs/{id}/download/
+      finished export, gzipped, streamed from its chunks
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).defer(*jobs.BLOB_FIELDS)
+
+    def create(self, request, *args, **kwargs):
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        payload, input_data = {}, None
+        if "format" in data:
+            payload["format"] = data["format"]
+        if "file" in data:
+            payload["name"] = data["file"].name
+            input_data = jobs.compress_upload(data["file"])
+        try:
+            job = jobs.enqueue(request.user, data["kind"], payload, input_data=input_data)
+        except jobs.JobLimitError as exc:
+            raise Throttled(detail=str(exc))
+        return response.Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @decorators.action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.kind != "export" or job.status != Job.SUCCEEDED:
+            raise NotFound("This job has no file to download.")
+        chunks = (
+            JobOutputChunk.objects.filter(job=job).order_by("index")
+            .values_list("data", flat=True).iterator(chunk_size=1)
+        )
+
+        fmt = job.result["format"]
+        resp = StreamingHttpResponse((bytes(data) for data in chunks), content_type="application/gzip")
+        resp["Content-Disposition"] = f'attachment; filename="training-history.{fmt}.gz"'
+        return resp
@@ -5,9 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from ..models import UserLocation, GymSession
+from ..query_budget import query_budget
 from ..serializers.locations import UserLocationSerializer
 from ..serializers.sessions import  GymSessionSerializer
 
+@query_budget(
+    list=1, create=2, retrieve=1, update=3, partial_update=3, destroy=5, most_recent=1,
+)
 class UserLocationViewSet(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
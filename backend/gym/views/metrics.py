@@ -0,0 +1,19 @@
+# views/metrics.py
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+
+from .. import metrics
+from ..query_budget import query_budget
+
+
+# GET /api/_metrics  (staff only)
+# Per-route request histograms of this process, Prometheus text format.
+@query_budget(0)
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def prometheus_metrics(request):
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,41 @@
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import response, status
+
+from ..services import catalog_cache
+
+
+def cached_response(request, key, build):
+    """
+    Response for the cache entry under `key` -- built with `build()` on a
+    miss -- with ETag / 304 support.
+    """
+    entry = catalog_cache.get(key)
+    if entry is None:
+        entry = catalog_cache.store(key, build())
+    etag, data = entry
+
+    etag = quote_etag(etag)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return response.Response(data, headers=headers)
+
+
+class CachedCatalogListMixin:
+    """
+    Serve `list` from the per-user catalog cache, with ETag / 304 support.
+    Subclasses set `catalog_scope` to a name unique among cached lists.
+    """
+    catalog_scope = None
+
+    def list(self, request, *args, **kwargs):
+        key = catalog_cache.response_key(request.user.pk, self.catalog_scope, request.query_params)
+        return cached_response(
+            request, key, lambda: self.get_catalog_data(request, *args, **kwargs)
+        )
+
+    def get_catalog_data(self, request, *args, **kwargs):
+        """
+        Build the list payload on a cache miss.
+        """
+        return super().list(request, *args, **kwargs).data
@@ -1,27 +1,145 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import viewsets, permissions, decorators, response, status
-from ..models import GymSession
-from ..serializers.sessions import GymSessionSerializer
-from django.utils import timezone
+from ..models import GymSession, ExerciseCompletion, ExerciseEvent
+from ..pagination import SessionCursorPagination
+from ..query_budget import query_budget
+from ..serializers.normalized import normalize_sessions
+from ..serializers.sessions import GymSessionSerializer, GymSessionSummarySerializer
+from ..services import history, last_completions, sessions
 
+
+def session_tree_prefetches():
+    """
+    Prefetch plan for serializing the full nested session tree:
+    session -> completions -> exercise (+ muscle groups, tags) -> events.
+
+    Runs a fixed number of queries regardless of how many sessions,
+    completions or events are being serialized.
+    """
+    completions = (
+        ExerciseCompletion.objects
+        .select_related("exercise")
+        .prefetch_related(
+            "exercise__muscle_groups",
+            "exercise__tags",
+            Prefetch(
+                "events",
+                queryset=ExerciseEvent.objects.order_by("order_index", "created_at"),
+            ),
+        )
+        .order_by("created_at")
+    )
+    return [Prefetch("exercise_completions", queryset=completions)]
+
+
+@query_budget(
+    list=5, create=9, retrieve=5, update=13, partial_update=20, destroy=26,
+    current=5, close=12, reopen=17,
+)
 class GymSessionViewSet(viewsets.ModelViewSet):
     """
     Endpoints:
-    - GET  /api/sessions/            list sessions
+    - GET  /api/sessions/            list sessions (summary, cursor paginated)
     - POST /api/sessions/            create session
-    - GET  /api/sessions/{id}/       session details
-    - PATCH /api/sessions/{id}/      update note/location
+    - GET  /api/sessions/{id}/       session details (?view=summary for slim)
+    - PATCH /api/sessions/{id}/      update note/location/times
     - POST /api/sessions/{id}/close/ close session
     - GET  /api/sessions/current/    get active open session
+
+    Reads accept ?shape=normalized for full trees with exercises, categories
+    and locations side-loaded once (see serializers.normalized); on the list
+    endpoint that replaces the summary.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GymSessionSerializer
+    pagination_class = SessionCursorPagination
     queryset = GymSession.objects.all()
 
+    # Actions that serialize the full nested tree and need the prefetch plan.
+    TREE_ACTIONS = {"retrieve", "current", "close", "reopen"}
+    # Read actions that may be asked for the slim shape via ?view=summary.
+    SUMMARY_ACTIONS = {"retrieve", "current"}
+    # Actions that can answer with ?shape=normalized.
+    NORMALIZED_ACTIONS = {"list", "retrieve", "current", "close", "reopen"}
+
+    def wants_normalized(self):
+        return (
+            self.action in self.NORMALIZED_ACTIONS
+            and self.request.query_params.get("shape") == "normalized"
+        )
+
+    def wants_summary(self):
+        """
+        The list endpoint serves summaries unless normalized trees are
+        requested; the nested tree is only served for single sessions.
+        """
+        if self.wants_normalized():
+            return False
+        if self.action == "list":
+            return True
+        return (
+            self.action in self.SUMMARY_ACTIONS
+            and self.request.query_params.get("view") == "summary"
+        )
+
+    def get_serializer_class(self):
+        if self.wants_summary():
+            return GymSessionSummarySerializer
+        return GymSessionSerializer
+
     def get_queryset(self):
         """
         Only return sessions for the logged-in user.
+
+        Summary reads get per-session totals annotated in SQL; full reads
+        get location/completions/exercise/categories/events loaded up
+        front; write-only actions stay on the bare queryset.
+        """
+        qs = GymSession.objects.filter(user=self.request.user)
+        if self.wants_summary():
+            qs = qs.select_related("location").with_summary()
+        elif self.action in self.TREE_ACTIONS or self.wants_normalized():
+            qs = qs.select_related("location").prefetch_related(
+                *session_tree_prefetches()
+            )
+        return qs
+
+    def session_data(self, session):
+        if self.wants_normalized():
+            data = normalize_sessions([session])
+            data["session"] = data.pop("sessions")[0]
+            return data
+        return self.get_serializer(session).data
+
+    def list(self, request, *args, **kwargs):
+        if not self.wants_normalized():
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        data = normalize_sessions(page)
+        resp = self.get_paginated_response(data.pop("sessions"))
+        resp.data.update(data)
+        return resp
+
+    def retrieve(self, request, *args, **kwargs):
+        return response.Response(self.session_data(self.get_object()))
+
+    def update(self, request, *args, **kwargs):
+        """
+        The write runs on the bare row; the updated tree is then read back
+        with the prefetch plan rather than lazily, completion by completion.
         """
-        return GymSession.objects.filter(user=self.request.user)
+        serializer = self.get_serializer(
+            self.get_object(), data=request.data, partial=kwargs.pop("partial", False)
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        session = (
+            GymSession.objects.select_related("location")
+            .prefetch_related(*session_tree_prefetches())
+            .get(pk=serializer.instance.pk)
+        )
+        return response.Response(self.get_serializer(session).data)
 
     @decorators.action(detail=False, methods=["get"])
     def current(self, request):
@@ -30,14 +148,14 @@ class GymSessionViewSet(viewsets.ModelViewSet):
         - Fetch open session (end_time=None)
         - Return 404 if none exists
         """
-        session = GymSession.objects.filter(
-            user=request.user, end_time__isnull=True
-        ).order_by("-start_time").first()
+        # At most one open session: looked up through the partial index.
+        session = self.get_queryset().filter(end_time__isnull=True).order_by()[:1]
+        session = session[0] if session else None
 
         if not session:
             return response.Response({"detail": "No open session."}, status=404)
 
-        return response.Response(self.get_serializer(session).data)
+        return response.Response(self.session_data(session))
 
     @decorators.action(detail=True, methods=["post"])
     def close(self, request, pk=None):
@@ -46,30 +164,29 @@ class GymSessionViewSet(viewsets.ModelViewSet):
         - Mark session closed
         - Default to last event timestamp if needed
         """
-        session = self.get_object()
-        session.close(save=True)
-        return response.Response(self.get_serializer(session).data)
+        session = sessions.close(self.get_object())
+        return response.Response(self.session_data(session))
     
+    def perform_update(self, serializer):
+        """
+        Setting or clearing end_time closes or reopens the session like the
+        close/reopen actions do.
+        """
+        serializer.instance = sessions.update(
+            serializer.instance, **serializer.validated_data
+        )
+
     def perform_create(self, serializer):
         """
         Custom logic when starting a new session:
         - Close any other open sessions for this user
+          (only when the new one is open; back-filled closed sessions don't)
         - Create a new session belonging to this user
         """
-        user = self.request.user
-
-        # TODO (decide behavior): 
-        # Option A: auto-close existing open sessions
-        GymSession.objects.filter(user=user, end_time__isnull=True).update(
-            end_time=timezone.now()
+        serializer.instance = sessions.start(
+            self.request.user, **serializer.validated_data
         )
 
-        # Option B (alternative): if open exists, raise error instead:
-        # if GymSession.objects.filter(user=user, end_time__isnull=True).exists():
-        #     raise ValidationError("You already have an open session.")
-
-        serializer.save(user=user)
-
     @decorators.action(detail=True, methods=["post"])
     def reopen(self, request, pk=None):
         """
@@ -79,16 +196,13 @@ class GymSessionViewSet(viewsets.ModelViewSet):
         - Close any currently open session
         - Set end_time=None on this session
         """
-        user = request.user
-        session = self.get_object()
-
-        # Close any other open session
-        GymSession.objects.filter(user=user, end_time__isnull=True).exclude(
-            id=session.id
-        ).update(end_time=timezone.now())
+        session = sessions.reopen(self.get_object())
+        return response.Response(self.session_data(session))
 
-        # Reopen this one
-        session.end_time = None
-        session.save()
 
-        return response.Response(self.get_serializer(session).data)
\ No newline at end of file
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            touched = history.touched_by_sessions([instance.id])
+            instance.delete()
+            # An open session was never anyone's "last time".
+            history.changed(touched, last_completion=not instance.is_open)
@@ -0,0 +1,326 @@
+# views/sync.py
+"""
+Offline-first sync.
+
+GET  /api/sync/changes/?since=<token>&limit=<n>
+    Every synced row of the user changed after `token` (all rows when
+    omitted), plus tombstones for deletes, at most `limit` rows a page.
+    While `has_more` is set, fetch the next page with ?cursor=<cursor>;
+    the last page carries the tombstones, and its `token` is the one to
+    pass next time. Deleting a parent implies its children (a session
+    tombstone means its completions and events are gone too).
+
+POST /api/sync/push/
+    {operations: [{type, op: upsert|delete, client_id, data}]}
+    Ops are applied in order, each in its own savepoint, through the same
+    viewset code paths as the REST endpoints (sessions through the
+    lifecycle service). An op is "applied", "rejected" (invalid) or
+    "conflict" (clashed with a concurrent write; pull and retry). They are
+    keyed by the client-generated `client_id`, so replaying a batch is a
+    no-op. References inside `data` may be server ids or client_ids.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from rest_framework import exceptions, permissions, response, status
+from rest_framework.decorators import api_view, permission_classes
+
+from ..models import (
+    Exercise,
+    ExerciseCompletion,
+    ExerciseEvent,
+    GymSession,
+    MuscleGroup,
+    Tag,
+    Tombstone,
+    UserLocation,
+)
+from ..query_budget import count_items, query_budget
+from ..serializers.sync import (
+    SyncCompletionSerializer,
+    SyncEventSerializer,
+    SyncExerciseSerializer,
+    SyncLocationSerializer,
+    SyncMuscleGroupSerializer,
+    SyncPushSerializer,
+    SyncSessionSerializer,
+    SyncTagSerializer,
+)
+from .categories import MuscleGroupViewSet, TagViewSet
+from .events import ExerciseCompletionViewSet, ExerciseEventViewSet
+from .exercises import ExerciseViewSet
+from .locations import UserLocationViewSet
+from .sessions import GymSessionViewSet
+
+# Rows committed slightly out of updated_at order are re-sent rather than
+# missed: the returned token trails "now" by this much.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _owned(model, user):
+    if model in (MuscleGroup, Tag):
+        return model.objects.filter(models.Q(user=user) | models.Q(user__isnull=True))
+    if model is ExerciseEvent:
+        return model.objects.filter(completion__user=user)
+    return model.objects.filter(user=user)
+
+
+FEED = [
+    ("locations", SyncLocationSerializer, UserLocation, ()),
+    ("muscle_groups", SyncMuscleGroupSerializer, MuscleGroup, ()),
+    ("tags", SyncTagSerializer, Tag, ()),
+    ("exercises", SyncExerciseSerializer, Exercise, ("muscle_groups", "tags")),
+    ("sessions", SyncSessionSerializer, GymSession, ()),
+    ("completions", SyncCompletionSerializer, ExerciseCompletion, ()),
+    ("events", SyncEventSerializer, ExerciseEvent, ()),
+]
+
+# type -> (viewset, model, {write field: referenced model})
+PUSH_TYPES = {
+    "location": (UserLocationViewSet, UserLocation, {}),
+    "muscle_group": (MuscleGroupViewSet, MuscleGroup, {}),
+    "tag": (TagViewSet, Tag, {}),
+    "exercise": (ExerciseViewSet, Exercise, {"muscle_group_ids": MuscleGroup, "tag_ids": Tag}),
+    "session": (GymSessionViewSet, GymSession, {"location_id": UserLocation}),
+    "completion": (
+        ExerciseCompletionViewSet,
+        ExerciseCompletion,
+        {"session": GymSession, "exercise_id": Exercise},
+    ),
+    "event": (ExerciseEventViewSet, ExerciseEvent, {"completion": ExerciseCompletion}),
+}
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Rows per page of the change feed.
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+
+
+def _micros(when):
+    return (when - EPOCH) // MICROSECOND
+
+
+def _from_micros(micros):
+    return EPOCH + micros * MICROSECOND
+
+
+def encode_token(when):
+    return str(_micros(when))
+
+
+def decode_token(token):
+    try:
+        micros = int(token)
+    except (TypeError, ValueError):
+        raise exceptions.ValidationError({"since": "Invalid sync token."})
+    return _from_micros(micros)
+
+
+def encode_cursor(since, token, feed_index, after):
+    """
+    Where the next page starts: the original `since`, the token the last
+    page will return, and the (updated_at, id) last sent of FEED[feed_index].
+    """
+    parts = [
+        "" if since is None else encode_token(since),
+        token,
+        str(feed_index),
+        *((encode_token(after[0]), str(after[1])) if after else ()),
+    ]
+    return ".".join(parts)
+
+
+def decode_cursor(cursor):
+    try:
+        since, token, feed_index, *after = cursor.split(".")
+        since = _from_micros(int(since)) if since else None
+        feed_index = int(feed_index)
+        int(token)
+        after = (_from_micros(int(after[0])), int(after[1])) if after else None
+    except (TypeError, ValueError, IndexError):
+        raise exceptions.ValidationError({"cursor": "Invalid sync cursor."})
+    if not 0 <= feed_index < len(FEED):
+        raise exceptions.ValidationError({"cursor": "Invalid sync cursor."})
+    return since, token, feed_index, after
+
+
+def _page_size(request):
+    limit = request.query_params.get("limit")
+    if limit is None:
+        return SYNC_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise exceptions.ValidationError({"limit": "Must be a positive integer."})
+    return min(limit, SYNC_MAX_PAGE_SIZE)
+
+
+# GET /api/sync/changes/?since=<token>&limit=<n>, then ?cursor=<cursor>
+@query_budget(10)
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def changes(request):
+    user = request.user
+    limit = _page_size(request)
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        since, next_token, start, after = decode_cursor(cursor)
+    else:
+        since = request.query_params.get("since")
+        since = decode_token(since) if since else None
+        next_token = encode_token(timezone.now() - SYNC_OVERLAP)
+        start, after = 0, None
+
+    # Keyset pages over FEED in order, each model by (updated_at, id).
+    payload = {key: [] for key, *_ in FEED}
+    remaining, next_cursor = limit, None
+    for index in range(start, len(FEED)):
+        key, serializer_class, model, prefetch = FEED[index]
+        qs = _owned(model, user).prefetch_related(*prefetch).order_by("updated_at", "id")
+        if since is not None:
+            qs = qs.filter(updated_at__gt=since)
+        if index == start and after is not None:
+            qs = qs.filter(
+                models.Q(updated_at__gt=after[0])
+                | models.Q(updated_at=after[0], id__gt=after[1])
+            )
+        rows = list(qs[:remaining + 1])
+        if len(rows) > remaining:
+            rows = rows[:remaining]
+            last = (rows[-1].updated_at, rows[-1].id) if rows else (
+                after if index == start else None
+            )
+            next_cursor = encode_cursor(since, next_token, index, last)
+        payload[key] = serializer_class(rows, many=True).data
+        if next_cursor:
+            break
+        remaining -= len(rows)
+
+    deleted = []
+    if since is not None and next_cursor is None:
+        tombstones = Tombstone.objects.filter(
+            models.Q(user=user) | models.Q(user__isnull=True),
+            deleted_at__gt=since,
+        )
+        deleted = [
+            {"type": t.model, "id": t.object_id, "client_id": t.client_id}
+            for t in tombstones
+        ]
+
+    return response.Response({
+        "token": next_token,
+        "has_more": next_cursor is not None,
+        "cursor": next_cursor,
+        "changes": payload,
+        "deleted": deleted,
+    })
+
+
+class Rejected(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def _resolve_ref(model, user, value):
+    """
+    Map a server id or client_id to a server id the user may reference.
+    """
+    if value is None:
+        return None
+    try:
+        lookup = {"client_id": uuid.UUID(str(value))}
+    except ValueError:
+        lookup = {"pk": value}
+    try:
+        pk = _owned(model, user).filter(**lookup).values_list("pk", flat=True).first()
+    except (TypeError, ValueError):
+        pk = None
+    if pk is None:
+        raise Rejected({"detail": f"Unknown {model.__name__} reference {value!r}."})
+    return pk
+
+
+def _resolve_refs(data, refs, user):
+    data = dict(data)
+    for field, model in refs.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if isinstance(value, list):
+            data[field] = [_resolve_ref(model, user, v) for v in value]
+        else:
+            data[field] = _resolve_ref(model, user, value)
+    return data
+
+
+def _apply(request, op):
+    viewset_class, model, refs = PUSH_TYPES[op["type"]]
+    client_id = op["client_id"]
+    view = viewset_class(request=request, args=(), kwargs={}, format_kwarg=None)
+
+    view.action = "partial_update"
+    instance = view.get_queryset().filter(client_id=client_id).first()
+    if instance is None and model.objects.filter(client_id=client_id).exists():
+        raise Rejected({"client_id": "Already used by another user."})
+
+    if op["op"] == "delete":
+        if instance is not None:
+            view.action = "destroy"
+            view.perform_destroy(instance)
+        return None
+
+    data = _resolve_refs(op["data"], refs, request.user)
+    if instance is not None:
+        serializer = view.get_serializer(instance, data=data, partial=True)
+        if not serializer.is_valid():
+            raise Rejected(serializer.errors)
+        view.perform_update(serializer)
+    else:
+        view.action = "create"
+        serializer = view.get_serializer(data=data)
+        if not serializer.is_valid():
+            raise Rejected(serializer.errors)
+        serializer.validated_data["client_id"] = client_id
+        view.perform_create(serializer)
+    return serializer.instance.pk
+
+
+# POST /api/sync/push/
+# payload: {operations: [{type, op, client_id, data}]}
+# Each operation is a REST write of its own, so the budget is per operation.
+@query_budget(2, per_item=25)
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def push(request):
+    batch = SyncPushSerializer(data=request.data)
+    batch.is_valid(raise_exception=True)
+    count_items(request, len(batch.validated_data["operations"]))
+
+    results = []
+    for op in batch.validated_data["operations"]:
+        result = {"type": op["type"], "op": op["op"], "client_id": op["client_id"]}
+        try:
+            with transaction.atomic():
+                result["id"] = _apply(request, op)
+            result["status"] = "applied"
+        except Rejected as exc:
+            result.update(status="rejected", errors=exc.errors)
+        except exceptions.APIException as exc:
+            result.update(status="rejected", errors={"detail": exc.detail})
+        except IntegrityError:
+            # Lost a race with another write (e.g. a second open session);
+            # the client can pull changes and retry.
+            result.update(
+                status="conflict",
+                errors={"detail": f"Conflicts with the current state of this {op['type']}."},
+            )
+        results.append(result)
+
+    return response.Response({"results": results}, status=status.HTTP_200_OK)
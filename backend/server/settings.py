@@ -72,6 +72,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "gym.middleware.RequestMetricsMiddleware",
+    "gym.middleware.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -137,6 +139,37 @@ else:
         }
     }
 
+# -------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------
+# Local memory in dev/tests; prod switches to a file cache so gunicorn
+# workers share cached responses. The versions that invalidate them are
+# in the database (gym.services.catalog_cache).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "gym",
+    }
+}
+
+# Seconds a cached catalog response (tags, muscle groups, exercises) lives.
+GYM_CATALOG_CACHE_TIMEOUT = int(os.getenv("GYM_CATALOG_CACHE_TIMEOUT", 60 * 60))
+
+# -------------------------------------------------------------------
+# Background jobs (gym.services.jobs, manage.py run_worker)
+# -------------------------------------------------------------------
+# Jobs one user may have running at once, and queued + running in total.
+GYM_JOBS_PER_USER = int(os.getenv("GYM_JOBS_PER_USER", 1))
+GYM_JOBS_MAX_PENDING = int(os.getenv("GYM_JOBS_MAX_PENDING", 5))
+GYM_JOB_MAX_ATTEMPTS = int(os.getenv("GYM_JOB_MAX_ATTEMPTS", 3))
+# Seconds before the first retry; doubles with every further attempt.
+GYM_JOB_RETRY_DELAY = int(os.getenv("GYM_JOB_RETRY_DELAY", 30))
+# Seconds without a heartbeat after which a running job is requeued.
+GYM_JOB_STALE_AFTER = int(os.getenv("GYM_JOB_STALE_AFTER", 5 * 60))
+# Rows POST /api/import/ imports within the request; larger files go
+# through an import job.
+GYM_IMPORT_MAX_SYNC_ROWS = int(os.getenv("GYM_IMPORT_MAX_SYNC_ROWS", 5000))
+
 # -------------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------------
@@ -186,5 +219,19 @@ LOGGING = {
     "root": {"handlers": ["console"], "level": "INFO"},
     "loggers": {
         "django.request": {"handlers": ["console"], "level": "DEBUG", "propagate": False},
+        # One JSON line per request slower than GYM_SLOW_REQUEST_MS.
+        "gym.requests": {"handlers": ["console"], "level": "WARNING", "propagate": False},
     },
-}
\ No newline at end of file
+}
+
+# -------------------------------------------------------------------
+# Request metrics (gym.middleware, GET /api/_metrics)
+# -------------------------------------------------------------------
+GYM_METRICS_ENABLED = os.getenv("GYM_METRICS_ENABLED", "True") == "True"
+GYM_SLOW_REQUEST_MS = int(os.getenv("GYM_SLOW_REQUEST_MS", 500))
+# -------------------------------------------------------------------
+# Query budgets (gym.query_budget); the test suite turns enforcement on
+# -------------------------------------------------------------------
+GYM_ENFORCE_QUERY_BUDGETS = os.getenv("GYM_ENFORCE_QUERY_BUDGETS", "False") == "True"
+# How often one SQL shape may run in a request before it counts as an N+1.
+GYM_QUERY_REPEAT_LIMIT = int(os.getenv("GYM_QUERY_REPEAT_LIMIT", 2))
@@ -82,6 +82,25 @@ export interface GymSession {
   updated_at: string;
 }
 
+export interface GymSessionSummary {
+  id: number;
+  start_time: string;
+  end_time: string | null;
+  is_open: boolean;
+  note: string;
+  location: UserLocation | null;
+  exercise_count: number;
+  set_count: number;
+  total_volume: string;          // backend sends decimal as string
+  elapsed_seconds: number | null;
+}
+
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 export interface ExerciseEventSummary {
   id: number;
   order_index: number;